@@ -0,0 +1,282 @@
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from orion.config import settings
+
+PRIORITIES = {"interactive": 0, "background": 1}
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough 4-characters-per-token estimate, as for embedding batches.
+    return len(text) // 4 + 1
+
+
+class TokenBucket(object):
+    """Token bucket refilled at ``rate`` per second, shared by sync and async callers.
+
+    ``reserve`` books the next slot under a lock and returns how long the
+    caller must wait for it, so concurrent callers queue up in order instead
+    of all waking at once. ``wait_time``/``take`` check and spend without
+    going into debt, for callers that schedule the wait themselves.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            self._refill()
+            missing = min(tokens, self.capacity) - self._tokens
+            return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, tokens: float = 1.0) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens -= min(tokens, self.capacity)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: float = 1.0) -> float:
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class AdmissionRejected(Exception):
+    """The call would wait longer than allowed; retry after ``retry_after_s``."""
+
+    def __init__(self, message: str, retry_after_s: float):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+class _Waiter(object):
+    __slots__ = ("priority", "requests", "tokens", "future")
+
+    def __init__(self, priority: int, requests: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.requests = requests
+        self.tokens = tokens
+        self.future = future
+
+
+class AdmissionController(object):
+    """Process-wide gate in front of LLM calls.
+
+    A call is admitted when a concurrency slot is free and the
+    requests-per-minute and tokens-per-minute buckets can pay for it.
+    Waiting calls are served strictly by priority (``interactive`` before
+    ``background``), then in arrival order. A call whose estimated wait
+    exceeds its ``max_wait_s`` is rejected up front with
+    :class:`AdmissionRejected`, and so is one that is still queued when
+    ``max_wait_s`` runs out.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_wait_s: float = 10.0,
+        background_max_wait_s: float = 300.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests = (
+            TokenBucket(requests_per_minute / 60, capacity=requests_per_minute)
+            if requests_per_minute > 0 else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute)
+            if tokens_per_minute > 0 else None
+        )
+        self.max_wait_s = {"interactive": max_wait_s, "background": background_max_wait_s}
+        self._in_flight = 0
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._hold_s: Optional[float] = None
+        self._metrics = {
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "max_queue": 0,
+            "wait_ms_total": 0.0,
+        }
+
+    def _queued(self) -> List[_Waiter]:
+        return [waiter for _, _, waiter in self._queue if not waiter.future.done()]
+
+    def _rate_wait(self, requests: int, tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(requests))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def estimate_wait(self, priority: str, requests: int = 1, tokens: int = 0) -> float:
+        """Rough seconds until a new ``priority`` call would be admitted."""
+        rank = PRIORITIES[priority]
+        ahead = [waiter for waiter in self._queued() if waiter.priority <= rank]
+        wait = self._rate_wait(
+            requests + sum(waiter.requests for waiter in ahead),
+            tokens + sum(waiter.tokens for waiter in ahead),
+        )
+        busy = self._in_flight + len(ahead) - self.max_concurrency
+        if busy >= 0 and self._hold_s is not None:
+            wait = max(wait, (busy // self.max_concurrency + 1) * self._hold_s)
+        return wait
+
+    def _reject(self, message: str, wait_s: float) -> AdmissionRejected:
+        self._metrics["rejected"] += 1
+        return AdmissionRejected(message, retry_after_s=max(1, math.ceil(wait_s)))
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._queue and self._in_flight < self.max_concurrency:
+            waiter = self._queue[0][2]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = self._rate_wait(waiter.requests, waiter.tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            if self.requests is not None:
+                self.requests.take(waiter.requests)
+            if self.tokens is not None and waiter.tokens:
+                self.tokens.take(waiter.tokens)
+            self._in_flight += 1
+            waiter.future.set_result(time.monotonic())
+
+    async def acquire(
+        self,
+        priority: str = "interactive",
+        requests: int = 1,
+        tokens: int = 0,
+        max_wait_s: Optional[float] = None,
+    ) -> float:
+        """Wait for admission and return the admission time for :meth:`release`."""
+        max_wait = self.max_wait_s[priority] if max_wait_s is None else max_wait_s
+        estimate = self.estimate_wait(priority, requests, tokens)
+        if estimate > max_wait:
+            raise self._reject(
+                f"LLM capacity exhausted: estimated wait {estimate:.1f}s exceeds {max_wait:.1f}s",
+                estimate,
+            )
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(PRIORITIES[priority], requests, tokens, loop.create_future())
+        heapq.heappush(self._queue, (waiter.priority, next(self._seq), waiter))
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+        self._metrics["max_queue"] = max(self._metrics["max_queue"], len(self._queue))
+
+        start = time.monotonic()
+        try:
+            done, _ = await asyncio.wait({waiter.future}, timeout=max_wait)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(waiter.future.result())
+            else:
+                waiter.future.cancel()
+            raise
+        if not done:
+            waiter.future.cancel()
+            self._metrics["timed_out"] += 1
+            raise self._reject(
+                f"LLM capacity exhausted: no slot within {max_wait:.1f}s",
+                self.estimate_wait(priority, requests, tokens) or max_wait,
+            )
+
+        self._metrics["admitted"] += 1
+        self._metrics["wait_ms_total"] += (time.monotonic() - start) * 1000
+        return waiter.future.result()
+
+    def release(self, admitted_at: float) -> None:
+        held = time.monotonic() - admitted_at
+        self._hold_s = held if self._hold_s is None else 0.8 * self._hold_s + 0.2 * held
+        self._in_flight -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        priority: str = "interactive",
+        requests: int = 1,
+        tokens: int = 0,
+        max_wait_s: Optional[float] = None,
+    ):
+        admitted_at = await self.acquire(priority, requests, tokens, max_wait_s)
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+
+    def stats(self) -> Dict[str, Any]:
+        queued = self._queued()
+        decided = self._metrics["admitted"] + self._metrics["rejected"]
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": len(queued),
+            "queued_by_priority": {
+                name: sum(1 for waiter in queued if waiter.priority == rank)
+                for name, rank in PRIORITIES.items()
+            },
+            "rejection_rate": self._metrics["rejected"] / decided if decided else 0.0,
+            "avg_wait_ms": (
+                self._metrics["wait_ms_total"] / self._metrics["admitted"]
+                if self._metrics["admitted"] else 0.0
+            ),
+            "avg_hold_ms": self._hold_s * 1000 if self._hold_s is not None else None,
+            **self._metrics,
+        }
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission() -> Optional[AdmissionController]:
+    """The process-wide controller shared by the agent and ingestion, if enabled."""
+    global _controller
+    if not settings.admission.enabled:
+        return None
+    if _controller is None:
+        _controller = AdmissionController(
+            max_concurrency=settings.admission.max_concurrency,
+            requests_per_minute=settings.admission.requests_per_minute,
+            tokens_per_minute=settings.admission.tokens_per_minute,
+            max_wait_s=settings.admission.max_wait_s,
+            background_max_wait_s=settings.admission.background_max_wait_s,
+        )
+    return _controller
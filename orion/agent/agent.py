@@ -1,9 +1,19 @@
+import asyncio
 import re
+import time
+from contextlib import nullcontext
 from langchain_groq import ChatGroq
+from orion.admission import estimate_tokens, get_admission
 from orion.config import settings
-from orion.agent.helper import load_prompt, get_date_and_time
+from orion.deadline import Deadline
+from orion.agent.helper import load_prompt, get_date_and_time, ThinkFilter
 from orion.tools.knowledge import Knowledge
-from orion.agent.history import HistoryStore
+from orion.agent.history import AsyncHistoryStore
+from orion.agent.mcp_pool import build_mcp_pool
+from orion.agent.answer_cache import build_answer_cache
+from orion.agent.summary import build_rolling_summaries
+from orion.agent.scheduler import build_fair_scheduler
+from orion.logging import logger
 
 from langchain_mcp_adapters.client import MultiServerMCPClient  
 
@@ -11,23 +21,70 @@ from langfuse import Langfuse
 from langfuse.langchain import CallbackHandler
 
 from langchain.agents import create_agent
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
 
 class Agent(object):
-    def __init__(self):
-        self.langfuse = Langfuse()
-        self.prompt = load_prompt(settings, self.langfuse)
+    def __init__(self, prompt=None, knowledge=None, langfuse=None, mcp_pool=None, admission=None, scheduler=None):
+        self.langfuse = langfuse if langfuse is not None else Langfuse()
+        self.prompt = prompt if prompt is not None else load_prompt(settings, self.langfuse)
 
         self.model = ChatGroq(
             model=self.prompt["agent"]["config"]["model"],
-            api_key=settings.groq.api_key
+            api_key=settings.groq.api_key,
+            timeout=settings.groq.timeout_s,
         )
 
-        self.knowledge = Knowledge(prompt=self.prompt)
+        self.admission = admission if admission is not None else get_admission()
+        self.scheduler = scheduler if scheduler is not None else build_fair_scheduler()
+        self.knowledge = knowledge if knowledge is not None else Knowledge(prompt=self.prompt)
 
+        self.mcp_pool = mcp_pool if mcp_pool is not None else build_mcp_pool()
         self.graph = None
-        self.history_store = HistoryStore()
+        self._graph_lock = asyncio.Lock()
+        self._refresher = None
+        self._graph_metrics = {"builds": 0, "refresh_errors": 0, "last_built_at": None}
+        self.history_store = AsyncHistoryStore()
+        self.answer_cache = build_answer_cache(self.knowledge.embeddings)
+        self.summaries = build_rolling_summaries(self.history_store, self.summarize_history)
 
-    def get_mcp(self):
+    async def startup(self):
+        if settings.mongodb.ensure_indexes:
+            try:
+                await self.history_store.ensure_indexes()
+            except Exception as e:
+                logger.error("Failed to ensure history indexes", extra={"error": str(e)})
+        await self.history_store.start()
+        if settings.mcp.tools_refresh_s > 0 and not self.local_tools and self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def shutdown(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+        if self.mcp_pool is not None:
+            await self.mcp_pool.close()
+        if self.summaries is not None:
+            await self.summaries.close()
+        await self.history_store.close()
+
+    def get_metrics(self):
+        return {
+            "history": self.history_store.stats(),
+            "graph": dict(self._graph_metrics, ready=self.graph is not None),
+            "mcp": self.mcp_pool.stats() if self.mcp_pool is not None else None,
+            "answer_cache": self.answer_cache.stats() if self.answer_cache is not None else None,
+            "summaries": self.summaries.stats() if self.summaries is not None else None,
+            "admission": self.admission.stats() if self.admission is not None else None,
+            "scheduler": self.scheduler.stats() if self.scheduler is not None else None,
+        }
+
+    @staticmethod
+    def get_mcp():
         client = MultiServerMCPClient(  
             {
                 "knowledge": {
@@ -39,22 +96,66 @@ class Agent(object):
 
         return client
 
-    async def graph_builder(self):
-        mcp_client = self.get_mcp()
-        tools = await mcp_client.get_tools()
+    @staticmethod
+    async def load_tools(mcp_pool=None):
+        if mcp_pool is not None:
+            return await mcp_pool.load_tools()
+        mcp_client = Agent.get_mcp()
+        return await mcp_client.get_tools()
+
+    def build_graph(self, tools):
         graph = create_agent(
             model=self.model,
             tools=tools,
         )
         return graph
 
+    @property
+    def local_tools(self):
+        return settings.mcp.knowledge_tool_mode == "local"
+
+    async def graph_builder(self):
+        if self.local_tools:
+            tools = [self.knowledge.as_tool()]
+        else:
+            tools = await self.load_tools(self.mcp_pool)
+        return self.build_graph(tools)
+
+    def set_graph(self, graph):
+        self.graph = graph
+        self._graph_metrics["builds"] += 1
+        self._graph_metrics["last_built_at"] = time.time()
+
     async def get_graph(self):
         if self.graph is None:
-            self.graph = await self.graph_builder()
+            # Single-flight: a burst of cold requests shares one build.
+            async with self._graph_lock:
+                if self.graph is None:
+                    self.set_graph(await self.graph_builder())
         return self.graph
 
-    def get_history(self, user_id, session_id, order="DESC", offset=0, limit=20):
-        return self.history_store.list(
+    async def refresh_graph(self):
+        """Rebuild the graph with freshly discovered tools and swap it in.
+
+        Runs already holding the previous graph finish on it; new requests pick
+        up the new one without waiting for the rebuild.
+        """
+        try:
+            graph = await self.graph_builder()
+        except Exception as e:
+            self._graph_metrics["refresh_errors"] += 1
+            logger.error("Agent graph refresh failed", extra={"error": str(e)})
+            return False
+        self.set_graph(graph)
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.mcp.tools_refresh_s)
+            await self.refresh_graph()
+
+    async def get_history(self, user_id, session_id, order="DESC", offset=0, limit=20):
+        return await self.history_store.list(
             user_id=user_id,
             session_id=session_id,
             order=order,
@@ -62,32 +163,143 @@ class Agent(object):
             limit=limit,
         )
 
-    async def generate(self, input, session_id, user_id, extra_callbacks=[]):
-        history_message_user = self.history_store.get_history_for_messages(
+    async def get_history_page(
+        self, user_id, session_id, order="DESC", offset=0, limit=20, cursor=None
+    ):
+        return await self.history_store.list_page(
             user_id=user_id,
             session_id=session_id,
-            size=settings.mongodb.history_size,
+            order=order,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
         )
 
-        graph = await self.get_graph() 
+    def admit(self, priority, messages):
+        """Hold a slot of the shared LLM capacity for one agent run or summary."""
+        if self.admission is None:
+            return nullcontext()
+        tokens = sum(estimate_tokens(str(message["content"])) for message in messages)
+        return self.admission.admit(
+            priority,
+            requests=settings.admission.agent_requests if priority == "interactive" else 1,
+            tokens=tokens + settings.admission.output_tokens,
+        )
 
-        result = await graph.ainvoke(
-            {
-                "messages": (
-                    [
-                        {
-                            "role": "system",
-                            "content": self.prompt["agent"]["prompt"].format(
-                                current_date=get_date_and_time()
-                            ),
-                        }
-                    ]
-                    + history_message_user
-                    + [{"role": "user", "content": input}]
-                )
-            },
-            {"callbacks": [CallbackHandler()] + extra_callbacks},
+    def scheduled(self, user_id, input):
+        """Wait for this user's fair share of agent runs."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(user_id, cost=estimate_tokens(input) + settings.admission.output_tokens)
+
+    async def summarize_history(self, text):
+        """Fold conversation text into a summary with the Langfuse ``summary`` prompt."""
+        chain = (
+            PromptTemplate(input_variables=["input"], template=self.prompt["chain"]["prompt"])
+            | self.model
+            | StrOutputParser()
+        ).with_config({"run_name": "history_summary"})
+        async with self.admit("background", [{"content": text}]):
+            summary = await chain.ainvoke({"input": text}, {"callbacks": [CallbackHandler()]})
+        return self.clean_answer(summary)
+
+    async def get_context(self, user_id, session_id):
+        """History messages for the prompt, and their token usage when budgeted."""
+        if self.summaries is None:
+            messages = await self.history_store.get_history_for_messages(
+                user_id=user_id,
+                session_id=session_id,
+                size=settings.mongodb.history_size,
+            )
+            return messages, None
+        context = await self.summaries.prepare(user_id, session_id, settings.mongodb.history_size)
+        logger.info("History context", extra={"session_id": session_id, **context["usage"]})
+        return context["messages"], context["usage"]
+
+    def build_messages(self, input, history_message_user):
+        return (
+            [
+                {
+                    "role": "system",
+                    "content": self.prompt["agent"]["prompt"].format(
+                        current_date=get_date_and_time()
+                    ),
+                }
+            ]
+            + history_message_user
+            + [{"role": "user", "content": input}]
+        )
+
+    @staticmethod
+    def clean_answer(content):
+        return re.sub(r"<think>.*?</think>", "", content.strip(), flags=re.DOTALL)
+
+    def answer_version(self):
+        """What a cached answer depends on besides the question.
+
+        The collection version is local to this process: uploads through other
+        workers only reach the answer cache once its entries expire.
+        """
+        prompts = tuple(
+            getattr(self.prompt[name].get("langfuse_prompt"), "version", None)
+            for name in ("agent", "knowledge", "chain")
+            if name in self.prompt
         )
+        return (getattr(self.knowledge, "collection_version", None), prompts)
+
+    async def _probe_answer_cache(self, input, history_message_user):
+        try:
+            vector = await self.answer_cache.probe(input, history_message_user)
+        except Exception as e:
+            logger.error("Answer cache lookup failed", extra={"error": str(e)})
+            return None, None
+        if vector is None:
+            return None, None
+        return self.answer_cache.lookup(vector, self.answer_version()), vector
+
+    async def generate(self, input, session_id, user_id, extra_callbacks=[]):
+        """Answer ``input`` within ``REQUEST_TIMEOUT_S``.
+
+        Raises :class:`~orion.deadline.DeadlineExceeded` naming the stage that
+        was running when the budget ran out; the run is cancelled, and nothing
+        is saved.
+        """
+        deadline = Deadline(settings.request_timeout_s)
+        return await deadline.run(self._generate(input, session_id, user_id, extra_callbacks, deadline))
+
+    async def _generate(self, input, session_id, user_id, extra_callbacks, deadline):
+        deadline.enter("queue")
+        async with self.scheduled(user_id, input):
+            return await self._run(input, session_id, user_id, extra_callbacks, deadline)
+
+    async def _run(self, input, session_id, user_id, extra_callbacks, deadline):
+        deadline.enter("history_fetch")
+        history_message_user, _ = await self.get_context(user_id, session_id)
+
+        cache_vector = None
+        if self.answer_cache is not None:
+            deadline.enter("answer_cache")
+            cached, cache_vector = await self._probe_answer_cache(input, history_message_user)
+            if cached is not None:
+                deadline.enter("history_save")
+                await self.history_store.save(
+                    user_id=user_id, session_id=session_id, input_text=input, answer=cached["answer"]
+                )
+                return cached["answer"]
+
+        version = self.answer_version()
+        start = time.perf_counter()
+        deadline.enter("graph")
+        graph = await self.get_graph() 
+
+        messages = self.build_messages(input, history_message_user)
+        deadline.enter("admission")
+        async with self.admit("interactive", messages):
+            deadline.enter("graph")
+            result = await graph.ainvoke(
+                {"messages": messages},
+                {"callbacks": [CallbackHandler()] + extra_callbacks},
+            )
 
         if isinstance(result, dict):
             if "messages" in result and result["messages"]:
@@ -101,6 +313,146 @@ class Agent(object):
         else:
             content = str(result)
 
-        answer_text = re.sub(r"<think>.*?</think>", "", content.strip(), flags=re.DOTALL)
-        self.history_store.save(user_id=user_id, session_id=session_id, input_text=input, answer=answer_text)
+        answer_text = self.clean_answer(content)
+        if cache_vector is not None:
+            latency_ms = int((time.perf_counter() - start) * 1000)
+            self.answer_cache.store(input, cache_vector, answer_text, version, latency_ms)
+        deadline.enter("history_save")
+        await self.history_store.save(user_id=user_id, session_id=session_id, input_text=input, answer=answer_text)
         return answer_text
+
+    async def generate_stream(self, input, session_id, user_id, extra_callbacks=[]):
+        """Run the agent and yield ``(event, data)`` pairs as the answer streams.
+
+        Emits ``token`` for visible answer text, ``tool_start``/``tool_end`` for
+        tool progress, and a final ``done`` carrying the full answer and
+        time-to-first-token. The finished turn is saved like :meth:`generate`,
+        under the same deadline.
+        """
+        start = time.perf_counter()
+        deadline = Deadline(settings.request_timeout_s)
+        events = asyncio.Queue(maxsize=64)
+
+        async def produce():
+            try:
+                deadline.enter("queue")
+                async with self.scheduled(user_id, input):
+                    async for item in self._stream(input, session_id, user_id, extra_callbacks, start, deadline):
+                        await events.put(item)
+            except Exception as e:
+                await events.put(e)
+            else:
+                await events.put(None)
+
+        # The run is a task of its own, so the deadline or the client going
+        # away (which closes this generator) cancels it wherever it is.
+        producer = deadline.spawn(produce())
+        try:
+            while (item := await deadline.wait(events.get())) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+
+    async def _stream(self, input, session_id, user_id, extra_callbacks, start, deadline):
+        deadline.enter("history_fetch")
+        history_message_user, context_usage = await self.get_context(user_id, session_id)
+
+        deadline.enter("graph")
+        graph = await self.get_graph()
+
+        # Text streams as it arrives, tagged with its model run. Only a run that
+        # ends without tool calls is the answer; once a run turns out to call a
+        # tool, the client is told to discard whatever it already showed of it.
+        runs, answer = {}, None
+        messages = self.build_messages(input, history_message_user)
+        deadline.enter("admission")
+        async with self.admit("interactive", messages):
+            deadline.enter("graph")
+            async for event in graph.astream_events(
+                {"messages": messages},
+                {"callbacks": [CallbackHandler()] + extra_callbacks},
+                version="v2",
+            ):
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    run = runs.setdefault(event["run_id"], _ModelRun(len(runs)))
+                    chunk = event["data"]["chunk"]
+                    if getattr(chunk, "tool_call_chunks", None) and run.mark_tool_run():
+                        yield "discard", {"run": run.index}
+                    text = run.feed(_chunk_text(chunk))
+                    if text:
+                        run.sent(start, text)
+                        yield "token", {"text": text, "run": run.index}
+                elif kind == "on_chat_model_end":
+                    run = runs.get(event["run_id"])
+                    if run is None:
+                        continue
+                    if getattr(event["data"].get("output"), "tool_calls", None):
+                        if run.mark_tool_run():
+                            yield "discard", {"run": run.index}
+                        continue
+                    text = run.finish()
+                    if text:
+                        run.sent(start, text)
+                        yield "token", {"text": text, "run": run.index}
+                    answer = run
+                elif kind == "on_tool_start":
+                    yield "tool_start", {"name": event["name"], "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    yield "tool_end", {"name": event["name"]}
+
+        raw = answer.raw if answer is not None else ""
+        ttft_ms = answer.ttft_ms if answer is not None else None
+        answer_text = self.clean_answer(raw)
+        deadline.enter("history_save")
+        await self.history_store.save(user_id=user_id, session_id=session_id, input_text=input, answer=answer_text)
+        yield "done", {
+            "answer": answer_text,
+            "session_id": session_id,
+            "latency_ms": int((time.perf_counter() - start) * 1000),
+            "ttft_ms": ttft_ms,
+            "context_tokens": context_usage,
+        }
+
+
+class _ModelRun(object):
+    """Text of one streamed model run, and whether it led to tool calls."""
+
+    def __init__(self, index):
+        self.index = index
+        self.raw = ""
+        self.calls_tools = False
+        self.shown = False
+        self.ttft_ms = None
+        self.think_filter = ThinkFilter()
+
+    def feed(self, chunk):
+        self.raw += chunk
+        text = self.think_filter.feed(chunk)
+        return text if text and not self.calls_tools else ""
+
+    def finish(self):
+        text = self.think_filter.flush()
+        return text if text and not self.calls_tools else ""
+
+    def sent(self, start, text):
+        self.shown = True
+        if self.ttft_ms is None and text.strip():
+            self.ttft_ms = int((time.perf_counter() - start) * 1000)
+
+    def mark_tool_run(self):
+        """Mark the run as a tool-calling one; true if text of it was already sent."""
+        shown = self.shown and not self.calls_tools
+        self.calls_tools = True
+        return shown
+
+
+def _chunk_text(chunk):
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+    )
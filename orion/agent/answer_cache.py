@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from orion.config import settings
+from orion.tools.knowledge import normalize_query
+
+
+class SemanticAnswerCache(object):
+    """Answers to standalone questions, found again by embedding similarity.
+
+    Only questions asked without relevant history are cached or served: with
+    history, the last user turn is embedded and, if it is at least
+    ``relevance_threshold`` similar to the question, the answer may depend on
+    the conversation and the cache stays out of the way.
+
+    Every entry carries a ``version`` (knowledge collection and prompt
+    versions); entries from another version are never served. The collection
+    version counts uploads made by this process only, so after an upload
+    through another worker an entry lives on until ``ttl_s``. Vectors are
+    L2-normalised rows of one float32 matrix, so a lookup is a single
+    matrix-vector product over at most ``max_entries`` rows.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        threshold: float = 0.95,
+        relevance_threshold: float = 0.5,
+        max_entries: int = 2048,
+        ttl_s: Optional[float] = None,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.relevance_threshold = relevance_threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: List[int] = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            "lookups": 0, "hits": 0, "not_standalone": 0, "stores": 0,
+            "evictions": 0, "stale": 0, "saved_latency_ms": 0,
+        }
+
+    async def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(normalize_query(text)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def probe(self, question: str, history: List[Dict[str, str]]) -> Optional[np.ndarray]:
+        """Embed ``question`` if it is standalone; ``None`` means do not cache."""
+        vector = await self._embed(question)
+        previous = next((m["content"] for m in reversed(history) if m["role"] == "user"), None)
+        if previous is not None:
+            if float(vector @ await self._embed(previous)) >= self.relevance_threshold:
+                with self._lock:
+                    self._metrics["not_standalone"] += 1
+                return None
+        return vector
+
+    def _rebuild(self) -> None:
+        self._ids = list(self._entries)
+        self._vectors = (
+            np.stack([self._entries[i]["vector"] for i in self._ids]) if self._ids else None
+        )
+
+    def lookup(self, vector: np.ndarray, version: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._metrics["lookups"] += 1
+            if self._vectors is None:
+                return None
+
+            scores = self._vectors @ vector
+            for index in np.argsort(-scores):
+                if scores[index] < self.threshold:
+                    break
+                entry = self._entries[self._ids[index]]
+                expired = self.ttl_s is not None and entry["created"] + self.ttl_s <= time.monotonic()
+                if entry["version"] != version or expired:
+                    del self._entries[self._ids[index]]
+                    self._metrics["stale"] += 1
+                    continue
+                self._entries.move_to_end(self._ids[index])
+                self._metrics["hits"] += 1
+                self._metrics["saved_latency_ms"] += entry["latency_ms"]
+                result = {
+                    "question": entry["question"],
+                    "answer": entry["answer"],
+                    "similarity": float(scores[index]),
+                    "latency_ms": entry["latency_ms"],
+                }
+                break
+            else:
+                result = None
+
+            if len(self._entries) != len(self._ids):
+                self._rebuild()
+            return result
+
+    def store(self, question: str, vector: np.ndarray, answer: str, version: Hashable, latency_ms: int) -> None:
+        with self._lock:
+            self._entries[self._next_id] = {
+                "question": question,
+                "answer": answer,
+                "vector": vector,
+                "version": version,
+                "latency_ms": latency_ms,
+                "created": time.monotonic(),
+            }
+            self._next_id += 1
+            self._metrics["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+            self._rebuild()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hit_rate": metrics["hits"] / metrics["lookups"] if metrics["lookups"] else 0.0,
+            **metrics,
+        }
+
+
+def build_answer_cache(embeddings) -> Optional[SemanticAnswerCache]:
+    config = settings.answer_cache
+    if not config.enabled:
+        return None
+    return SemanticAnswerCache(
+        embeddings,
+        threshold=config.threshold,
+        relevance_threshold=config.relevance_threshold,
+        max_entries=config.max_entries,
+        ttl_s=config.ttl_s or None,
+    )
@@ -1,3 +1,4 @@
+import asyncio
 from langfuse import Langfuse
 from orion.config import Settings
 import pytz, datetime
@@ -25,6 +26,55 @@ def get_args_schema(prompt):
 
     return schema
 
+class ThinkFilter(object):
+    """Incrementally drop ``<think>...</think>`` spans from streamed text.
+
+    Text that could be the start of a tag is held back until the next chunk
+    decides it, so tags split across chunk boundaries are still removed.
+    """
+
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._inside = False
+
+    @staticmethod
+    def _partial_tag(text, tag):
+        for size in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:size]):
+                return size
+        return 0
+
+    def feed(self, text):
+        self._buffer += text
+        visible = []
+        while self._buffer:
+            tag = self.CLOSE if self._inside else self.OPEN
+            index = self._buffer.find(tag)
+            if index >= 0:
+                if not self._inside:
+                    visible.append(self._buffer[:index])
+                self._buffer = self._buffer[index + len(tag):]
+                self._inside = not self._inside
+                continue
+
+            keep = self._partial_tag(self._buffer, tag)
+            if not self._inside:
+                visible.append(self._buffer[: len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+
+        return "".join(visible)
+
+    def flush(self):
+        rest = "" if self._inside else self._buffer
+        self._buffer = ""
+        self._inside = False
+        return rest
+
+
 def get_timezone():
     timezone = pytz.timezone('Asia/Jakarta')
     return timezone
@@ -38,22 +88,7 @@ def get_date_and_time():
     format_date = "%Y-%m-%d %H:%M:%S"
     return times_area.strftime(format_date)
 
-def load_prompt(settings: Settings, langfuse: Langfuse):
-    system_prompt_loader = langfuse.get_prompt(
-        name=settings.langfuse.system_prompt_name,
-        version=settings.langfuse.system_prompt_version
-    )
-
-    knowledge_loader = langfuse.get_prompt(
-        name=settings.langfuse.knowledge_prompt_name,
-        version=settings.langfuse.knowledge_prompt_version
-    )
-
-    chain_prompt_loader = langfuse.get_prompt(
-        name=settings.langfuse.summary_prompt_name,
-        version=settings.langfuse.summary_prompt_version
-    )
-
+def build_prompt(system_prompt_loader, knowledge_loader, chain_prompt_loader):
     prompt = {
         "agent": {
             "langfuse_prompt": system_prompt_loader,
@@ -72,4 +107,28 @@ def load_prompt(settings: Settings, langfuse: Langfuse):
         }
     }
 
-    return prompt
\ No newline at end of file
+    return prompt
+
+def _prompt_requests(settings: Settings):
+    return [
+        (settings.langfuse.system_prompt_name, settings.langfuse.system_prompt_version),
+        (settings.langfuse.knowledge_prompt_name, settings.langfuse.knowledge_prompt_version),
+        (settings.langfuse.summary_prompt_name, settings.langfuse.summary_prompt_version),
+    ]
+
+def load_prompt(settings: Settings, langfuse: Langfuse):
+    loaders = [
+        langfuse.get_prompt(name=name, version=version)
+        for name, version in _prompt_requests(settings)
+    ]
+    return build_prompt(*loaders)
+
+async def aload_prompt(settings: Settings, langfuse: Langfuse):
+    """Fetch the three Langfuse prompts concurrently."""
+    loaders = await asyncio.gather(
+        *[
+            asyncio.to_thread(langfuse.get_prompt, name=name, version=version)
+            for name, version in _prompt_requests(settings)
+        ]
+    )
+    return build_prompt(*loaders)
@@ -1,12 +1,195 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import binascii
+import json
+import time
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from pymongo.collection import Collection
-from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo import ASCENDING, DESCENDING, AsyncMongoClient, MongoClient, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import BulkWriteError, PyMongoError
+from bson import ObjectId
+from bson.errors import InvalidId
 
+from orion.cache import TTLCache
 from orion.config import settings
+from orion.logging import logger
+
+
+HISTORY_INDEX_NAME = "user_session_created_at"
+HISTORY_INDEX_KEYS = [
+    ("user_id", ASCENDING),
+    ("session_id", ASCENDING),
+    ("created_at", ASCENDING),
+    ("_id", ASCENDING),
+]
+HISTORY_PROJECTION = {
+    "user_id": 1,
+    "session_id": 1,
+    "input": 1,
+    "answer": 1,
+    "created_at": 1,
+}
+
+
+def mongo_client_options() -> Dict[str, Any]:
+    return {
+        "maxPoolSize": settings.mongodb.max_pool_size,
+        "minPoolSize": settings.mongodb.min_pool_size,
+        "maxIdleTimeMS": settings.mongodb.max_idle_time_ms,
+        "serverSelectionTimeoutMS": settings.mongodb.timeout_ms,
+        "connectTimeoutMS": settings.mongodb.timeout_ms,
+    }
+
+
+def _build_document(
+    user_id: str,
+    session_id: str,
+    input_text: str,
+    answer: str,
+    created_at: Optional[datetime],
+) -> Dict[str, Any]:
+    if created_at is None:
+        created_at = datetime.utcnow()
+
+    return {
+        "user_id": user_id,
+        "session_id": session_id,
+        "input": input_text,
+        "answer": answer,
+        "created_at": created_at,
+    }
+
+
+def _history_pipeline(user_id: str, session_id: str, size: int) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"user_id": user_id, "session_id": session_id}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": size},
+        {"$sort": {"created_at": 1}},
+    ]
+
+
+def _bucket_id(user_id: str, session_id: str) -> Dict[str, str]:
+    return {"user_id": user_id, "session_id": session_id}
+
+
+def _bucket_turn(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "_id": document.get("_id"),
+        "input": document["input"],
+        "answer": document["answer"],
+        "created_at": document["created_at"],
+    }
+
+
+def _bucket_update(
+    user_id: str, session_id: str, documents: List[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Append turns to a session bucket, keeping only the newest ``bucket_size``."""
+    return (
+        {"_id": _bucket_id(user_id, session_id)},
+        {
+            "$push": {
+                "turns": {
+                    "$each": [_bucket_turn(document) for document in documents],
+                    "$sort": {"created_at": 1},
+                    "$slice": -settings.mongodb.bucket_size,
+                }
+            },
+            "$set": {"updated_at": datetime.utcnow()},
+        },
+    )
+
+
+def _bucket_pipeline(size: int) -> List[Dict[str, Any]]:
+    return [
+        {"$sort": {"created_at": 1}},
+        {
+            "$group": {
+                "_id": {"user_id": "$user_id", "session_id": "$session_id"},
+                "turns": {
+                    "$push": {
+                        "_id": "$_id",
+                        "input": "$input",
+                        "answer": "$answer",
+                        "created_at": "$created_at",
+                    }
+                },
+            }
+        },
+        {"$project": {"turns": {"$slice": ["$turns", -size]}}},
+    ]
+
+
+def _context_sizeof(entry: Dict[str, Any]) -> int:
+    # Rough footprint: the text dominates, plus a fixed overhead per turn.
+    return sum(
+        len(record["input"]) + len(record["answer"]) + 200 for record in entry["records"]
+    )
+
+
+def _to_messages(records: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+    messages = []
+    for d in records:
+        messages.append({"role": "user", "content": d["input"]})
+        messages.append({"role": "assistant", "content": d["answer"]})
+    return messages
+
+
+def _validate_list_args(order: str, offset: int, limit: Optional[int]) -> None:
+    if order not in {"ASC", "DESC"}:
+        raise ValueError("order must be either 'ASC' or 'DESC'")
+    if offset < 0:
+        raise ValueError("offset must be a non-negative integer")
+    if limit is not None and limit <= 0:
+        raise ValueError("limit must be greater than zero when provided")
+
+
+def encode_cursor(record: Dict[str, Any]) -> str:
+    """Build an opaque pagination cursor pointing just past ``record``."""
+    payload = json.dumps(
+        {"created_at": record["created_at"].isoformat(), "id": str(record["_id"])}
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["created_at"]), ObjectId(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("cursor is invalid")
+
+
+def _page_query(
+    user_id: str, session_id: str, order: str, cursor: Optional[str]
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"user_id": user_id, "session_id": session_id}
+    if cursor is not None:
+        created_at, last_id = decode_cursor(cursor)
+        op = "$gt" if order == "ASC" else "$lt"
+        # Seek past the last returned (created_at, _id) pair instead of skipping.
+        query["$or"] = [
+            {"created_at": {op: created_at}},
+            {"created_at": created_at, "_id": {op: last_id}},
+        ]
+    return query
+
+
+def _to_entry(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": record.get("user_id"),
+        "session_id": record.get("session_id"),
+        "input": record.get("input"),
+        "answer": record.get("answer"),
+        "created_at": record.get("created_at"),
+    }
 
 
 class HistoryStore:
@@ -17,11 +200,45 @@ class HistoryStore:
 
     def _get_collection(self) -> Collection:
         if self._client is None:
-            self._client = MongoClient(settings.mongodb.uri)
+            self._client = MongoClient(settings.mongodb.uri, **mongo_client_options())
 
         database = self._client[settings.mongodb.database]
         return database[settings.mongodb.history_collection]
 
+    def _get_bucket_collection(self) -> Collection:
+        collection = self._get_collection()
+        return collection.database[settings.mongodb.bucket_collection]
+
+    def ensure_indexes(self) -> str:
+        return self._get_collection().create_index(HISTORY_INDEX_KEYS, name=HISTORY_INDEX_NAME)
+
+    def build_buckets(self, batch_size: int = 500) -> int:
+        """Rebuild every session bucket from the per-turn collection."""
+        buckets = self._get_bucket_collection()
+        data = self._get_collection().aggregate(
+            _bucket_pipeline(settings.mongodb.bucket_size), allowDiskUse=True
+        )
+
+        written = 0
+        operations = []
+        for bucket in data:
+            operations.append(
+                UpdateOne(
+                    {"_id": bucket["_id"]},
+                    {"$set": {"turns": bucket["turns"], "updated_at": datetime.utcnow()}},
+                    upsert=True,
+                )
+            )
+            if len(operations) >= batch_size:
+                buckets.bulk_write(operations, ordered=False)
+                written += len(operations)
+                operations = []
+
+        if operations:
+            buckets.bulk_write(operations, ordered=False)
+            written += len(operations)
+        return written
+
     def save(
         self,
         *,
@@ -31,38 +248,22 @@ class HistoryStore:
         answer: str,
         created_at: Optional[datetime] = None,
     ) -> Dict[str, Any]:
-        if created_at is None:
-            created_at = datetime.utcnow()
-
-        document = {
-            "user_id": user_id,
-            "session_id": session_id,
-            "input": input_text,
-            "answer": answer,
-            "created_at": created_at,
-        }
+        document = _build_document(user_id, session_id, input_text, answer, created_at)
 
         collection = self._get_collection()
         collection.insert_one(document)
+        if settings.mongodb.history_layout == "bucketed":
+            self._get_bucket_collection().update_one(
+                *_bucket_update(user_id, session_id, [document]), upsert=True
+            )
         return document
 
     def get_history_for_messages(
             self, user_id: str, session_id: str, size: int
         ):
         collection = self._get_collection()
-        data = collection.aggregate([
-            {"$match": {"user_id": user_id, "session_id": session_id}},
-            {"$sort": {"created_at": -1}},
-            {"$limit": size},
-            {"$sort": {"created_at": 1}}
-        ])
-
-        messages = []
-        for d in data:
-            messages.append({"role": "user", "content": d["input"]})
-            messages.append({"role": "assistant", "content": d["answer"]})
-
-        return messages
+        data = collection.aggregate(_history_pipeline(user_id, session_id, size))
+        return _to_messages(data)
 
     def list(
         self,
@@ -73,12 +274,7 @@ class HistoryStore:
         offset: int = 0,
         limit: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        if order not in {"ASC", "DESC"}:
-            raise ValueError("order must be either 'ASC' or 'DESC'")
-        if offset < 0:
-            raise ValueError("offset must be a non-negative integer")
-        if limit is not None and limit <= 0:
-            raise ValueError("limit must be greater than zero when provided")
+        _validate_list_args(order, offset, limit)
 
         collection = self._get_collection()
         sort_direction = ASCENDING if order == "ASC" else DESCENDING
@@ -88,25 +284,414 @@ class HistoryStore:
                 {
                     "user_id": user_id,
                     "session_id": session_id,
-                }
+                },
+                HISTORY_PROJECTION,
             )
-            .sort("created_at", sort_direction)
+            .sort([("created_at", sort_direction), ("_id", sort_direction)])
             .skip(offset)
         )
         if limit is not None:
             cursor = cursor.limit(limit)
 
-        histories: List[Dict[str, Any]] = []
-        for record in cursor:
-            histories.append(
-                {
-                    "user_id": record.get("user_id"),
-                    "session_id": record.get("session_id"),
-                    "input": record.get("input"),
-                    "answer": record.get("answer"),
-                    "created_at": record.get("created_at"),
+        return [_to_entry(record) for record in cursor]
+
+
+class AsyncHistoryStore:
+    """Non-blocking counterpart of :class:`HistoryStore` for the request path.
+
+    Uses pymongo's native asyncio driver so history reads and writes never hold
+    the event loop while waiting on MongoDB.
+
+    With the ``bucketed`` layout (``MONGODB_HISTORY_LAYOUT=bucketed``) every
+    session also keeps its newest ``bucket_size`` turns in a single bucket
+    document, so fetching the LLM context is one ``_id`` lookup. Per-turn
+    documents are still written for ``/history`` listing.
+
+    Recent context is kept in an in-process LRU+TTL cache keyed by
+    ``(user_id, session_id)`` and updated in place by :meth:`save`. When
+    ``history_cache_verify`` is on, a cached entry is only served after an
+    index-covered probe confirms no other worker has stored a newer turn.
+
+    With ``write_behind`` enabled, :meth:`save` only buffers the turn in memory;
+    buffered turns are written with ``insert_many`` once ``flush_size`` turns are
+    pending, every ``flush_interval_s`` seconds, and on :meth:`close`. Reads of a
+    session merge in its buffered turns so follow-up questions stay consistent.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncMongoClient] = None,
+        write_behind: Optional[bool] = None,
+    ):
+        self._client = client
+        self.write_behind = (
+            settings.mongodb.write_behind if write_behind is None else write_behind
+        )
+        self._pending: List[Dict[str, Any]] = []
+        self._inflight: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._background: set = set()
+        self._context_cache: Optional[TTLCache] = None
+        if settings.mongodb.history_cache_enabled:
+            self._context_cache = TTLCache(
+                max_entries=settings.mongodb.history_cache_entries,
+                ttl_s=settings.mongodb.history_cache_ttl_s,
+                max_bytes=settings.mongodb.history_cache_max_bytes,
+                sizeof=_context_sizeof,
+            )
+        self._metrics = {
+            "flushes": 0,
+            "flushed": 0,
+            "flush_errors": 0,
+            "bucket_errors": 0,
+            "dropped": 0,
+            "last_flush_latency_ms": 0.0,
+            "max_flush_latency_ms": 0.0,
+        }
+
+    def _get_collection(self) -> AsyncCollection:
+        if self._client is None:
+            self._client = AsyncMongoClient(settings.mongodb.uri, **mongo_client_options())
+
+        database = self._client[settings.mongodb.database]
+        return database[settings.mongodb.history_collection]
+
+    def _get_bucket_collection(self) -> AsyncCollection:
+        collection = self._get_collection()
+        return collection.database[settings.mongodb.bucket_collection]
+
+    @property
+    def bucketed(self) -> bool:
+        return settings.mongodb.history_layout == "bucketed"
+
+    async def ensure_indexes(self) -> str:
+        """Create the compound index backing history reads and keyset pagination."""
+        return await self._get_collection().create_index(
+            HISTORY_INDEX_KEYS, name=HISTORY_INDEX_NAME
+        )
+
+    async def start(self) -> None:
+        """Start the periodic flush loop when write-behind is enabled."""
+        if self.write_behind and self._flush_task is None:
+            self._stopping.clear()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            # Let a flush that is already writing finish instead of cancelling it mid-batch.
+            self._stopping.set()
+            await self._flush_task
+            self._flush_task = None
+
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self.flush()
+        if self._pending:
+            logger.error("Dropping unflushed history turns", extra={"count": len(self._pending)})
+            self._metrics["dropped"] += len(self._pending)
+            self._pending = []
+
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.mongodb.flush_interval_s)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("History flush loop failed", extra={"error": str(e)})
+
+    async def flush(self) -> int:
+        """Write every buffered turn to MongoDB and return how many were stored."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, []
+            self._inflight = batch
+            start = time.perf_counter()
+            retry: List[Dict[str, Any]] = []
+            try:
+                await self._get_collection().insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                logger.error("History flush partially failed", extra={"error": str(e)})
+                # Duplicate keys mean the turn already made it in on an earlier attempt.
+                failed = {
+                    error["index"]
+                    for error in e.details.get("writeErrors", [])
+                    if error.get("code") != 11000
                 }
+                retry = [batch[i] for i in sorted(failed)]
+            except PyMongoError as e:
+                logger.error("History flush failed", extra={"error": str(e)})
+                retry = batch
+            except asyncio.CancelledError:
+                # Turns already written are skipped as duplicate keys on the next flush.
+                self._pending = batch + self._pending
+                raise
+            finally:
+                self._inflight = []
+
+            latency_ms = (time.perf_counter() - start) * 1000
+            self._metrics["flushes"] += 1
+            self._metrics["last_flush_latency_ms"] = latency_ms
+            self._metrics["max_flush_latency_ms"] = max(
+                self._metrics["max_flush_latency_ms"], latency_ms
             )
 
-        return histories
+            if retry:
+                self._metrics["flush_errors"] += 1
+                room = max(settings.mongodb.max_pending - len(self._pending), 0)
+                self._metrics["dropped"] += max(len(retry) - room, 0)
+                self._pending = retry[:room] + self._pending
 
+            stored = len(batch) - len(retry)
+            self._metrics["flushed"] += stored
+            if self.bucketed and stored:
+                retrying = {id(document) for document in retry}
+                await self._push_buckets(
+                    [document for document in batch if id(document) not in retrying]
+                )
+            return stored
+
+    async def _push_buckets(self, documents: List[Dict[str, Any]]) -> None:
+        sessions: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for document in documents:
+            key = (document["user_id"], document["session_id"])
+            sessions.setdefault(key, []).append(document)
+
+        operations = [
+            UpdateOne(*_bucket_update(user_id, session_id, turns), upsert=True)
+            for (user_id, session_id), turns in sessions.items()
+        ]
+        try:
+            await self._get_bucket_collection().bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            # Turns are already stored; a stale bucket is repaired by the migration tool.
+            logger.error("History bucket update failed", extra={"error": str(e)})
+            self._metrics["bucket_errors"] += 1
+
+    def _schedule_flush(self) -> None:
+        task = asyncio.create_task(self.flush())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _buffered(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        return [
+            document
+            for document in self._inflight + self._pending
+            if document["user_id"] == user_id and document["session_id"] == session_id
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "write_behind": self.write_behind,
+            "queue_depth": len(self._pending),
+            "inflight": len(self._inflight),
+            **self._metrics,
+            "cache": self._context_cache.stats() if self._context_cache is not None else None,
+        }
+
+    def _cache_turn(self, document: Dict[str, Any]) -> None:
+        if self._context_cache is None:
+            return
+        key = (document["user_id"], document["session_id"])
+        entry = self._context_cache.peek(key)
+        if entry is None:
+            return
+        records = (entry["records"] + [document])[-entry["limit"]:]
+        self._context_cache.set(
+            key,
+            {
+                "records": records,
+                "limit": entry["limit"],
+                "stamp": max(entry["stamp"], document["created_at"]) if entry["stamp"] else document["created_at"],
+            },
+        )
+
+    async def _is_current(self, user_id: str, session_id: str, entry: Dict[str, Any]) -> bool:
+        """Check the version stamp of a cached session against MongoDB."""
+        if not settings.mongodb.history_cache_verify:
+            return True
+        newest = await self._get_collection().find_one(
+            {"user_id": user_id, "session_id": session_id},
+            {"created_at": 1, "_id": 0},
+            sort=[("created_at", DESCENDING), ("_id", DESCENDING)],
+        )
+        if newest is None:
+            return True
+        return entry["stamp"] is not None and newest["created_at"] <= entry["stamp"]
+
+    async def save(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        input_text: str,
+        answer: str,
+        created_at: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        document = _build_document(user_id, session_id, input_text, answer, created_at)
+
+        if not self.write_behind:
+            collection = self._get_collection()
+            await collection.insert_one(document)
+            if self.bucketed:
+                await self._get_bucket_collection().update_one(
+                    *_bucket_update(user_id, session_id, [document]), upsert=True
+                )
+            self._cache_turn(document)
+            return document
+
+        if len(self._pending) >= settings.mongodb.max_pending:
+            # Apply backpressure instead of growing the buffer without bound.
+            await self.flush()
+
+        document["_id"] = ObjectId()
+        self._pending.append(document)
+        self._cache_turn(document)
+        await self.start()
+        if len(self._pending) >= settings.mongodb.flush_size:
+            self._schedule_flush()
+        return document
+
+    async def _recent_records(
+        self, user_id: str, session_id: str, size: int
+    ) -> List[Dict[str, Any]]:
+        if self.bucketed and size <= settings.mongodb.bucket_size:
+            bucket = await self._get_bucket_collection().find_one(
+                {"_id": _bucket_id(user_id, session_id)},
+                {"turns": {"$slice": -size}},
+            )
+            if bucket is not None:
+                return bucket.get("turns", [])
+
+        # Sessions without a bucket (e.g. not migrated yet) use the per-turn rows.
+        collection = self._get_collection()
+        data = await collection.aggregate(_history_pipeline(user_id, session_id, size))
+        return [d async for d in data]
+
+    async def get_history_for_messages(
+            self, user_id: str, session_id: str, size: int
+        ):
+        return _to_messages(await self.get_recent_turns(user_id, session_id, size))
+
+    async def get_recent_turns(
+        self, user_id: str, session_id: str, size: int
+    ) -> List[Dict[str, Any]]:
+        """The newest ``size`` turns of a session, oldest first, as stored records."""
+        key = (user_id, session_id)
+        if self._context_cache is not None:
+            entry = self._context_cache.get(key)
+            if entry is not None and entry["limit"] >= size:
+                if await self._is_current(user_id, session_id, entry):
+                    return entry["records"][-size:]
+                self._context_cache.pop(key)
+
+        records = await self._recent_records(user_id, session_id, size)
+
+        buffered = self._buffered(user_id, session_id)
+        if buffered:
+            seen = {record.get("_id") for record in records}
+            records += [document for document in buffered if document["_id"] not in seen]
+            records.sort(key=lambda record: record["created_at"])
+            records = records[-size:]
+
+        if self._context_cache is not None:
+            stamp = max((record["created_at"] for record in records), default=None)
+            self._context_cache.set(key, {"records": records, "limit": size, "stamp": stamp})
+
+        return records
+
+    def _get_summary_collection(self) -> AsyncCollection:
+        collection = self._get_collection()
+        return collection.database[settings.mongodb.summary_collection]
+
+    async def get_summary(self, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self._get_summary_collection().find_one({"_id": _bucket_id(user_id, session_id)})
+
+    async def save_summary(
+        self, user_id: str, session_id: str, summary: str, covered_until: datetime
+    ) -> Dict[str, Any]:
+        """Store the rolling summary of every turn up to ``covered_until``."""
+        document = {
+            "summary": summary,
+            "covered_until": covered_until,
+            "updated_at": datetime.utcnow(),
+        }
+        await self._get_summary_collection().update_one(
+            {"_id": _bucket_id(user_id, session_id)}, {"$set": document}, upsert=True
+        )
+        return document
+
+    async def list(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        order: str = "DESC",
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        page = await self.list_page(
+            user_id=user_id,
+            session_id=session_id,
+            order=order,
+            offset=offset,
+            limit=limit,
+        )
+        return page["histories"]
+
+    async def list_page(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        order: str = "DESC",
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Return one page of histories plus the cursor for the next page.
+
+        When ``cursor`` is given the page is found by seeking on
+        ``(created_at, _id)`` through the compound index, so every page costs
+        the same regardless of depth. ``offset`` is kept for compatibility.
+        """
+        _validate_list_args(order, offset, limit)
+        if cursor is not None and offset:
+            raise ValueError("offset cannot be combined with cursor")
+
+        if self._buffered(user_id, session_id):
+            await self.flush()
+
+        collection = self._get_collection()
+        sort_direction = ASCENDING if order == "ASC" else DESCENDING
+        results = (
+            collection
+            .find(_page_query(user_id, session_id, order, cursor), HISTORY_PROJECTION)
+            .sort([("created_at", sort_direction), ("_id", sort_direction)])
+            .skip(offset)
+        )
+        if limit is not None:
+            # One extra record tells us whether another page exists.
+            results = results.limit(limit + 1)
+
+        records = [record async for record in results]
+        next_cursor = None
+        if limit is not None and len(records) > limit:
+            records = records[:limit]
+            next_cursor = encode_cursor(records[-1])
+
+        return {
+            "histories": [_to_entry(record) for record in records],
+            "next_cursor": next_cursor,
+        }
@@ -0,0 +1,275 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import anyio
+import httpx
+from langchain_core.tools import StructuredTool, ToolException
+
+from orion.config import settings
+from orion.deadline import tool_stage
+from orion.logging import logger
+
+# Errors that mean the session's connection is gone. Protocol and tool errors
+# (``McpError``, ``ToolException``, ...) belong to a single call and leave the
+# session, and the other calls sharing it, alone.
+TRANSPORT_ERRORS = (
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+
+
+def _default_session_factory(connection):
+    # Imported lazily so the pool can be exercised against a stand-in server.
+    from langchain_mcp_adapters.sessions import create_session
+
+    return create_session(connection)
+
+
+def _result_text(result) -> str:
+    texts = [
+        item.text
+        for item in getattr(result, "content", []) or []
+        if getattr(item, "type", None) == "text"
+    ]
+    text = "\n".join(texts)
+    if getattr(result, "isError", False):
+        raise ToolException(text)
+    return text
+
+
+class _PooledSession(object):
+    def __init__(self, session):
+        self.session = session
+        self.broken = asyncio.Event()
+        self.retired = False
+
+
+class MCPSessionPool(object):
+    """A fixed number of long-lived MCP sessions shared by every tool call.
+
+    Each slot is owned by a keeper task that opens the session, pings it every
+    ``health_interval_s`` seconds and reopens it with exponential backoff when
+    a ping fails or a call hits a transport error. An MCP session multiplexes concurrent requests, so
+    calls are spread round-robin over the healthy sessions without taking one
+    for themselves; callers only wait while no session is connected.
+    """
+
+    def __init__(
+        self,
+        connection: Dict[str, Any],
+        size: int,
+        session_factory: Optional[Callable] = None,
+        health_interval_s: float = 30.0,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+        acquire_timeout_s: Optional[float] = 30.0,
+    ):
+        self.connection = connection
+        self.size = size
+        self._session_factory = session_factory or _default_session_factory
+        self.health_interval_s = health_interval_s
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.acquire_timeout_s = acquire_timeout_s
+
+        self._sessions: Optional[List[_PooledSession]] = None
+        self._available: Optional[asyncio.Event] = None
+        self._next = 0
+        self._in_flight = 0
+        self._keepers: List[asyncio.Task] = []
+        self._closing = False
+        self._healthy = 0
+        self._metrics = {
+            "connects": 0,
+            "connect_ms_total": 0.0,
+            "last_connect_ms": 0.0,
+            "calls": 0,
+            "call_ms_total": 0.0,
+            "acquires": 0,
+            "acquire_wait_ms_total": 0.0,
+            "call_errors": 0,
+            "connect_errors": 0,
+            "health_failures": 0,
+            "reconnects": 0,
+        }
+
+    def start(self) -> None:
+        if self._sessions is not None:
+            return
+        self._closing = False
+        self._sessions = []
+        self._available = asyncio.Event()
+        self._keepers = [asyncio.create_task(self._keep(slot)) for slot in range(self.size)]
+
+    async def close(self) -> None:
+        self._closing = True
+        for keeper in self._keepers:
+            keeper.cancel()
+        await asyncio.gather(*self._keepers, return_exceptions=True)
+        self._keepers = []
+        self._sessions = None
+        self._available = None
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max_s, self.backoff_base_s * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _keep(self, slot: int) -> None:
+        attempt = 0
+        while not self._closing:
+            start = time.perf_counter()
+            try:
+                async with self._session_factory(self.connection) as session:
+                    await session.initialize()
+                    connect_ms = (time.perf_counter() - start) * 1000
+                    self._metrics["connects"] += 1
+                    self._metrics["connect_ms_total"] += connect_ms
+                    self._metrics["last_connect_ms"] = connect_ms
+                    attempt = 0
+
+                    pooled = _PooledSession(session)
+                    self._sessions.append(pooled)
+                    self._available.set()
+                    self._healthy += 1
+                    try:
+                        await self._watch(session, pooled)
+                    finally:
+                        self._healthy -= 1
+                        pooled.retired = True
+                        self._sessions.remove(pooled)
+                        if not self._sessions:
+                            self._available.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._metrics["connect_errors"] += 1
+                logger.error("MCP session failed", extra={"slot": slot, "error": str(e)})
+
+            if self._closing:
+                break
+            attempt += 1
+            self._metrics["reconnects"] += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def _watch(self, session, pooled: _PooledSession) -> None:
+        # On Python < 3.12 ``wait_for`` can swallow the keeper's cancellation when
+        # its timeout fires at the same moment, so the loop checks for close too.
+        while not pooled.broken.is_set() and not self._closing:
+            try:
+                await asyncio.wait_for(pooled.broken.wait(), timeout=self.health_interval_s)
+            except asyncio.TimeoutError:
+                try:
+                    await asyncio.wait_for(session.send_ping(), timeout=self.health_interval_s)
+                except Exception as e:
+                    self._metrics["health_failures"] += 1
+                    logger.error("MCP session health check failed", extra={"error": str(e)})
+                    pooled.broken.set()
+
+    def _pick(self) -> Optional[_PooledSession]:
+        healthy = [pooled for pooled in self._sessions if not pooled.broken.is_set()]
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    async def _healthy_session(self) -> _PooledSession:
+        while True:
+            pooled = self._pick()
+            if pooled is not None:
+                return pooled
+            await self._available.wait()
+            if self._pick() is None:
+                # Every listed session is broken and about to be reopened by its keeper.
+                await asyncio.sleep(self.backoff_base_s)
+
+    @asynccontextmanager
+    async def session(self):
+        """Use the next healthy session, shared with other calls, for one call."""
+        self.start()
+        start = time.perf_counter()
+        pooled = await asyncio.wait_for(self._healthy_session(), timeout=self.acquire_timeout_s)
+        self._metrics["acquires"] += 1
+        self._metrics["acquire_wait_ms_total"] += (time.perf_counter() - start) * 1000
+
+        self._in_flight += 1
+        try:
+            yield pooled.session
+        except TRANSPORT_ERRORS:
+            # The keeper reconnects this slot; the caller sees the original error.
+            pooled.broken.set()
+            raise
+        finally:
+            self._in_flight -= 1
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        async with self.session() as session:
+            start = time.perf_counter()
+            try:
+                return await session.call_tool(name, arguments)
+            except Exception:
+                self._metrics["call_errors"] += 1
+                raise
+            finally:
+                self._metrics["calls"] += 1
+                self._metrics["call_ms_total"] += (time.perf_counter() - start) * 1000
+
+    async def list_tools(self) -> list:
+        tools, cursor = [], None
+        async with self.session() as session:
+            while True:
+                page = await session.list_tools(cursor=cursor)
+                tools.extend(page.tools)
+                cursor = getattr(page, "nextCursor", None)
+                if not cursor:
+                    return tools
+
+    def _to_langchain_tool(self, tool) -> StructuredTool:
+        async def call(**arguments):
+            with tool_stage(tool.name):
+                result = await self.call_tool(tool.name, arguments)
+            return _result_text(result)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description or "",
+            args_schema=tool.inputSchema,
+            coroutine=call,
+        )
+
+    async def load_tools(self) -> List[StructuredTool]:
+        return [self._to_langchain_tool(tool) for tool in await self.list_tools()]
+
+    def stats(self) -> Dict[str, Any]:
+        connects = self._metrics["connects"]
+        calls = self._metrics["calls"]
+        acquires = self._metrics["acquires"]
+        return {
+            "size": self.size,
+            "healthy": self._healthy,
+            "in_flight": self._in_flight,
+            "avg_connect_ms": self._metrics["connect_ms_total"] / connects if connects else 0.0,
+            "avg_call_ms": self._metrics["call_ms_total"] / calls if calls else 0.0,
+            "avg_acquire_wait_ms": self._metrics["acquire_wait_ms_total"] / acquires if acquires else 0.0,
+            **self._metrics,
+        }
+
+
+def build_mcp_pool() -> Optional[MCPSessionPool]:
+    if settings.mcp.knowledge_tool_mode != "mcp" or settings.mcp.pool_size <= 0:
+        return None
+    return MCPSessionPool(
+        connection={
+            "transport": settings.mcp.mcp_knowledge_transport,
+            "url": settings.mcp.mcp_knowledge_url,
+        },
+        size=settings.mcp.pool_size,
+        health_interval_s=settings.mcp.health_interval_s,
+        backoff_max_s=settings.mcp.reconnect_max_s,
+        acquire_timeout_s=settings.mcp.acquire_timeout_s,
+    )
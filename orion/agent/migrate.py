@@ -0,0 +1,37 @@
+"""One-off maintenance tasks for the history collections.
+
+Usage:
+    python -m orion.agent.migrate indexes
+    python -m orion.agent.migrate buckets
+"""
+
+import argparse
+
+from orion.agent.history import HistoryStore
+from orion.logging import logger
+
+
+def create_indexes(store: HistoryStore) -> None:
+    name = store.ensure_indexes()
+    logger.info(f"History index ready: {name}")
+
+
+def create_buckets(store: HistoryStore) -> None:
+    written = store.build_buckets()
+    logger.info(f"History buckets rebuilt: {written}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Orion history migrations")
+    parser.add_argument("task", choices=["indexes", "buckets"])
+    args = parser.parse_args(argv)
+
+    store = HistoryStore()
+    if args.task == "indexes":
+        create_indexes(store)
+    elif args.task == "buckets":
+        create_buckets(store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from orion.admission import AdmissionRejected
+from orion.config import settings
+
+
+class UserQueueFull(AdmissionRejected):
+    """The user already has ``user_queue`` agent runs waiting."""
+
+
+class _Tenant(object):
+    __slots__ = ("queue", "deficit", "in_flight")
+
+    def __init__(self):
+        self.queue: Deque[Tuple[int, asyncio.Future]] = deque()
+        self.deficit = 0
+        self.in_flight = 0
+
+
+class FairScheduler(object):
+    """Deficit round-robin over ``user_id`` in front of agent runs.
+
+    Each user has its own FIFO queue. Users with waiting runs take turns:
+    on its turn a user is credited ``quantum`` estimated tokens and starts
+    runs while its credit covers their cost, so every active user gets an
+    equal share of the ``max_concurrency`` slots however many runs it
+    queues. A user never has more than ``user_concurrency`` runs in flight
+    or ``user_queue`` waiting; further runs are rejected with
+    :class:`UserQueueFull`. A run still queued after ``max_wait_s`` is
+    rejected with :class:`AdmissionRejected`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        user_concurrency: int = 2,
+        user_queue: int = 20,
+        quantum: int = 1024,
+        max_wait_s: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.user_concurrency = user_concurrency
+        self.user_queue = user_queue
+        self.quantum = quantum
+        self.max_wait_s = max_wait_s
+        self._users: Dict[str, _Tenant] = {}
+        self._ring: Deque[str] = deque()
+        self._in_flight = 0
+        self._hold_s: Optional[float] = None
+        self._metrics = {
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "max_queue": 0,
+            "wait_ms_total": 0.0,
+        }
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self.max_concurrency and self._ring:
+            progressed = False
+            for _ in range(len(self._ring)):
+                user_id = self._ring[0]
+                tenant = self._users[user_id]
+                if tenant.in_flight >= self.user_concurrency:
+                    self._ring.rotate(-1)
+                    continue
+                cost, future = tenant.queue[0]
+                progressed = True
+                if tenant.deficit < cost:
+                    tenant.deficit += self.quantum
+                    self._ring.rotate(-1)
+                    continue
+                tenant.queue.popleft()
+                tenant.deficit -= cost
+                tenant.in_flight += 1
+                self._in_flight += 1
+                future.set_result(time.monotonic())
+                if not tenant.queue:
+                    self._ring.popleft()
+                    tenant.deficit = 0
+                break
+            if not progressed:
+                # Every user with queued runs is at its own concurrency cap.
+                return
+
+    def _forget(self, user_id: str) -> None:
+        tenant = self._users.get(user_id)
+        if tenant is not None and not tenant.queue and not tenant.in_flight:
+            del self._users[user_id]
+
+    def _withdraw(self, user_id: str, entry: Tuple[int, asyncio.Future]) -> None:
+        tenant = self._users[user_id]
+        tenant.queue.remove(entry)
+        if not tenant.queue:
+            self._ring.remove(user_id)
+            tenant.deficit = 0
+        self._forget(user_id)
+
+    def _retry_after(self, queued: int) -> int:
+        hold = self._hold_s if self._hold_s is not None else 1.0
+        return max(1, math.ceil(hold * (queued + 1) / self.user_concurrency))
+
+    async def acquire(self, user_id: str, cost: int = 1) -> float:
+        """Wait for this user's turn and return the start time for :meth:`release`."""
+        tenant = self._users.setdefault(user_id, _Tenant())
+        if len(tenant.queue) >= self.user_queue:
+            self._metrics["rejected"] += 1
+            raise UserQueueFull(
+                f"user {user_id} already has {len(tenant.queue)} requests waiting",
+                retry_after_s=self._retry_after(len(tenant.queue)),
+            )
+
+        entry = (cost, asyncio.get_running_loop().create_future())
+        if not tenant.queue:
+            self._ring.append(user_id)
+        tenant.queue.append(entry)
+        self._dispatch()
+        self._metrics["max_queue"] = max(
+            self._metrics["max_queue"], sum(len(t.queue) for t in self._users.values())
+        )
+
+        future = entry[1]
+        start = time.monotonic()
+        try:
+            done, _ = await asyncio.wait({future}, timeout=self.max_wait_s)
+        except asyncio.CancelledError:
+            if future.done():
+                self.release(user_id, future.result())
+            else:
+                future.cancel()
+                self._withdraw(user_id, entry)
+            raise
+        if not done:
+            future.cancel()
+            self._withdraw(user_id, entry)
+            self._metrics["timed_out"] += 1
+            self._metrics["rejected"] += 1
+            raise AdmissionRejected(
+                f"agent capacity exhausted: no slot within {self.max_wait_s:.1f}s",
+                retry_after_s=self._retry_after(0),
+            )
+
+        self._metrics["admitted"] += 1
+        self._metrics["wait_ms_total"] += (time.monotonic() - start) * 1000
+        return future.result()
+
+    def release(self, user_id: str, started_at: float) -> None:
+        held = time.monotonic() - started_at
+        self._hold_s = held if self._hold_s is None else 0.8 * self._hold_s + 0.2 * held
+        self._users[user_id].in_flight -= 1
+        self._in_flight -= 1
+        self._forget(user_id)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, cost: int = 1):
+        started_at = await self.acquire(user_id, cost)
+        try:
+            yield
+        finally:
+            self.release(user_id, started_at)
+
+    def stats(self, top: int = 5) -> Dict[str, Any]:
+        busiest = sorted(
+            self._users.items(), key=lambda item: (len(item[1].queue), item[1].in_flight), reverse=True
+        )[:top]
+        decided = self._metrics["admitted"] + self._metrics["rejected"]
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "users": len(self._users),
+            "queued": sum(len(tenant.queue) for tenant in self._users.values()),
+            "busiest_users": [
+                {"user_id": user_id, "in_flight": tenant.in_flight, "queued": len(tenant.queue)}
+                for user_id, tenant in busiest
+            ],
+            "rejection_rate": self._metrics["rejected"] / decided if decided else 0.0,
+            "avg_wait_ms": (
+                self._metrics["wait_ms_total"] / self._metrics["admitted"]
+                if self._metrics["admitted"] else 0.0
+            ),
+            "avg_hold_ms": self._hold_s * 1000 if self._hold_s is not None else None,
+            **self._metrics,
+        }
+
+
+def build_fair_scheduler() -> Optional[FairScheduler]:
+    config = settings.scheduler
+    if not config.enabled:
+        return None
+    return FairScheduler(
+        max_concurrency=config.max_concurrency,
+        user_concurrency=config.user_concurrency,
+        user_queue=config.user_queue,
+        quantum=config.quantum_tokens,
+        max_wait_s=config.max_wait_s,
+    )
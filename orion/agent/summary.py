@@ -0,0 +1,167 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from orion.admission import estimate_tokens
+from orion.agent.history import _to_messages
+from orion.cache import TTLCache
+from orion.config import settings
+from orion.logging import logger
+
+# Least each side of a turn is cut to while it waits for a covering summary.
+MIN_PENDING_TURN_TOKENS = 32
+
+
+def _turn_tokens(record: Dict[str, Any]) -> int:
+    return estimate_tokens(record["input"]) + estimate_tokens(record["answer"])
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = tokens * 4
+    return text if len(text) <= limit else text[:limit].rstrip() + " …"
+
+
+def _transcript(records: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"User: {r['input']}\nAssistant: {r['answer']}" for r in records)
+
+
+class RollingSummaries(object):
+    """Keep the history sent to the LLM within ``budget_tokens``.
+
+    The newest turns that fit the budget (after the summary) are sent
+    verbatim, and always the last one. Older turns of the window that the
+    stored summary does not cover yet are folded into it in the background,
+    one task per session, by ``summarize``. When the window is full its oldest turn is always
+    folded, so every turn is summarised before it slides out of the window.
+    Only turns the stored summary covers are left out of the prompt; turns
+    still being folded are sent too, cut down to share what is left of the
+    budget, until a summary covering them is stored.
+    """
+
+    def __init__(
+        self,
+        history_store,
+        summarize: Callable[[str], Awaitable[str]],
+        budget_tokens: int,
+        cache_entries: int = 1000,
+    ):
+        self.history_store = history_store
+        self.summarize = summarize
+        self.budget_tokens = budget_tokens
+        self._summaries = TTLCache(cache_entries)
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._metrics = {
+            "requests": 0,
+            "tokens_sent": 0,
+            "tokens_saved": 0,
+            "summaries": 0,
+            "summary_errors": 0,
+            "folded_turns": 0,
+        }
+
+    async def _summary(self, user_id: str, session_id: str) -> Dict[str, Any]:
+        key = (user_id, session_id)
+        entry = self._summaries.get(key)
+        if entry is None:
+            entry = await self.history_store.get_summary(user_id, session_id) or {}
+            self._summaries.set(key, entry)
+        return entry
+
+    async def prepare(self, user_id: str, session_id: str, size: int) -> Dict[str, Any]:
+        """Return the history messages for the prompt and their token usage."""
+        records, entry = await asyncio.gather(
+            self.history_store.get_recent_turns(user_id, session_id, size),
+            self._summary(user_id, session_id),
+        )
+        summary = entry.get("summary") or ""
+        covered_until = entry.get("covered_until")
+        pending = [
+            record for record in records
+            if covered_until is None or record["created_at"] > covered_until
+        ]
+
+        max_recent = size - 1 if len(records) >= size else len(pending)
+        budget = self.budget_tokens - (estimate_tokens(summary) if summary else 0)
+        recent, used = [], 0
+        for record in reversed(pending):
+            tokens = _turn_tokens(record)
+            # The newest turn is always kept: follow-ups most often refer to it.
+            if len(recent) >= max_recent or (recent and used + tokens > budget):
+                break
+            recent.append(record)
+            used += tokens
+        recent.reverse()
+
+        folded = pending[: len(pending) - len(recent)]
+        shortened = []
+        if folded:
+            self._schedule(user_id, session_id, summary, folded)
+            share = max((budget - used) // (2 * len(folded)), MIN_PENDING_TURN_TOKENS)
+            shortened = [
+                dict(record, input=_truncate(record["input"], share), answer=_truncate(record["answer"], share))
+                for record in folded
+            ]
+
+        messages = _to_messages(shortened + recent)
+        if summary:
+            messages.insert(
+                0, {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+            )
+        sent = sum(estimate_tokens(message["content"]) for message in messages)
+        verbatim = sum(_turn_tokens(record) for record in records)
+        usage = {
+            "tokens_sent": sent,
+            "tokens_saved": max(verbatim - sent, 0),
+            "recent_turns": len(recent),
+            "folded_turns": len(folded),
+        }
+        self._metrics["requests"] += 1
+        self._metrics["tokens_sent"] += usage["tokens_sent"]
+        self._metrics["tokens_saved"] += usage["tokens_saved"]
+        return {"messages": messages, "usage": usage}
+
+    def _schedule(self, user_id: str, session_id: str, summary: str, turns: List[Dict[str, Any]]) -> None:
+        key = (user_id, session_id)
+        if key in self._tasks:
+            # A fold is already running; whatever it misses is picked up next turn.
+            return
+        task = asyncio.create_task(self._fold(key, summary, turns))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def _fold(self, key: Tuple[str, str], summary: str, turns: List[Dict[str, Any]]) -> None:
+        text = (f"Previous summary:\n{summary}\n\n" if summary else "") + (
+            f"Conversation:\n{_transcript(turns)}"
+        )
+        covered_until = turns[-1]["created_at"]
+        try:
+            updated = await self.summarize(text)
+            await self.history_store.save_summary(*key, updated, covered_until)
+        except Exception as e:
+            logger.error("History summary failed", extra={"error": str(e)})
+            self._metrics["summary_errors"] += 1
+            return
+        self._summaries.set(key, {"summary": updated, "covered_until": covered_until})
+        self._metrics["summaries"] += 1
+        self._metrics["folded_turns"] += len(turns)
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_tokens": self.budget_tokens,
+            "running": len(self._tasks),
+            **self._metrics,
+        }
+
+
+def build_rolling_summaries(history_store, summarize) -> Optional[RollingSummaries]:
+    if settings.mongodb.history_token_budget <= 0:
+        return None
+    return RollingSummaries(
+        history_store,
+        summarize,
+        budget_tokens=settings.mongodb.history_token_budget,
+        cache_entries=settings.mongodb.summary_cache_entries,
+    )
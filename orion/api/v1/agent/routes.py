@@ -1,16 +1,22 @@
 import asyncio
+import json
 import time
 import uuid
 from datetime import datetime
-from typing import List, Literal
-from fastapi import APIRouter, HTTPException, Query, Request
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from orion.admission import AdmissionRejected
 from orion.agent.agent import Agent
+from orion.agent.scheduler import UserQueueFull
+from orion.api.v1.deps import get_agent
+from orion.deadline import DeadlineExceeded
 from orion.logging import logger
 
 router = APIRouter(prefix="/v1/agent", tags=["agent"])
 
-_agent = Agent()
+DISCONNECT_POLL_S = 0.5
 
 class GenerateRequest(BaseModel):
     input: str = Field(..., description="Question")
@@ -33,22 +39,30 @@ class HistoryEntry(BaseModel):
 
 class HistoryResponse(BaseModel):
     histories: List[HistoryEntry]
+    next_cursor: Optional[str] = None
 
 @router.get("/health")
 async def health_check():
     return {"status": "ok", "service": "orion-agent", "version": "v1"}
 
+@router.get("/metrics")
+async def metrics(agent: Agent = Depends(get_agent)):
+    return agent.get_metrics()
+
 @router.post("/generate", response_model=GenerateResponse)
-async def generate_response(req: Request, payload: GenerateRequest):
+async def generate_response(req: Request, payload: GenerateRequest, agent: Agent = Depends(get_agent)):
     request_id = str(uuid.uuid4())
     start = time.perf_counter()
 
     try:
         # JANGAN pakai asyncio.to_thread untuk fungsi async
-        answer = await _agent.generate(
-            input=payload.input,
-            session_id=payload.session_id,
-            user_id=payload.user_id,
+        answer = await _cancel_on_disconnect(
+            req,
+            agent.generate(
+                input=payload.input,
+                session_id=payload.session_id,
+                user_id=payload.user_id,
+            ),
         )
 
         latency_ms = int((time.perf_counter() - start) * 1000)
@@ -59,6 +73,21 @@ async def generate_response(req: Request, payload: GenerateRequest):
             session_id=payload.session_id,
             latency_ms=latency_ms,
         )
+    except ClientDisconnected:
+        logger.warning("Agent cancelled: client disconnected", extra={"request_id": request_id})
+        raise HTTPException(
+            status_code=499,
+            detail={"message": "Client disconnected", "request_id": request_id},
+        )
+    except DeadlineExceeded as e:
+        logger.error("Agent timed out", extra={"request_id": request_id, "stage": e.stage})
+        raise _timed_out(e, request_id)
+    except UserQueueFull as e:
+        logger.warning("Agent user throttled", extra={"request_id": request_id, "error": str(e)})
+        raise _throttled(e, request_id)
+    except AdmissionRejected as e:
+        logger.warning("Agent shed", extra={"request_id": request_id, "error": str(e)})
+        raise _overloaded(e, request_id)
     except Exception as e:
         latency_ms = int((time.perf_counter() - start) * 1000)
         logger.error("Agent failed", extra={"request_id": request_id})
@@ -68,6 +97,122 @@ async def generate_response(req: Request, payload: GenerateRequest):
         )
 
 
+class ClientDisconnected(Exception):
+    pass
+
+
+async def _cancel_on_disconnect(request, coro):
+    """Await ``coro``, cancelling it if the client goes away first."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        task.cancel()
+
+
+def _timed_out(error, request_id):
+    return HTTPException(
+        status_code=504,
+        detail={
+            "message": f"Agent timed out during {error.stage}",
+            "stage": error.stage,
+            "error": str(error),
+            "request_id": request_id,
+        },
+    )
+
+
+def _overloaded(error, request_id):
+    return HTTPException(
+        status_code=503,
+        detail={"message": "Agent is overloaded", "error": str(error), "request_id": request_id},
+        headers={"Retry-After": str(error.retry_after_s)},
+    )
+
+
+def _throttled(error, request_id):
+    return HTTPException(
+        status_code=429,
+        detail={"message": "Too many requests for this user", "error": str(error), "request_id": request_id},
+        headers={"Retry-After": str(error.retry_after_s)},
+    )
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/generate/stream")
+async def generate_stream(req: Request, payload: GenerateRequest, agent: Agent = Depends(get_agent)):
+    request_id = str(uuid.uuid4())
+    stream = agent.generate_stream(
+        input=payload.input,
+        session_id=payload.session_id,
+        user_id=payload.user_id,
+    )
+
+    # Wait for the first event before answering, so load shedding is still a 503.
+    try:
+        first = await _cancel_on_disconnect(req, stream.__anext__())
+    except ClientDisconnected:
+        logger.warning("Agent stream cancelled: client disconnected", extra={"request_id": request_id})
+        raise HTTPException(
+            status_code=499,
+            detail={"message": "Client disconnected", "request_id": request_id},
+        )
+    except DeadlineExceeded as e:
+        logger.error("Agent stream timed out", extra={"request_id": request_id, "stage": e.stage})
+        raise _timed_out(e, request_id)
+    except UserQueueFull as e:
+        logger.warning("Agent stream user throttled", extra={"request_id": request_id, "error": str(e)})
+        raise _throttled(e, request_id)
+    except AdmissionRejected as e:
+        logger.warning("Agent stream shed", extra={"request_id": request_id, "error": str(e)})
+        raise _overloaded(e, request_id)
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        first = e
+
+    async def replay():
+        if isinstance(first, Exception):
+            raise first
+        if first is not None:
+            yield first
+            async for item in stream:
+                yield item
+
+    async def events():
+        try:
+            async for event, data in replay():
+                if event == "done":
+                    data = {**data, "request_id": request_id}
+                    logger.info("Agent stream success", extra={"request_id": request_id, "ttft_ms": data.get("ttft_ms")})
+                yield _sse(event, data)
+        except DeadlineExceeded as e:
+            logger.error("Agent stream timed out", extra={"request_id": request_id, "stage": e.stage})
+            yield _sse("error", {
+                "message": f"Agent timed out during {e.stage}",
+                "stage": e.stage,
+                "error": str(e),
+                "request_id": request_id,
+            })
+        except Exception as e:
+            logger.error("Agent stream failed", extra={"request_id": request_id})
+            yield _sse("error", {"message": "Agent failed", "error": str(e), "request_id": request_id})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/history", response_model=HistoryResponse)
 async def get_history(
     user_id: str,
@@ -86,22 +231,30 @@ async def get_history(
         ge=1,
         description="Maximum number of history records to return.",
     ),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Opaque cursor from a previous response's `next_cursor`; fetches the page after it.",
+    ),
+    agent: Agent = Depends(get_agent),
 ):
     request_id = str(uuid.uuid4())
     start = time.perf_counter()
 
     try:
-        histories = await asyncio.to_thread(
-            _agent.get_history,
+        page = await agent.get_history_page(
             user_id=user_id,
             session_id=session_id,
             order=order,
             offset=offset,
             limit=limit,
+            cursor=cursor,
         )
         latency_ms = int((time.perf_counter() - start) * 1000)
         logger.info("Fetch history success", extra={"request_id": request_id, "latency_ms": latency_ms})
-        return HistoryResponse(histories=histories)
+        return HistoryResponse(histories=page["histories"], next_cursor=page["next_cursor"])
+    except ValueError as ve:
+        logger.error("Fetch history failed", extra={"request_id": request_id, "error": str(ve)})
+        raise HTTPException(status_code=400, detail={"message": "Invalid history request", "error": str(ve), "request_id": request_id})
     except Exception as e:
         latency_ms = int((time.perf_counter() - start) * 1000)
         logger.error("Fetch history failed", extra={"request_id": request_id, "latency_ms": latency_ms})
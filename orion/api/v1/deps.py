@@ -0,0 +1,28 @@
+from fastapi import HTTPException, Request, status
+
+
+async def get_services(request: Request):
+    services = request.app.state.services
+    try:
+        await services.wait_ready()
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"message": "Service unavailable", "error": str(e)},
+        )
+    return services
+
+
+async def get_agent(request: Request):
+    services = await get_services(request)
+    return services.agent
+
+
+async def get_knowledge(request: Request):
+    services = await get_services(request)
+    return services.knowledge
+
+
+async def get_jobs(request: Request):
+    services = await get_services(request)
+    return services.jobs
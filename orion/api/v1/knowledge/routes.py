@@ -1,41 +1,115 @@
-import asyncio
 import uuid
-from typing import List, Dict, Optional
-from fastapi import APIRouter, HTTPException, Query
+from typing import Any, List, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, HttpUrl
 
-from orion.agent.agent import Agent
+from orion.api.v1.deps import get_jobs, get_knowledge
 from orion.logging import logger
+from orion.tools.jobs import IngestionJobs, JobQueueFull
+from orion.tools.knowledge import Knowledge
 
 router = APIRouter(prefix="/v1/knowledge", tags=["knowledge"])
 
-_knowledge = Agent().knowledge
-
 class UploadLinksRequest(BaseModel):
     links: List[HttpUrl] = Field(..., description="List URL")
 
 class UploadLinksResponse(BaseModel):
     skipped: List[HttpUrl] = Field(default_factory=list)
     processed: List[HttpUrl] = Field(default_factory=list)
+    failed: Dict[str, str] = Field(default_factory=dict, description="Link -> stage and error")
     counts: Dict[str, int]
+    stages: Optional[Dict[str, Dict[str, Any]]] = None
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    links: int
+
+class LinkProgress(BaseModel):
+    link: str
+    status: str
+    stage: Optional[str] = None
+    chunks: Optional[int] = None
+    error: Optional[str] = None
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    progress: List[LinkProgress] = Field(default_factory=list)
+    stages: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    timings_ms: Dict[str, Optional[int]] = Field(default_factory=dict)
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+class QueryRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    top_k: Optional[int] = Field(None, ge=1, le=100)
+    score_threshold: Optional[float] = None
 
 class QueryResponse(BaseModel):
     context: str
+    cached: bool = False
 
 @router.get("/health")
 async def health_check():
     return {"status": "ok", "service": "knowledge", "version": "v1"}
 
-@router.post("/upload-link", response_model=UploadLinksResponse)
-async def upload_link(payload: UploadLinksRequest):
+@router.get("/metrics")
+async def metrics(knowledge: Knowledge = Depends(get_knowledge), jobs: IngestionJobs = Depends(get_jobs)):
+    return {
+        "embedding_cache": knowledge.embedding_stats(),
+        "embedding_client": knowledge.embedding_client_stats(),
+        "query_cache": knowledge.query_stats(),
+        "jobs": jobs.stats(),
+    }
+
+@router.post("/query", response_model=QueryResponse)
+async def query(payload: QueryRequest, knowledge: Knowledge = Depends(get_knowledge)):
+    request_id = str(uuid.uuid4())
+    try:
+        result = await knowledge.aquery(
+            payload.query, k=payload.top_k, score_threshold=payload.score_threshold
+        )
+    except Exception as e:
+        logger.error("Query failed", extra={"error": str(e), "request_id": request_id})
+        raise HTTPException(status_code=500, detail={"message": "Unexpected error", "error": str(e), "request_id": request_id})
+
+    return QueryResponse(context=result["context"], cached=result["cached"])
+
+@router.post(
+    "/upload-link",
+    response_model=UploadLinksResponse,
+    responses={202: {"model": JobAccepted}, 429: {"description": "Ingestion queue is full"}},
+)
+async def upload_link(
+    payload: UploadLinksRequest,
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    knowledge: Knowledge = Depends(get_knowledge),
+    jobs: IngestionJobs = Depends(get_jobs),
+):
     
     request_id = str(uuid.uuid4())
     # remove duplicate
     unique_links = list(dict.fromkeys([str(u) for u in payload.links]))
 
+    if mode == "async":
+        try:
+            job = await jobs.submit(unique_links)
+        except JobQueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail={"message": "Ingestion queue is full", "error": str(e)},
+                headers={"Retry-After": "30"},
+            )
+        logger.info("Upload job queued", extra={"request_id": request_id, "job_id": job["job_id"]})
+        accepted = JobAccepted(job_id=job["job_id"], status=job["status"], links=len(unique_links))
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=accepted.model_dump())
+
     try:
-        result = await asyncio.to_thread(_knowledge.upload_link, unique_links)
-        logger.info("Upload success", extra={"request_id": request_id})
+        result = await knowledge.aupload_link(unique_links, raise_on_failure=False)
     except ValueError as ve:
         logger.error("Upload failed", extra={"error": str(ve)})
         raise HTTPException(status_code=400, detail={"message": "Upload failed", "error": str(ve), "request_id": request_id})
@@ -44,15 +118,46 @@ async def upload_link(payload: UploadLinksRequest):
         raise HTTPException(status_code=500, detail={"message": "Unexpected error", "error": str(e), "request_id": request_id})
 
     skipped_links = result.get("exists", [])
-    processed_links = result.get("not_exists", [])
+    failed_links = result.get("failed") or {}
+    processed_links = [link for link in result.get("not_exists", []) if link not in failed_links]
+
+    if failed_links and not processed_links:
+        logger.error("Upload failed", extra={"request_id": request_id, "failed": failed_links})
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Upload failed", "failed": failed_links, "request_id": request_id},
+        )
+    logger.info("Upload success", extra={"request_id": request_id, "failed": len(failed_links)})
 
     return UploadLinksResponse(
         skipped=skipped_links,
         processed=processed_links,
+        failed=failed_links,
         counts={
             "skipped": len(skipped_links),
             "processed": len(processed_links),
+            "failed": len(failed_links),
             "total_input": len(payload.links),
             "total_unique": len(unique_links),
         },
+        stages=result.get("stages"),
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, jobs: IngestionJobs = Depends(get_jobs)):
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail={"message": "Job not found", "job_id": job_id})
+
+    return JobResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        progress=[LinkProgress(link=link, **entry) for link, entry in job["progress"].items()],
+        stages=job["stages"],
+        timings_ms=job["timings_ms"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        error=job["error"],
     )
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache(object):
+    """Bounded LRU cache whose entries also expire after ``ttl_s`` seconds.
+
+    Eviction is driven by ``max_entries`` and, when ``sizeof`` is given, by the
+    approximate ``max_bytes`` of the cached values. Safe to share between the
+    event loop and worker threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_s: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _size(self, value: Any) -> int:
+        return self._sizeof(value) if self._sizeof is not None else 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at, _ = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self._metrics["expirations"] += 1
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._lookup(key)
+            if item is None:
+                self._metrics["misses"] += 1
+                return default
+            self._metrics["hits"] += 1
+            return item[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like :meth:`get` but without touching the hit/miss counters."""
+        with self._lock:
+            item = self._lookup(key)
+            return default if item is None else item[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._size(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            expires_at = time.monotonic() + self.ttl_s if self.ttl_s else None
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._metrics["evictions"] += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._metrics["hits"] + self._metrics["misses"]
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hit_ratio": self._metrics["hits"] / lookups if lookups else 0.0,
+            **self._metrics,
+        }
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from typing import Optional
 import os
 
 load_dotenv()
@@ -13,10 +14,29 @@ class EmbeddingConfig(BaseModel):
     token: str = os.getenv("HF_TOKEN", "")
     model: str = os.getenv("HF_MODEL", "BAAI/bge-m3")
     timeout_s: int = int(os.getenv("EMBEDDING_TIMEOUT_S", "300"))
+    client: str = os.getenv("EMBEDDING_CLIENT", "hf")
+    url: str = os.getenv("EMBEDDING_URL", "")
+    requests_per_s: float = float(os.getenv("EMBEDDING_REQUESTS_PER_S", "0"))
+    max_retries: int = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+    backoff_base_s: float = float(os.getenv("EMBEDDING_BACKOFF_BASE_S", "0.5"))
+    backoff_max_s: float = float(os.getenv("EMBEDDING_BACKOFF_MAX_S", "30"))
+    batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    batch_tokens: int = int(os.getenv("EMBEDDING_BATCH_TOKENS", "8192"))
+    max_concurrency: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+    cache_enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    cache_entries: int = int(os.getenv("EMBEDDING_CACHE_ENTRIES", "50000"))
+    cache_max_bytes: int = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    cache_path: str = os.getenv("EMBEDDING_CACHE_PATH", ".orion/embeddings.sqlite3")
 
 class MCPConfig(BaseModel):
+    knowledge_tool_mode: str = os.getenv("KNOWLEDGE_TOOL_MODE", "mcp")
     mcp_knowledge_transport: str = os.getenv("MCP_KNOWLEDGE_TRANSPORT", "streamable_http")
     mcp_knowledge_url: str = os.getenv("MCP_KNOWLEDGE_URL", "http://localhost:8181/mcp")
+    tools_refresh_s: float = float(os.getenv("MCP_TOOLS_REFRESH_S", "300"))
+    pool_size: int = int(os.getenv("MCP_POOL_SIZE", "4"))
+    health_interval_s: float = float(os.getenv("MCP_HEALTH_INTERVAL_S", "30"))
+    reconnect_max_s: float = float(os.getenv("MCP_RECONNECT_MAX_S", "30"))
+    acquire_timeout_s: float = float(os.getenv("MCP_ACQUIRE_TIMEOUT_S", "30"))
 
 class MongodbConfig(BaseModel):
     uri: str = os.getenv("MONGODB_URI", "")
@@ -24,6 +44,26 @@ class MongodbConfig(BaseModel):
     collection: str = os.getenv("MONGODB_COLLECTION", "chat_history")
     history_size: int = int(os.getenv("MONGODB_HISTORY_SIZE", "6"))
     history_collection: str = os.getenv("MONGODB_HISTORY_COLLECTION", "histories")
+    history_layout: str = os.getenv("MONGODB_HISTORY_LAYOUT", "turns")
+    bucket_collection: str = os.getenv("MONGODB_BUCKET_COLLECTION", "history_buckets")
+    bucket_size: int = int(os.getenv("MONGODB_BUCKET_SIZE", os.getenv("MONGODB_HISTORY_SIZE", "6")))
+    max_pool_size: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+    min_pool_size: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "10"))
+    max_idle_time_ms: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+    timeout_ms: int = int(os.getenv("MONGODB_TIMEOUT_MS", "5000"))
+    history_cache_enabled: bool = os.getenv("MONGODB_HISTORY_CACHE_ENABLED", "true").lower() == "true"
+    history_cache_entries: int = int(os.getenv("MONGODB_HISTORY_CACHE_ENTRIES", "1000"))
+    history_cache_max_bytes: int = int(os.getenv("MONGODB_HISTORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    history_cache_ttl_s: float = float(os.getenv("MONGODB_HISTORY_CACHE_TTL_S", "300"))
+    history_cache_verify: bool = os.getenv("MONGODB_HISTORY_CACHE_VERIFY", "true").lower() == "true"
+    ensure_indexes: bool = os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "true"
+    write_behind: bool = os.getenv("MONGODB_WRITE_BEHIND", "false").lower() == "true"
+    flush_size: int = int(os.getenv("MONGODB_FLUSH_SIZE", "50"))
+    flush_interval_s: float = float(os.getenv("MONGODB_FLUSH_INTERVAL_S", "1.0"))
+    max_pending: int = int(os.getenv("MONGODB_MAX_PENDING", "10000"))
+    history_token_budget: int = int(os.getenv("MONGODB_HISTORY_TOKEN_BUDGET", "0"))
+    summary_collection: str = os.getenv("MONGODB_SUMMARY_COLLECTION", "history_summaries")
+    summary_cache_entries: int = int(os.getenv("MONGODB_SUMMARY_CACHE_ENTRIES", "1000"))
 
 class QdrantConfig(BaseModel):
     url: str = os.getenv("QDRANT_URL", "https://657e9ff8-daa0-4003-bf76-c531e697932d.europe-west3-0.gcp.cloud.qdrant.io:6333")
@@ -33,6 +73,58 @@ class QdrantConfig(BaseModel):
     chunk_size: int = int(os.getenv("QDRANT_CHUNK_SIZE", "1000"))
     chunk_overlap: int = int(os.getenv("QDRANT_CHUNK_OVERLAP", "100"))
     breakpoint_threshold_amount: int = int(os.getenv("QDRANT_BREAKPOINT_THRESHOLD_AMOUNT", "80"))
+    chunk_embedding_mode: str = os.getenv("QDRANT_CHUNK_EMBEDDING_MODE", "combined")
+    chunk_vectors: str = os.getenv("QDRANT_CHUNK_VECTORS", "embedded")
+    ensure_source_index: bool = os.getenv("QDRANT_ENSURE_SOURCE_INDEX", "true").lower() == "true"
+    validity_batch_size: int = int(os.getenv("QDRANT_VALIDITY_BATCH_SIZE", "256"))
+    validity_page_size: int = int(os.getenv("QDRANT_VALIDITY_PAGE_SIZE", "256"))
+    score_threshold: Optional[float] = float(os.getenv("QDRANT_SCORE_THRESHOLD")) if os.getenv("QDRANT_SCORE_THRESHOLD") else None
+    query_cache_entries: int = int(os.getenv("QDRANT_QUERY_CACHE_ENTRIES", "1024"))
+    query_cache_ttl_s: float = float(os.getenv("QDRANT_QUERY_CACHE_TTL_S", "300"))
+    query_embedding_cache_entries: int = int(os.getenv("QDRANT_QUERY_EMBEDDING_CACHE_ENTRIES", "4096"))
+
+class IngestConfig(BaseModel):
+    fetch_concurrency: int = int(os.getenv("INGEST_FETCH_CONCURRENCY", "8"))
+    clean_concurrency: int = int(os.getenv("INGEST_CLEAN_CONCURRENCY", "4"))
+    chunk_concurrency: int = int(os.getenv("INGEST_CHUNK_CONCURRENCY", "2"))
+    embed_concurrency: int = int(os.getenv("INGEST_EMBED_CONCURRENCY", "2"))
+    upsert_concurrency: int = int(os.getenv("INGEST_UPSERT_CONCURRENCY", "1"))
+    queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+    embed_batch_size: int = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+    chunk_batch_docs: int = int(os.getenv("INGEST_CHUNK_BATCH_DOCS", "8"))
+    job_store: str = os.getenv("INGEST_JOB_STORE", "mongo")
+    job_collection: str = os.getenv("INGEST_JOB_COLLECTION", "ingest_jobs")
+    job_dir: str = os.getenv("INGEST_JOB_DIR", ".orion/jobs")
+    job_workers: int = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+    job_queue_size: int = int(os.getenv("INGEST_JOB_QUEUE_SIZE", "50"))
+    job_threads: int = int(os.getenv("INGEST_JOB_THREADS", "8"))
+    job_persist_interval_s: float = float(os.getenv("INGEST_JOB_PERSIST_INTERVAL_S", "1.0"))
+    job_lease_s: float = float(os.getenv("INGEST_JOB_LEASE_S", "60"))
+
+class AnswerCacheConfig(BaseModel):
+    enabled: bool = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+    threshold: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    relevance_threshold: float = float(os.getenv("ANSWER_CACHE_RELEVANCE_THRESHOLD", "0.5"))
+    max_entries: int = int(os.getenv("ANSWER_CACHE_ENTRIES", "2048"))
+    ttl_s: float = float(os.getenv("ANSWER_CACHE_TTL_S", "300"))
+
+class AdmissionConfig(BaseModel):
+    enabled: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    max_concurrency: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "16"))
+    requests_per_minute: float = float(os.getenv("ADMISSION_REQUESTS_PER_MINUTE", "0"))
+    tokens_per_minute: float = float(os.getenv("ADMISSION_TOKENS_PER_MINUTE", "0"))
+    max_wait_s: float = float(os.getenv("ADMISSION_MAX_WAIT_S", "10"))
+    background_max_wait_s: float = float(os.getenv("ADMISSION_BACKGROUND_MAX_WAIT_S", "300"))
+    output_tokens: int = int(os.getenv("ADMISSION_OUTPUT_TOKENS", "1024"))
+    agent_requests: int = int(os.getenv("ADMISSION_AGENT_REQUESTS", "2"))
+
+class SchedulerConfig(BaseModel):
+    enabled: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    max_concurrency: int = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "16"))
+    user_concurrency: int = int(os.getenv("SCHEDULER_USER_CONCURRENCY", "2"))
+    user_queue: int = int(os.getenv("SCHEDULER_USER_QUEUE", "20"))
+    quantum_tokens: int = int(os.getenv("SCHEDULER_QUANTUM_TOKENS", "1024"))
+    max_wait_s: float = float(os.getenv("SCHEDULER_MAX_WAIT_S", "30"))
 
 class LangfuseConfig(BaseModel):
     system_prompt_name: str = os.getenv("LANGFUSE_SYSTEM_PROMPT_NAME", "agent")
@@ -56,6 +148,10 @@ class Settings(BaseModel):
     embedding: EmbeddingConfig = EmbeddingConfig()
     qdrant: QdrantConfig = QdrantConfig()
     mongodb: MongodbConfig = MongodbConfig()
+    ingest: IngestConfig = IngestConfig()
     mcp: MCPConfig = MCPConfig()
+    answer_cache: AnswerCacheConfig = AnswerCacheConfig()
+    admission: AdmissionConfig = AdmissionConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
 
 settings = Settings()
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+from typing import Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request budget ran out; ``stage`` names what was running at the time."""
+
+    def __init__(self, stage: str, budget_s: float):
+        super().__init__(f"request deadline of {budget_s:g}s ran out during {stage}")
+        self.stage = stage
+        self.budget_s = budget_s
+
+
+class Deadline(object):
+    """Time budget of one request, and the stage currently spending it.
+
+    :meth:`run` is the only place a timeout fires; stages just label the work
+    in progress (:meth:`enter`, or :meth:`stage` for nested work such as tool
+    calls), so the error can say which one ran out the budget.
+    """
+
+    def __init__(self, timeout_s: float):
+        self.timeout_s = timeout_s
+        self.expires_at = time.monotonic() + timeout_s
+        self.current = "start"
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def enter(self, stage: str) -> None:
+        self.current = stage
+
+    @contextmanager
+    def stage(self, name: str):
+        previous, self.current = self.current, name
+        try:
+            yield
+        finally:
+            # Keep the label of the stage that was running when time ran out.
+            if not self.expired:
+                self.current = previous
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        """Start ``coro`` as a task that sees this deadline as the current one."""
+        context = copy_context()
+        context.run(current_deadline.set, self)
+        return asyncio.create_task(coro, context=context)
+
+    async def run(self, coro: Coroutine[None, None, T]) -> T:
+        """Run ``coro`` within the remaining budget, cancelling it when it runs out."""
+        return await self.wait(self.spawn(coro))
+
+    async def wait(self, awaitable):
+        """Wait for ``awaitable`` within the remaining budget."""
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.remaining())
+        except asyncio.TimeoutError:
+            if not self.expired:
+                raise
+            raise DeadlineExceeded(self.current, self.timeout_s) from None
+
+
+def tool_stage(name: str):
+    """Label a tool call as a stage of the current request's deadline, if any."""
+    deadline = current_deadline.get()
+    return deadline.stage(f"tool:{name}") if deadline is not None else nullcontext()
@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi import Depends
 import time
 
@@ -7,12 +9,23 @@ from orion.api.v1.agent.routes import router as agent_v1_router
 from orion.api.v1.knowledge.routes import router as knowledge_v1_router
 from orion.api.v1.auth import verify_token
 from orion.config import settings
+from orion.services import Services
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so uvicorn binds right away; /ready reports progress.
+    app.state.services.start()
+    yield
+    # Flush buffered history turns before the worker exits.
+    await app.state.services.stop()
 
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
     description="API for interacting with Orion",
+    lifespan=lifespan,
 )
+app.state.services = Services()
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,3 +49,14 @@ app.include_router(knowledge_v1_router, dependencies=[Depends(verify_token)])
 @app.get("/")
 def root():
     return {"message": "Welcome to Orion Agent API", "docs": "/docs", "openapi": "/openapi.json"}
+
+
+@app.get("/ready")
+def ready():
+    services = app.state.services
+    if not services.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "starting" if services.error is None else "failed", "error": services.error},
+        )
+    return {"status": "ready", "startup_ms": services.timings}
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+from langfuse import Langfuse
+
+from orion.agent.agent import Agent
+from orion.agent.helper import aload_prompt
+from orion.agent.mcp_pool import build_mcp_pool
+from orion.config import settings
+from orion.logging import logger
+from orion.tools.jobs import IngestionJobs
+from orion.tools.knowledge import Knowledge, build_embeddings, connect_vectorstore
+
+
+class Services(object):
+    """Process-wide container for the agent and knowledge base.
+
+    Built once per worker by the FastAPI lifespan handler and handed to the
+    routes through dependencies. Independent warmup steps (Langfuse prompts,
+    the Qdrant connection and MCP tool discovery) run concurrently.
+    """
+
+    def __init__(self):
+        self.agent = None
+        self.knowledge = None
+        self.jobs = None
+        self.embeddings = None
+        self.ready = False
+        self.error = None
+        self.timings = {}
+        self.mcp_pool = None
+        self._warmup = None
+
+    async def _timed(self, name, awaitable):
+        start = time.perf_counter()
+        result = await awaitable
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        self.timings[name] = elapsed_ms
+        logger.info(f"Startup component ready: {name} ({elapsed_ms} ms)")
+        return result
+
+    async def _load_tools(self):
+        if settings.mcp.knowledge_tool_mode == "local":
+            return None
+        # An unreachable MCP server should not keep history and ingestion down;
+        # the agent retries the discovery lazily on its first request.
+        try:
+            return await Agent.load_tools(self.mcp_pool)
+        except Exception as e:
+            logger.error("MCP tool discovery failed", extra={"error": str(e)})
+            return None
+
+    async def build(self):
+        start = time.perf_counter()
+        langfuse = Langfuse()
+        self.embeddings = build_embeddings()
+        self.mcp_pool = build_mcp_pool()
+
+        prompt, vectorstore, tools = await asyncio.gather(
+            self._timed("prompts", aload_prompt(settings, langfuse)),
+            self._timed("qdrant", asyncio.to_thread(connect_vectorstore, self.embeddings)),
+            self._timed("mcp_tools", self._load_tools()),
+        )
+
+        self.knowledge = Knowledge(prompt=prompt, embeddings=self.embeddings, vectorstore=vectorstore)
+        agent = Agent(
+            prompt=prompt, knowledge=self.knowledge, langfuse=langfuse, mcp_pool=self.mcp_pool
+        )
+        if settings.mcp.knowledge_tool_mode == "local":
+            agent.set_graph(agent.build_graph([self.knowledge.as_tool()]))
+        elif tools is not None:
+            agent.set_graph(agent.build_graph(tools))
+        await self._timed("history", agent.startup())
+        self.agent = agent
+
+        self.jobs = IngestionJobs(self.knowledge)
+        await self._timed("jobs", self.jobs.start())
+
+        self.timings["total"] = int((time.perf_counter() - start) * 1000)
+        self.ready = True
+        logger.info(f"Startup complete in {self.timings['total']} ms")
+
+    def _warmup_done(self, task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.error = str(error)
+            logger.error("Service warmup failed", extra={"error": self.error})
+
+    def start(self):
+        """Begin warmup in the background so the server can bind immediately."""
+        self._warmup = asyncio.create_task(self.build())
+        self._warmup.add_done_callback(self._warmup_done)
+        return self._warmup
+
+    async def wait_ready(self):
+        if self.ready:
+            return
+        if self._warmup is None:
+            raise RuntimeError("Services have not been started")
+        try:
+            await asyncio.shield(self._warmup)
+        except Exception as e:
+            raise RuntimeError(f"Service warmup failed: {e}")
+
+    async def stop(self):
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+            try:
+                await self._warmup
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.jobs is not None:
+            await self.jobs.close()
+        if self.agent is not None:
+            await self.agent.shutdown()
+        elif self.mcp_pool is not None:
+            await self.mcp_pool.close()
+        # Last, since ingestion jobs and the answer cache embed until they stop.
+        # ``aclose`` also closes the HTTP clients and executor of HTTPEmbeddings.
+        aclose = getattr(self.embeddings, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        elif hasattr(self.embeddings, "close"):
+            self.embeddings.close()
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from orion.cache import TTLCache
+
+
+def embedding_namespace(model: str, flags: Optional[Dict[str, Any]] = None) -> str:
+    """Identify the vector space: the same text under another model or flags is another key."""
+    return f"{model}|{json.dumps(flags or {}, sort_keys=True)}"
+
+
+class SQLiteVectorStore(object):
+    """On-disk float32 vectors keyed by cache key, in a single SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def set_many(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.astype(np.float32).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return {"entries": entries, "bytes": page_count * page_size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed embedding cache in front of a remote ``Embeddings``.
+
+    Vectors are keyed by ``(namespace, sha256(text))`` and looked up in an
+    in-memory LRU first, then in an optional SQLite tier; only the remaining
+    unique texts are sent to ``embeddings``. Re-ingesting a page, or
+    boilerplate repeated across pages, is then embedded once.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        namespace: str,
+        max_entries: int = 50_000,
+        max_bytes: Optional[int] = None,
+        path: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.memory = TTLCache(max_entries, max_bytes=max_bytes, sizeof=lambda vector: vector.nbytes)
+        self.disk = SQLiteVectorStore(path) if path else None
+        self._lock = threading.Lock()
+        self._metrics = {"lookups": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "embedded": 0}
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.namespace}|{kind}|{digest}"
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        for key in keys:
+            vector = self.memory.get(key)
+            if vector is not None:
+                found[key] = vector
+        memory_hits = len(found)
+
+        missing = [key for key in keys if key not in found]
+        if self.disk is not None and missing:
+            from_disk = self.disk.get_many(missing)
+            for key, vector in from_disk.items():
+                self.memory.set(key, vector)
+            found.update(from_disk)
+
+        with self._lock:
+            self._metrics["lookups"] += len(keys)
+            self._metrics["memory_hits"] += memory_hits
+            self._metrics["disk_hits"] += len(found) - memory_hits
+            self._metrics["misses"] += len(keys) - len(found)
+        return found
+
+    def _store(self, computed: Dict[str, np.ndarray]) -> None:
+        for key, vector in computed.items():
+            self.memory.set(key, vector)
+        if self.disk is not None and computed:
+            self.disk.set_many(computed)
+        with self._lock:
+            self._metrics["embedded"] += len(computed)
+
+    def _plan(self, kind: str, texts: List[str]):
+        keys = [self._key(kind, text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        return keys, unique
+
+    def _missing(self, texts, keys, found):
+        # One request per distinct missing text, even if it repeats in ``texts``.
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return missing
+
+    def _finish(self, keys, found, missing, vectors) -> List[List[float]]:
+        computed = {
+            key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)
+        }
+        self._store(computed)
+        found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, unique = self._plan("document", texts)
+        found = self._lookup(unique)
+        missing = self._missing(texts, keys, found)
+        vectors = self.embeddings.embed_documents(list(missing.values())) if missing else []
+        return self._finish(keys, found, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, unique = self._plan("query", [text])
+        found = self._lookup(unique)
+        missing = self._missing([text], keys, found)
+        vectors = [self.embeddings.embed_query(text)] if missing else []
+        return self._finish(keys, found, missing, vectors)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, unique = self._plan("document", texts)
+        found = await asyncio.to_thread(self._lookup, unique)
+        missing = self._missing(texts, keys, found)
+        vectors = await self.embeddings.aembed_documents(list(missing.values())) if missing else []
+        return await asyncio.to_thread(self._finish, keys, found, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, unique = self._plan("query", [text])
+        found = await asyncio.to_thread(self._lookup, unique)
+        missing = self._missing([text], keys, found)
+        vectors = [await self.embeddings.aembed_query(text)] if missing else []
+        return (await asyncio.to_thread(self._finish, keys, found, missing, vectors))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        hits = metrics["memory_hits"] + metrics["disk_hits"]
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else {"entries": 0, "bytes": 0}
+        return {
+            "hit_ratio": hits / metrics["lookups"] if metrics["lookups"] else 0.0,
+            "memory_entries": memory["entries"],
+            "memory_bytes": memory["bytes"],
+            "disk_entries": disk["entries"],
+            "disk_bytes": disk["bytes"],
+            **metrics,
+        }
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+    async def aclose(self) -> None:
+        """Close the SQLite tier and the wrapped client's connections, if it has any."""
+        self.close()
+        aclose = getattr(self.embeddings, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,202 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+from orion.admission import TokenBucket
+
+RETRY_STATUSES = {429, 503}
+
+
+def hf_feature_extraction_url(model: str) -> str:
+    return f"https://router.huggingface.co/hf-inference/models/{model}/pipeline/feature-extraction"
+
+
+def batch_ranges(texts: List[str], batch_size: int, batch_tokens: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Cut ``texts`` into ``(start, end)`` runs within the item/token limits."""
+    batches = []
+    start, tokens = 0, 0
+    for i, text in enumerate(texts):
+        size = len(text) // 4 + 1
+        full = i - start >= (batch_size or len(texts)) or (
+            batch_tokens is not None and tokens + size > batch_tokens
+        )
+        if full and i > start:
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += size
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+class EmbeddingRequestError(RuntimeError):
+    pass
+
+
+class HTTPEmbeddings(Embeddings):
+    """Feature-extraction client with batching, concurrency, rate limit and retries.
+
+    Texts are cut into batches of ``batch_size`` items / ``batch_tokens``
+    estimated tokens and sent up to ``max_concurrency`` at a time, each
+    request first taking a slot from a ``requests_per_s`` token bucket.
+    ``429``/``503`` responses and transport errors are retried with
+    exponential backoff and full jitter, honouring ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str = "",
+        model_kwargs: Optional[Dict[str, Any]] = None,
+        batch_size: int = 64,
+        batch_tokens: Optional[int] = None,
+        max_concurrency: int = 4,
+        requests_per_s: float = 0.0,
+        max_retries: int = 5,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+        timeout_s: float = 300.0,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url
+        self.model_kwargs = model_kwargs or {}
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.bucket = TokenBucket(requests_per_s) if requests_per_s > 0 else None
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        limits = httpx.Limits(max_connections=self.max_concurrency)
+        self._client = httpx.Client(headers=headers, timeout=timeout_s, limits=limits, transport=transport)
+        self._async_client = httpx.AsyncClient(
+            headers=headers, timeout=timeout_s, limits=limits, transport=async_transport
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0, "texts": 0, "retries": 0, "throttled": 0,
+            "errors": 0, "rate_wait_ms": 0.0, "backoff_ms": 0.0,
+        }
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for key, value in deltas.items():
+                self._metrics[key] += value
+
+    def _payload(self, texts: List[str]) -> Dict[str, Any]:
+        # Newlines degrade some embedding models; the HF client strips them too.
+        return {"inputs": [text.replace("\n", " ") for text in texts], **self.model_kwargs}
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max_s)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+
+    def _outcome(self, attempt: int, response=None, error=None) -> Optional[float]:
+        """Return the delay before the next attempt, or ``None`` when done."""
+        if error is None and response.status_code not in RETRY_STATUSES:
+            return None
+        if error is None:
+            self._count(throttled=1)
+        if attempt >= self.max_retries:
+            self._count(errors=1)
+            if error is not None:
+                raise EmbeddingRequestError(f"embedding request failed: {error}") from error
+            response.raise_for_status()
+        delay = self._backoff(attempt, response)
+        self._count(retries=1, backoff_ms=delay * 1000)
+        return delay
+
+    def _parse(self, response: httpx.Response, texts: List[str]) -> List[List[float]]:
+        if response.is_error:
+            self._count(errors=1)
+            response.raise_for_status()
+        vectors = response.json()
+        if len(vectors) != len(texts):
+            self._count(errors=1)
+            raise EmbeddingRequestError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+        self._count(texts=len(texts))
+        return vectors
+
+    def _post(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self._count(rate_wait_ms=self.bucket.acquire() * 1000)
+            self._count(requests=1)
+            response, error = None, None
+            try:
+                response = self._client.post(self.url, json=self._payload(texts))
+            except httpx.TransportError as e:
+                error = e
+            delay = self._outcome(attempt, response, error)
+            if delay is None:
+                return self._parse(response, texts)
+            time.sleep(delay)
+            attempt += 1
+
+    async def _apost(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self._count(rate_wait_ms=await self.bucket.aacquire() * 1000)
+            self._count(requests=1)
+            response, error = None, None
+            try:
+                async with self._get_semaphore():
+                    response = await self._async_client.post(self.url, json=self._payload(texts))
+            except httpx.TransportError as e:
+                error = e
+            delay = self._outcome(attempt, response, error)
+            if delay is None:
+                return self._parse(response, texts)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[start:end] for start, end in batch_ranges(texts, self.batch_size, self.batch_tokens)]
+        if len(batches) <= 1:
+            return [vector for batch in batches for vector in self._post(batch)]
+        return [vector for result in self._executor.map(self._post, batches) for vector in result]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._post([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[start:end] for start, end in batch_ranges(texts, self.batch_size, self.batch_tokens)]
+        results = await asyncio.gather(*(self._apost(batch) for batch in batches))
+        return [vector for result in results for vector in result]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._apost([text]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._metrics)
+
+    def close(self) -> None:
+        self._client.close()
+        self._executor.shutdown(wait=False)
+
+    async def aclose(self) -> None:
+        self.close()
+        await self._async_client.aclose()
@@ -0,0 +1,252 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+from orion.config import settings
+from orion.logging import logger
+
+STAGES = ("fetch", "clean", "chunk", "embed", "upsert")
+
+_DONE = object()
+
+
+class StageStats(object):
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.max_queue_depth = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def as_dict(self, queue: Optional[asyncio.Queue] = None) -> Dict[str, Any]:
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "busy_ms": int(self.busy_s * 1000),
+            "elapsed_ms": int(elapsed * 1000),
+            "throughput_per_s": self.items_in / elapsed if elapsed > 0 else 0.0,
+            "queue_depth": queue.qsize() if queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class IngestionPipeline(object):
+    """Overlapping fetch, clean, chunk, embed and upsert stages for one upload.
+
+    Stages are connected by bounded queues and each runs its own pool of
+    workers, so the first page is chunked and upserted while later pages are
+    still being fetched or cleaned. A failing item marks its link as failed
+    and the rest of the upload carries on. Chunks of a failed link that were
+    already upserted are deleted once the stages finish, so a retried upload
+    does not find the link half-stored and skip it.
+    """
+
+    def __init__(
+        self,
+        knowledge,
+        concurrency: Optional[Dict[str, int]] = None,
+        queue_size: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.knowledge = knowledge
+        self.concurrency = {
+            "fetch": settings.ingest.fetch_concurrency,
+            "clean": settings.ingest.clean_concurrency,
+            "chunk": settings.ingest.chunk_concurrency,
+            "embed": settings.ingest.embed_concurrency,
+            "upsert": settings.ingest.upsert_concurrency,
+        }
+        self.concurrency.update(concurrency or {})
+        self.queue_size = queue_size or settings.ingest.queue_size
+        self.embed_batch_size = embed_batch_size or settings.ingest.embed_batch_size
+        self.on_progress = on_progress
+        self.executor = executor
+
+        self.stats = {stage: StageStats(stage, self.concurrency[stage]) for stage in STAGES}
+        self.failed: Dict[str, str] = {}
+        self._upserted_links = set()
+        self._queues: Dict[str, asyncio.Queue] = {}
+
+    async def _run_sync(self, fn, *args):
+        # Blocking steps use the caller's executor so a long upload cannot
+        # starve the default thread pool shared with the request handlers.
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _progress(self, link: str, stage: str, **info) -> None:
+        if self.on_progress is not None:
+            self.on_progress(link, stage, info)
+
+    def _fail(self, link: str, stage: str, error: Exception) -> None:
+        self.failed.setdefault(link, f"{stage}: {error}")
+        self._progress(link, stage, status="failed", error=str(error))
+
+    async def _fetch(self, links: List[str]) -> list:
+        docs = await self._run_sync(self.knowledge.load_content, links)
+        for link in links:
+            self._progress(link, "fetch", status="done")
+        return docs
+
+    async def _clean(self, docs: list) -> list:
+        cleaned = [await self.knowledge.areformat_document(doc) for doc in docs]
+        for doc in cleaned:
+            self._progress(_source(doc), "clean", status="done")
+        return cleaned
+
+    async def _chunk(self, docs: list) -> list:
+        pairs = await self._run_sync(self.knowledge.chucking_with_vectors, docs)
+        for doc in docs:
+            count = sum(1 for chunk, _ in pairs if _source(chunk) == _source(doc))
+            self._progress(_source(doc), "chunk", status="done", chunks=count)
+        return pairs
+
+    async def _embed(self, pairs: list) -> list:
+        # Chunks that already carry a vector pooled at chunking time skip the endpoint.
+        chunks = [chunk for chunk, _ in pairs]
+        missing = [i for i, (_, vector) in enumerate(pairs) if vector is None]
+        vectors = [None if vector is None else vector.tolist() for _, vector in pairs]
+        if missing:
+            embedded = await self.knowledge.embeddings.aembed_documents(
+                [chunks[i].page_content for i in missing]
+            )
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return [(chunks, vectors)]
+
+    async def _upsert(self, batches: list) -> list:
+        for chunks, vectors in batches:
+            # Chunks of links that already failed elsewhere would only be deleted again.
+            kept = [i for i, chunk in enumerate(chunks) if _source(chunk) not in self.failed]
+            if not kept:
+                continue
+            chunks = [chunks[i] for i in kept]
+            links = list(dict.fromkeys(_source(chunk) for chunk in chunks))
+            self._upserted_links.update(links)
+            await self._run_sync(self.knowledge.add_embeddings, chunks, [vectors[i] for i in kept])
+            for link in links:
+                self._progress(link, "upsert", status="done")
+        return []
+
+    async def _discard_failed(self) -> None:
+        partial = [link for link in self.failed if link in self._upserted_links]
+        if not partial:
+            return
+        try:
+            await self._run_sync(self.knowledge.delete_sources, partial)
+        except Exception as e:
+            logger.error("Failed to delete chunks of failed links", extra={"links": partial, "error": str(e)})
+
+    async def _worker(self, stage: str, handler, source: asyncio.Queue, sink, batch_size: int):
+        stats = self.stats[stage]
+        while True:
+            item = await source.get()
+            if item is _DONE:
+                return
+            items, done = [item], False
+            while len(items) < batch_size:
+                try:
+                    item = source.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                items.append(item)
+
+            if stats.started_at is None:
+                stats.started_at = time.perf_counter()
+            stats.items_in += len(items)
+            start = time.perf_counter()
+            try:
+                outputs = await handler(items)
+            except Exception as e:
+                stats.errors += 1
+                logger.error("Ingestion stage failed", extra={"stage": stage, "error": str(e)})
+                for link in dict.fromkeys(link for item in items for link in _links(item)):
+                    self._fail(link, stage, e)
+                outputs = []
+            stats.busy_s += time.perf_counter() - start
+            stats.items_out += len(outputs)
+
+            if sink is not None:
+                for output in outputs:
+                    await sink.put(output)
+                    stats_next = self.stats[STAGES[STAGES.index(stage) + 1]]
+                    stats_next.max_queue_depth = max(stats_next.max_queue_depth, sink.qsize())
+            if done:
+                return
+
+    async def _run_stage(self, stage: str, handler, source, sink, batch_size: int = 1):
+        workers = self.concurrency[stage]
+        await asyncio.gather(
+            *[self._worker(stage, handler, source, sink, batch_size) for _ in range(workers)]
+        )
+        self.stats[stage].finished_at = time.perf_counter()
+        if sink is not None:
+            next_stage = STAGES[STAGES.index(stage) + 1]
+            for _ in range(self.concurrency[next_stage]):
+                await sink.put(_DONE)
+
+    async def run(self, links: List[str]) -> Dict[str, Any]:
+        """Ingest ``links`` and return the links that failed and per-stage stats."""
+        queues = {"fetch": asyncio.Queue()}
+        for link in links:
+            queues["fetch"].put_nowait(link)
+        for _ in range(self.concurrency["fetch"]):
+            queues["fetch"].put_nowait(_DONE)
+        for stage in STAGES[1:]:
+            queues[stage] = asyncio.Queue(maxsize=self.queue_size)
+        self._queues = queues
+
+        handlers = {
+            "fetch": self._fetch,
+            "clean": self._clean,
+            "chunk": self._chunk,
+            "embed": self._embed,
+            "upsert": self._upsert,
+        }
+        # Chunking several waiting documents at once lets the chunker embed
+        # their sentences in shared batches.
+        batch_sizes = {"chunk": settings.ingest.chunk_batch_docs, "embed": self.embed_batch_size}
+        await asyncio.gather(
+            *[
+                self._run_stage(
+                    stage,
+                    handlers[stage],
+                    queues[stage],
+                    queues[STAGES[index + 1]] if index + 1 < len(STAGES) else None,
+                    batch_size=batch_sizes.get(stage, 1),
+                )
+                for index, stage in enumerate(STAGES)
+            ]
+        )
+        await self._discard_failed()
+        return {"failed": dict(self.failed), "stats": self.stats_dict()}
+
+    def stats_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: self.stats[stage].as_dict(self._queues.get(stage)) for stage in STAGES}
+
+
+def _source(doc) -> str:
+    return doc.metadata.get("source", "")
+
+
+def _links(item) -> List[str]:
+    if isinstance(item, str):
+        return [item]
+    if isinstance(item, tuple):
+        # ``(chunk, vector)`` into the embed stage, ``(chunks, vectors)`` into upsert.
+        docs = item[0] if isinstance(item[0], list) else [item[0]]
+        return [_source(doc) for doc in docs]
+    return [_source(item)]
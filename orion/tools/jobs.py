@@ -0,0 +1,385 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import AsyncMongoClient, ReturnDocument
+
+from orion.agent.history import mongo_client_options
+from orion.config import settings
+from orion.logging import logger
+
+UNFINISHED = ("queued", "running")
+
+
+class JobQueueFull(Exception):
+    """Raised when the ingestion job queue is at capacity."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _claimable(job: Dict[str, Any], now: float) -> bool:
+    lease = job.get("lease_expires_at")
+    return job["status"] in UNFINISHED and (lease is None or lease < now)
+
+
+class MongoJobStore(object):
+    """Ingestion jobs kept in MongoDB, one document per job."""
+
+    def __init__(self, client: Optional[AsyncMongoClient] = None):
+        self._client = client
+
+    def _get_collection(self):
+        if self._client is None:
+            self._client = AsyncMongoClient(settings.mongodb.uri, **mongo_client_options())
+        return self._client[settings.mongodb.database][settings.ingest.job_collection]
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await self._get_collection().replace_one({"_id": job["job_id"]}, _to_document(job), upsert=True)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        document = await self._get_collection().find_one({"_id": job_id})
+        return _from_document(document) if document else None
+
+    async def claim(self, owner: str, lease_s: float) -> Optional[Dict[str, Any]]:
+        """Take over the oldest unfinished job whose lease ran out, or ``None``."""
+        now = time.time()
+        document = await self._get_collection().find_one_and_update(
+            {
+                "status": {"$in": list(UNFINISHED)},
+                "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}],
+            },
+            {"$set": {"status": "queued", "owner": owner, "lease_expires_at": now + lease_s}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return _from_document(document) if document else None
+
+    async def renew(self, job_ids: List[str], owner: str, lease_expires_at: float) -> None:
+        await self._get_collection().update_many(
+            {"_id": {"$in": job_ids}, "owner": owner},
+            {"$set": {"lease_expires_at": lease_expires_at}},
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# Claims on the local store are atomic within one process only.
+_local_lock = threading.Lock()
+
+
+class LocalJobStore(object):
+    """Ingestion jobs kept as one JSON file each under ``directory``, for a single instance."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.ingest.job_dir
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(job["job_id"])
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(job, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _read_all(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = [
+            self._read(name[: -len(".json")])
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        return [job for job in jobs if job]
+
+    def _claim(self, owner: str, lease_s: float) -> Optional[Dict[str, Any]]:
+        with _local_lock:
+            now = time.time()
+            jobs = sorted(
+                (job for job in self._read_all() if _claimable(job, now)),
+                key=lambda job: job["created_at"],
+            )
+            if not jobs:
+                return None
+            job = dict(jobs[0], status="queued", owner=owner, lease_expires_at=now + lease_s)
+            self._write(job)
+            return job
+
+    def _renew(self, job_ids: List[str], owner: str, lease_expires_at: float) -> None:
+        with _local_lock:
+            for job_id in job_ids:
+                job = self._read(job_id)
+                if job is not None and job.get("owner") == owner:
+                    self._write(dict(job, lease_expires_at=lease_expires_at))
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not job_id.replace("-", "").isalnum():
+            return None
+        return await asyncio.to_thread(self._read, job_id)
+
+    async def claim(self, owner: str, lease_s: float) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._claim, owner, lease_s)
+
+    async def renew(self, job_ids: List[str], owner: str, lease_expires_at: float) -> None:
+        await asyncio.to_thread(self._renew, job_ids, owner, lease_expires_at)
+
+    async def close(self) -> None:
+        pass
+
+
+def build_job_store():
+    if settings.ingest.job_store == "local":
+        return LocalJobStore()
+    return MongoJobStore()
+
+
+def _to_document(job: Dict[str, Any]) -> Dict[str, Any]:
+    document = dict(job, _id=job["job_id"])
+    # Links are not safe as Mongo field names, so progress is stored as a list.
+    document["progress"] = [dict(entry, link=link) for link, entry in job["progress"].items()]
+    return document
+
+
+def _from_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    job = {key: value for key, value in document.items() if key != "_id"}
+    job["progress"] = {
+        entry["link"]: {key: value for key, value in entry.items() if key != "link"}
+        for entry in document.get("progress", [])
+    }
+    return job
+
+
+class IngestionJobs(object):
+    """Bounded background queue of ``upload-link`` jobs.
+
+    ``submit`` persists the job and returns at once; ``workers`` tasks run
+    queued jobs through :meth:`Knowledge.aupload_link` on a dedicated thread
+    pool. Progress is written back to the store every
+    ``job_persist_interval_s`` seconds.
+
+    Every job carries its ``owner`` and a lease that the owner renews every
+    third of ``job_lease_s`` while the job is queued or running, so replicas
+    sharing one store leave each other's jobs alone. An unfinished job whose
+    lease ran out, because its owner crashed or shut down, is claimed
+    atomically by the next instance that starts or renews its own leases.
+    """
+
+    def __init__(self, knowledge, store=None, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.knowledge = knowledge
+        self.store = store if store is not None else build_job_store()
+        self.workers = workers or settings.ingest.job_workers
+        self.queue_size = queue_size or settings.ingest.job_queue_size
+        self.persist_interval_s = settings.ingest.job_persist_interval_s
+        self.lease_s = settings.ingest.job_lease_s
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._executor = None
+        self._metrics = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "recovered": 0}
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.ingest.job_threads, thread_name_prefix="ingest"
+        )
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Hand unfinished jobs over at once instead of after their lease runs out.
+        try:
+            await self._renew(expires_at=0.0)
+        except Exception as e:
+            logger.error("Failed to release ingestion job leases", extra={"error": str(e)})
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        await self.store.close()
+
+    async def submit(self, links: List[str]) -> Dict[str, Any]:
+        if self._queue.qsize() >= self.queue_size:
+            self._metrics["rejected"] += 1
+            raise JobQueueFull(f"Ingestion queue is full ({self.queue_size} jobs)")
+
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "status": "queued",
+            "links": list(links),
+            "progress": {link: {"status": "queued", "stage": None} for link in links},
+            "stages": {},
+            "timings_ms": {},
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "owner": self.owner,
+            "lease_expires_at": time.time() + self.lease_s,
+        }
+        await self.store.save(job)
+        self._active[job["job_id"]] = job
+        self._queue.put_nowait(job["job_id"])
+        self._metrics["submitted"] += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if job_id in self._active:
+            return self._active[job_id]
+        return await self.store.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "active": len(self._active),
+            "capacity": self.queue_size,
+            **self._metrics,
+        }
+
+    async def _recover(self) -> None:
+        """Claim unfinished jobs whose lease ran out while the queue has room."""
+        while self._queue.qsize() < self.queue_size:
+            try:
+                job = await self.store.claim(self.owner, self.lease_s)
+            except Exception as e:
+                logger.error("Failed to claim unfinished ingestion jobs", extra={"error": str(e)})
+                return
+            if job is None:
+                return
+            if job["job_id"] in self._active:
+                # Our own lease lapsed (e.g. the store was unreachable); keep the copy in memory.
+                self._active[job["job_id"]]["lease_expires_at"] = job["lease_expires_at"]
+                continue
+            self._active[job["job_id"]] = job
+            self._queue.put_nowait(job["job_id"])
+            self._metrics["recovered"] += 1
+
+    async def _renew(self, expires_at: Optional[float] = None) -> None:
+        if not self._active:
+            return
+        if expires_at is None:
+            expires_at = time.time() + self.lease_s
+        # The in-memory copy is what ``save`` writes, so it must carry the lease too.
+        for job in self._active.values():
+            job["lease_expires_at"] = expires_at
+        await self.store.renew(list(self._active), self.owner, expires_at)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            try:
+                await self._renew()
+            except Exception as e:
+                logger.error("Failed to renew ingestion job leases", extra={"error": str(e)})
+            await self._recover()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._active.get(job_id)
+            if job is None:
+                continue
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ingestion job failed", extra={"job_id": job_id, "error": str(e)})
+            finally:
+                if job["status"] not in UNFINISHED:
+                    self._active.pop(job_id, None)
+
+    async def _persist_loop(self, job: Dict[str, Any]) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval_s)
+            try:
+                await self.store.save(job)
+            except Exception as e:
+                logger.error("Failed to persist ingestion job", extra={"job_id": job["job_id"], "error": str(e)})
+
+    def _on_progress(self, job: Dict[str, Any]):
+        def update(link: str, stage: str, info: Dict[str, Any]) -> None:
+            entry = job["progress"].setdefault(link, {})
+            if entry.get("status") == "failed":
+                return
+            entry["stage"] = stage
+            entry["status"] = "failed" if info.get("status") == "failed" else "running"
+            for key in ("chunks", "error"):
+                if key in info:
+                    entry[key] = info[key]
+
+        return update
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        queued_at = datetime.fromisoformat(job["created_at"])
+        job["status"] = "running"
+        job["started_at"] = _now()
+        job["timings_ms"]["queued"] = int(
+            (datetime.now(timezone.utc) - queued_at).total_seconds() * 1000
+        )
+        await self.store.save(job)
+
+        persister = asyncio.create_task(self._persist_loop(job))
+        start = time.perf_counter()
+        try:
+            result = await self.knowledge.aupload_link(
+                job["links"],
+                on_progress=self._on_progress(job),
+                executor=self._executor,
+                raise_on_failure=False,
+            )
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            self._metrics["failed"] += 1
+        else:
+            failed = result.get("failed", {})
+            for link in result.get("exists", []):
+                job["progress"][link] = {"status": "skipped", "stage": "check"}
+            for link in result.get("not_exists", []):
+                entry = job["progress"].setdefault(link, {})
+                if link in failed:
+                    entry.update(status="failed", error=failed[link])
+                else:
+                    entry["status"] = "done"
+            job["stages"] = result.get("stages") or {}
+            job["timings_ms"]["check"] = result.get("check_ms")
+            job["status"] = "failed" if failed else "done"
+            job["error"] = f"{len(failed)} link(s) failed" if failed else None
+            self._metrics["failed" if failed else "completed"] += 1
+        finally:
+            persister.cancel()
+            await asyncio.gather(persister, return_exceptions=True)
+
+        job["timings_ms"]["total"] = int((time.perf_counter() - start) * 1000)
+        job["finished_at"] = _now()
+        await self.store.save(job)
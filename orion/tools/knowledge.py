@@ -1,9 +1,16 @@
+import asyncio
 import re
+import time
+import uuid
 from collections import defaultdict
 
 from langchain_groq import ChatGroq
 from langchain_huggingface import HuggingFaceEndpointEmbeddings
+from orion.admission import estimate_tokens, get_admission
+from orion.cache import TTLCache
 from orion.config import settings
+from orion.deadline import tool_stage
+from orion.logging import logger
 from langchain_qdrant import QdrantVectorStore
 from qdrant_client.http import models as rest
 
@@ -11,37 +18,101 @@ from langchain_community.document_loaders import WebBaseLoader
 from langchain_core.prompts import PromptTemplate
 from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.tools import StructuredTool
+from orion.agent.helper import get_args_schema
+from orion.tools.embedding_client import HTTPEmbeddings, hf_feature_extraction_url
+from orion.tools.embedding_cache import CachedEmbeddings, embedding_namespace
+from orion.tools.ingest import IngestionPipeline
 from orion.tools.semantic import SemanticChunker
 
 from langfuse.langchain import CallbackHandler
 
+SOURCE_KEY = "metadata.source"
+
+def build_embeddings():
+    model_kwargs = {"normalize": True, "truncate": True}
+    if settings.embedding.client == "http":
+        embeddings = HTTPEmbeddings(
+            url=settings.embedding.url or hf_feature_extraction_url(settings.embedding.model),
+            token=settings.embedding.token,
+            model_kwargs=model_kwargs,
+            batch_size=settings.embedding.batch_size,
+            batch_tokens=settings.embedding.batch_tokens,
+            max_concurrency=settings.embedding.max_concurrency,
+            requests_per_s=settings.embedding.requests_per_s,
+            max_retries=settings.embedding.max_retries,
+            backoff_base_s=settings.embedding.backoff_base_s,
+            backoff_max_s=settings.embedding.backoff_max_s,
+            timeout_s=settings.embedding.timeout_s,
+        )
+    else:
+        embeddings = HuggingFaceEndpointEmbeddings(
+            provider="hf-inference",
+            huggingfacehub_api_token=settings.embedding.token,
+            model=settings.embedding.model,
+            model_kwargs=model_kwargs
+        )
+    if not settings.embedding.cache_enabled:
+        return embeddings
+    return CachedEmbeddings(
+        embeddings,
+        namespace=embedding_namespace(settings.embedding.model, model_kwargs),
+        max_entries=settings.embedding.cache_entries,
+        max_bytes=settings.embedding.cache_max_bytes,
+        path=settings.embedding.cache_path or None,
+    )
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+def format_documents(docs):
+    return "\n\n".join(
+        f"Source: {doc.metadata.get('source', '-')}\n{doc.page_content}" for doc in docs
+    )
+
+def connect_vectorstore(embeddings):
+    return QdrantVectorStore.from_existing_collection(
+        embedding=embeddings,
+        url=settings.qdrant.url,
+        api_key=settings.qdrant.api_key,
+        collection_name=settings.qdrant.collection
+    )
+
 class Knowledge(object):
-    def __init__(self, prompt):
+    def __init__(self, prompt, embeddings=None, vectorstore=None, admission=None):
 
         self.prompt = prompt
         self.model = ChatGroq(
             model=self.prompt["chain"]["config"]["model"],
             api_key=settings.groq.api_key,
+            timeout=settings.groq.timeout_s,
         )
-        self.embeddings = HuggingFaceEndpointEmbeddings(
-            provider="hf-inference",
-            huggingfacehub_api_token=settings.embedding.token,
-            model=settings.embedding.model,
-            model_kwargs={"normalize": True, "truncate": True}
-        )
+        self.embeddings = embeddings if embeddings is not None else build_embeddings()
+        self.admission = admission if admission is not None else get_admission()
 
-        self.vectorstore = QdrantVectorStore.from_existing_collection(
-            embedding=self.embeddings,
-            url=settings.qdrant.url,
-            api_key=settings.qdrant.api_key,
-            collection_name=settings.qdrant.collection
+        self.vectorstore = (
+            vectorstore if vectorstore is not None else connect_vectorstore(self.embeddings)
         )
 
         self.semantic_splitter = SemanticChunker(
-            self.embeddings, breakpoint_threshold_type="percentile", breakpoint_threshold_amount=80
+            self.embeddings,
+            breakpoint_threshold_type="percentile",
+            breakpoint_threshold_amount=80,
+            embedding_mode=settings.qdrant.chunk_embedding_mode,
+            batch_size=settings.embedding.batch_size,
+            batch_tokens=settings.embedding.batch_tokens,
+            max_concurrency=settings.embedding.max_concurrency,
         )
 
         self.chain = self.build_chain()
+        self._source_index_ready = False
+
+        # Bumped on every upsert; query results are keyed on it.
+        self.collection_version = 0
+        self.query_cache = TTLCache(
+            settings.qdrant.query_cache_entries, ttl_s=settings.qdrant.query_cache_ttl_s
+        )
+        self.query_embedding_cache = TTLCache(settings.qdrant.query_embedding_cache_entries)
 
     def build_chain(self):
         prompt_template = PromptTemplate(
@@ -55,23 +126,143 @@ class Knowledge(object):
 
         return chain
 
-    def check_validity(self, links: list):
-        clean_link = defaultdict(list)
-        for link in links:
-            results = self.vectorstore.client.scroll(
+    async def asearch(self, query: str, k: int = None):
+        return await self.vectorstore.asimilarity_search(query, k=k or settings.qdrant.top_k)
+
+    async def aquery(self, query: str, k: int = None, score_threshold: float = None):
+        """Assemble retrieval context for ``query``, served from cache when possible.
+
+        Results are cached per normalised query, ``k``, threshold and
+        collection version; the query embedding is cached separately so a
+        result that was invalidated by an upload only repeats the search.
+        """
+        normalized = normalize_query(query)
+        k = k or settings.qdrant.top_k
+        if score_threshold is None:
+            score_threshold = settings.qdrant.score_threshold
+        key = (normalized, k, score_threshold, self.collection_version)
+
+        context = self.query_cache.get(key)
+        if context is not None:
+            return {"context": context, "cached": True}
+
+        vector = self.query_embedding_cache.get(normalized)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(normalized)
+            self.query_embedding_cache.set(normalized, vector)
+
+        results = await asyncio.to_thread(
+            self.vectorstore.similarity_search_with_score_by_vector,
+            vector,
+            k=k,
+            score_threshold=score_threshold,
+        )
+        context = format_documents([doc for doc, _ in results])
+        self.query_cache.set(key, context)
+        return {"context": context, "cached": False}
+
+    def invalidate_queries(self):
+        self.collection_version += 1
+        self.query_cache.clear()
+
+    def query_stats(self):
+        return {
+            "collection_version": self.collection_version,
+            "results": self.query_cache.stats(),
+            "embeddings": self.query_embedding_cache.stats(),
+        }
+
+    def as_tool(self):
+        """Native ``knowledge`` tool that searches this process's vectorstore.
+
+        Mirrors the MCP knowledge tool (same name, Langfuse description and
+        argument schema) without the extra network hop per call.
+        """
+        async def knowledge(query: str) -> str:
+            with tool_stage("knowledge"):
+                docs = await self.asearch(query)
+            return format_documents(docs)
+
+        return StructuredTool.from_function(
+            coroutine=knowledge,
+            name="knowledge",
+            description=self.prompt["knowledge"]["description"],
+            args_schema=get_args_schema(self.prompt)["knowledge"],
+        )
+
+    def ensure_source_index(self):
+        """Create the keyword payload index that backs the link-existence filter."""
+        if self._source_index_ready:
+            return
+        try:
+            self.vectorstore.client.create_payload_index(
+                collection_name=self.vectorstore.collection_name,
+                field_name=SOURCE_KEY,
+                field_schema=rest.PayloadSchemaType.KEYWORD,
+            )
+        except Exception as e:
+            # Already indexed or not permitted; the filter still works unindexed.
+            logger.error("Failed to create source payload index", extra={"error": str(e)})
+        self._source_index_ready = True
+
+    def _existing_sources(self, links: list):
+        """Return which of ``links`` already have points, in as few scrolls as possible.
+
+        Each scroll matches every still-unresolved link at once; sources found
+        are dropped from the next filter so a link with many chunks is not
+        paged through. A short page means every match has been seen.
+        """
+        found = set()
+        remaining = list(links)
+        page_size = max(len(remaining), settings.qdrant.validity_page_size)
+        while remaining:
+            points, _ = self.vectorstore.client.scroll(
                 collection_name=self.vectorstore.collection_name,
                 scroll_filter=rest.Filter(
                     must=[
                         rest.FieldCondition(
-                            key="metadata.source",
-                            match=rest.MatchValue(value=link)
+                            key=SOURCE_KEY,
+                            match=rest.MatchAny(any=remaining)
                         )
                     ]
                 ),
-                limit=1
+                limit=page_size,
+                with_payload=rest.PayloadSelectorInclude(include=[SOURCE_KEY]),
+                with_vectors=False,
             )
+            sources = {
+                (point.payload or {}).get("metadata", {}).get("source") for point in points
+            }
+            found.update(sources)
+            if len(points) < page_size:
+                break
+            remaining = [link for link in remaining if link not in sources]
+        return found
+
+    def embedding_stats(self):
+        stats = getattr(self.embeddings, "stats", None)
+        return stats() if stats is not None else None
+
+    def embedding_client_stats(self):
+        client = self.embeddings
+        if isinstance(client, CachedEmbeddings):
+            client = client.embeddings
+        stats = getattr(client, "stats", None)
+        return stats() if stats is not None else None
+
+    def check_validity(self, links: list):
+        if settings.qdrant.ensure_source_index:
+            self.ensure_source_index()
+
+        unique_links = list(dict.fromkeys(links))
+        batch_size = settings.qdrant.validity_batch_size
+        found = set()
+        for start in range(0, len(unique_links), batch_size):
+            found.update(self._existing_sources(unique_links[start:start + batch_size]))
 
-            if results[0]:
+        clean_link = defaultdict(list)
+        for link in links:
+            if link in found:
                 clean_link["exists"].append(link)
             else:
                 clean_link["not_exists"].append(link)
@@ -87,23 +278,36 @@ class Knowledge(object):
         )
         return response
     
+    async def asummary(self, raw):
+        if self.admission is None:
+            return await self.chain.ainvoke({"input": raw}, config={"callbacks": [CallbackHandler()]})
+        # Ingestion yields to interactive agent runs for the shared LLM capacity.
+        async with self.admission.admit(
+            "background",
+            tokens=estimate_tokens(raw) + settings.admission.output_tokens,
+        ):
+            return await self.chain.ainvoke({"input": raw}, config={"callbacks": [CallbackHandler()]})
+
+    @staticmethod
+    def clean_summary(summ, metadata):
+        summ = re.sub(r"<think>.*?</think>", "", summ.strip(), flags=re.DOTALL)
+        return Document(
+            page_content=summ,
+            metadata=metadata
+        )
+
     def reformat(self, docs):
         results = []
         for doc in docs:
-            page_content = doc.page_content
-            metadata = doc.metadata
-
-            summ = self.summary(page_content)
-            summ = re.sub(r"<think>.*?</think>", "", summ.strip(), flags=re.DOTALL)
-            results.append(
-                Document(
-                    page_content=summ,
-                    metadata=metadata
-                )
-            )
+            summ = self.summary(doc.page_content)
+            results.append(self.clean_summary(summ, doc.metadata))
 
         return results
 
+    async def areformat_document(self, doc):
+        summ = await self.asummary(doc.page_content)
+        return self.clean_summary(summ, doc.metadata)
+
     def load_content(self, links: list):
         loader = WebBaseLoader(links)
         docs = loader.load()
@@ -113,6 +317,88 @@ class Knowledge(object):
         chunks = self.semantic_splitter.split_documents(docs)
         return chunks
 
+    def chucking_with_vectors(self, docs):
+        """Chunk ``docs`` as ``(chunk, vector)`` pairs.
+
+        With ``QDRANT_CHUNK_VECTORS=pooled`` the vector is pooled from the
+        sentence embeddings computed while chunking; otherwise, or for texts
+        too short to have been embedded, it is ``None`` and the chunk text
+        still needs embedding.
+        """
+        if settings.qdrant.chunk_vectors == "pooled":
+            return self.semantic_splitter.split_documents_with_vectors(docs)
+        return [(chunk, None) for chunk in self.chucking(docs)]
+
+    def add_chunks(self, pairs):
+        """Upsert ``(chunk, vector)`` pairs, embedding only chunks without a vector."""
+        with_vectors = [(chunk, vector) for chunk, vector in pairs if vector is not None]
+        without = [chunk for chunk, vector in pairs if vector is None]
+        if with_vectors:
+            self.add_embeddings(
+                [chunk for chunk, _ in with_vectors],
+                [vector.tolist() for _, vector in with_vectors],
+            )
+        if without:
+            self.vectorstore.add_documents(without)
+            self.invalidate_queries()
+
+    def add_embeddings(self, docs, vectors):
+        """Upsert ``docs`` with precomputed dense ``vectors`` (no re-embedding)."""
+        store = self.vectorstore
+        payloads = store._build_payloads(
+            [doc.page_content for doc in docs],
+            [doc.metadata for doc in docs],
+            store.content_payload_key,
+            store.metadata_payload_key,
+        )
+        points = [
+            rest.PointStruct(id=uuid.uuid4().hex, vector={store.vector_name: vector}, payload=payload)
+            for vector, payload in zip(vectors, payloads)
+        ]
+        store.client.upsert(collection_name=store.collection_name, points=points)
+        self.invalidate_queries()
+        return [point.id for point in points]
+
+    def delete_sources(self, links: list):
+        """Delete every point whose ``metadata.source`` is one of ``links``."""
+        store = self.vectorstore
+        store.client.delete(
+            collection_name=store.collection_name,
+            points_selector=rest.FilterSelector(
+                filter=rest.Filter(
+                    must=[rest.FieldCondition(key=SOURCE_KEY, match=rest.MatchAny(any=list(links)))]
+                )
+            ),
+        )
+        self.invalidate_queries()
+
+    async def aupload_link(self, links: list, on_progress=None, executor=None, raise_on_failure=True):
+        """Pipelined :meth:`upload_link`: fetch, clean, chunk, embed and upsert overlap.
+
+        With ``raise_on_failure=False`` failed links are returned under
+        ``failed`` (link -> "stage: error") instead of raising.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            clean_link = await loop.run_in_executor(executor, self.check_validity, links)
+        except Exception as e:
+            raise ValueError(f"Failed scroll from vectorstore: {e}")
+
+        not_exist_links = clean_link["not_exists"]
+        result = dict(clean_link)
+        result["check_ms"] = int((time.perf_counter() - start) * 1000)
+        if len(not_exist_links) > 0:
+            pipeline = IngestionPipeline(self, on_progress=on_progress, executor=executor)
+            outcome = await pipeline.run(not_exist_links)
+            result["stages"] = outcome["stats"]
+            result["failed"] = outcome["failed"]
+            if outcome["failed"] and raise_on_failure:
+                errors = "; ".join(f"{link} ({error})" for link, error in outcome["failed"].items())
+                raise ValueError(f"Failed to load documents: {errors}")
+
+        return result
+
     def upload_link(self, links: list):
         try:
             clean_link = self.check_validity(links)
@@ -126,13 +412,13 @@ class Knowledge(object):
             if len(not_exist_links) > 0:
                 docs = self.load_content(not_exist_links)
                 docs = self.reformat(docs)
-                chunks = self.chucking(docs)
+                chunks = self.chucking_with_vectors(docs)
         except Exception as e:
             raise ValueError(f"Failed to load documents: {e}")
         
         try:
             if len(chunks) > 0:
-                self.vectorstore.add_documents(chunks)
+                self.add_chunks(chunks)
         except Exception as e:
             raise ValueError(f"Failed add documents to vectorstore: {e}")
         
@@ -2,15 +2,15 @@
 
 import copy
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, cast
 
 import numpy as np
-from langchain_community.utils.math import (
-    cosine_similarity,
-)
 from langchain_core.documents import BaseDocumentTransformer, Document
 from langchain_core.embeddings import Embeddings
 
+from orion.tools.embedding_client import batch_ranges
+
 
 def combine_sentences(sentences: List[dict], buffer_size: int = 1) -> List[dict]:
     """Combine sentences based on buffer size.
@@ -53,34 +53,97 @@ def combine_sentences(sentences: List[dict], buffer_size: int = 1) -> List[dict]
     return sentences
 
 
-def calculate_cosine_distances(sentences: List[dict]) -> Tuple[List[float], List[dict]]:
-    """Calculate cosine distances between sentences.
+def adjacent_cosine_distances(embeddings: Any) -> np.ndarray:
+    """Cosine distance between each embedding row and the next one.
+
+    Rows are normalised once and paired with the matrix shifted by one row, so
+    ``n`` embeddings cost a single vectorised pass instead of ``n - 1``
+    ``cosine_similarity`` calls. Like ``cosine_similarity``, a zero vector has
+    similarity 0 (distance 1) to everything.
 
     Args:
-        sentences: List of sentences to calculate distances for.
+        embeddings: ``n x d`` embeddings, as a matrix or a list of rows.
 
     Returns:
-        Tuple of distances and sentences.
+        Array of ``n - 1`` distances.
     """
-    distances = []
-    for i in range(len(sentences) - 1):
-        embedding_current = sentences[i]["combined_sentence_embedding"]
-        embedding_next = sentences[i + 1]["combined_sentence_embedding"]
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if len(matrix) < 2:
+        return np.zeros(0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    similarity = np.einsum("ij,ij->i", normalized[:-1], normalized[1:])
+    return 1.0 - similarity.astype(np.float64)
 
-        # Calculate cosine similarity
-        similarity = cosine_similarity([embedding_current], [embedding_next])[0][0]
 
-        # Convert to cosine distance
-        distance = 1 - similarity
+def window_embeddings(
+    embeddings: Any, buffer_size: int = 1, weights: Optional[Sequence[float]] = None
+) -> np.ndarray:
+    """Average each sentence embedding with its ``buffer_size`` neighbours.
 
-        # Append cosine distance to the list
-        distances.append(distance)
+    This is the embedding-space counterpart of :func:`combine_sentences`:
+    every sentence is embedded once, and its window is built from rows that
+    are already there rather than by re-embedding the joined text. Rows are
+    normalised first so long sentences do not dominate the window.
 
-        # Store distance in the dictionary
-        sentences[i]["distance_to_next"] = distance
+    Args:
+        embeddings: ``n x d`` sentence embeddings.
+        buffer_size: Number of neighbours on each side. Defaults to 1.
+        weights: Weight per distance from the centre sentence, starting
+            with the sentence itself; ``buffer_size + 1`` values. Defaults to
+            uniform.
+
+    Returns:
+        ``n x d`` float32 matrix of window embeddings.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if weights is None:
+        weights = [1.0] * (buffer_size + 1)
+    if len(weights) != buffer_size + 1:
+        raise ValueError(
+            f"Expected {buffer_size + 1} window weights, got {len(weights)}"
+        )
 
-    # Optionally handle the last sentence
-    # sentences[-1]['distance_to_next'] = None  # or a default value
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    n = len(matrix)
+    window = np.zeros_like(normalized)
+    total = np.zeros((n, 1), dtype=np.float32)
+    for offset in range(-buffer_size, buffer_size + 1):
+        weight = np.float32(weights[abs(offset)])
+        lo, hi = max(0, -offset), min(n, n - offset)
+        if lo >= hi:
+            continue
+        window[lo:hi] += weight * normalized[lo + offset : hi + offset]
+        total[lo:hi] += weight
+    return window / np.maximum(total, np.finfo(np.float32).tiny)
+
+
+def pool_embeddings(embeddings: Any) -> np.ndarray:
+    """Normalised mean of embedding rows, used as the vector of a whole chunk."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    mean = normalized.mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return mean / norm if norm > 0 else mean
+
+
+def calculate_cosine_distances(sentences: List[dict]) -> Tuple[List[float], List[dict]]:
+    """Calculate cosine distances between sentences.
+
+    Args:
+        sentences: List of sentences to calculate distances for.
+
+    Returns:
+        Tuple of distances and sentences.
+    """
+    distances = adjacent_cosine_distances(
+        [sentence["combined_sentence_embedding"] for sentence in sentences]
+    ).tolist()
+    for sentence, distance in zip(sentences, distances):
+        sentence["distance_to_next"] = distance
 
     return distances, sentences
 
@@ -88,6 +151,7 @@ def calculate_cosine_distances(sentences: List[dict]) -> Tuple[List[float], List
 BreakpointThresholdType = Literal[
     "percentile", "standard_deviation", "interquartile", "gradient"
 ]
+EmbeddingMode = Literal["combined", "windowed"]
 BREAKPOINT_DEFAULTS: Dict[BreakpointThresholdType, float] = {
     "percentile": 95,
     "standard_deviation": 3,
@@ -106,6 +170,15 @@ class SemanticChunker(BaseDocumentTransformer):
 
     At a high level, this splits into sentences, then groups into groups of 3
     sentences, and then merges one that are similar in the embedding space.
+
+    With ``embedding_mode="windowed"`` each sentence is embedded once and the
+    groups are formed by averaging neighbouring embeddings
+    (:func:`window_embeddings`), which sends roughly ``2 * buffer_size + 1``
+    times fewer tokens to the embedding endpoint than embedding every group.
+
+    ``create_documents`` embeds the sentences of all documents together, cut
+    into requests of at most ``batch_size`` texts and roughly
+    ``batch_tokens`` tokens, with up to ``max_concurrency`` in flight.
     """
 
     def __init__(
@@ -118,6 +191,11 @@ class SemanticChunker(BaseDocumentTransformer):
         number_of_chunks: Optional[int] = None,
         sentence_split_regex: str = r"(?<=[.?!])\s+",
         min_chunk_size: Optional[int] = None,
+        embedding_mode: EmbeddingMode = "combined",
+        window_weights: Optional[Sequence[float]] = None,
+        batch_size: Optional[int] = None,
+        batch_tokens: Optional[int] = None,
+        max_concurrency: int = 1,
     ):
         self._add_start_index = add_start_index
         self.embeddings = embeddings
@@ -132,10 +210,17 @@ class SemanticChunker(BaseDocumentTransformer):
         else:
             self.breakpoint_threshold_amount = breakpoint_threshold_amount
         self.min_chunk_size = min_chunk_size
+        if embedding_mode not in ("combined", "windowed"):
+            raise ValueError(f"Got unexpected `embedding_mode`: {embedding_mode}")
+        self.embedding_mode = embedding_mode
+        self.window_weights = window_weights
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.max_concurrency = max_concurrency
 
     def _calculate_breakpoint_threshold(
-        self, distances: List[float]
-    ) -> Tuple[float, List[float]]:
+        self, distances: np.ndarray
+    ) -> Tuple[float, np.ndarray]:
         if self.breakpoint_threshold_type == "percentile":
             return cast(
                 float,
@@ -167,7 +252,7 @@ class SemanticChunker(BaseDocumentTransformer):
                 f"{self.breakpoint_threshold_type}"
             )
 
-    def _threshold_from_clusters(self, distances: List[float]) -> float:
+    def _threshold_from_clusters(self, distances: np.ndarray) -> float:
         """
         Calculate the threshold based on the number of chunks.
         Inverse of percentile method.
@@ -191,41 +276,46 @@ class SemanticChunker(BaseDocumentTransformer):
 
         return cast(float, np.percentile(distances, y))
 
-    def _calculate_sentence_distances(
-        self, single_sentences_list: List[str]
-    ) -> Tuple[List[float], List[dict]]:
-        """Split text into multiple components."""
-
+    def _split_sentences(self, text: str) -> List[str]:
+        # Splitting the essay (by default on '.', '?', and '!')
+        return re.split(self.sentence_split_regex, text)
+
+    def _needs_embedding(self, sentences: List[str]) -> bool:
+        # having len(sentences) == 1 would cause the following np.percentile
+        # to fail; similarly, np.gradient would fail on two sentences.
+        if len(sentences) == 1:
+            return False
+        if self.breakpoint_threshold_type == "gradient" and len(sentences) == 2:
+            return False
+        return True
+
+    def _embedding_inputs(self, single_sentences_list: List[str]) -> List[str]:
+        """Texts to embed for one document: raw or buffered sentences."""
+        if self.embedding_mode == "windowed":
+            return list(single_sentences_list)
         _sentences = [
             {"sentence": x, "index": i} for i, x in enumerate(single_sentences_list)
         ]
-        sentences = combine_sentences(_sentences, self.buffer_size)
-        embeddings = self.embeddings.embed_documents(
-            [x["combined_sentence"] for x in sentences]
-        )
-        for i, sentence in enumerate(sentences):
-            sentence["combined_sentence_embedding"] = embeddings[i]
+        return [x["combined_sentence"] for x in combine_sentences(_sentences, self.buffer_size)]
 
-        return calculate_cosine_distances(sentences)
+    def _distances_from_embeddings(self, embeddings: Any) -> np.ndarray:
+        if self.embedding_mode == "windowed":
+            embeddings = window_embeddings(embeddings, self.buffer_size, self.window_weights)
+        return adjacent_cosine_distances(embeddings)
 
-    def split_text(
-        self,
-        text: str,
-    ) -> List[str]:
-        # Splitting the essay (by default on '.', '?', and '!')
-        single_sentences_list = re.split(self.sentence_split_regex, text)
+    def _calculate_sentence_distances(
+        self, single_sentences_list: List[str]
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Embed the buffered sentences and return adjacent cosine distances."""
+        embeddings = self.embeddings.embed_documents(
+            self._embedding_inputs(single_sentences_list)
+        )
+        return self._distances_from_embeddings(embeddings), single_sentences_list
 
-        # having len(single_sentences_list) == 1 would cause the following
-        # np.percentile to fail.
-        if len(single_sentences_list) == 1:
-            return single_sentences_list
-        # similarly, the following np.gradient would fail
-        if (
-            self.breakpoint_threshold_type == "gradient"
-            and len(single_sentences_list) == 2
-        ):
-            return single_sentences_list
-        distances, sentences = self._calculate_sentence_distances(single_sentences_list)
+    def _chunk_ranges(
+        self, sentences: List[str], distances: np.ndarray
+    ) -> List[Tuple[int, int]]:
+        """Sentence ``(start, end)`` ranges of the chunks, end exclusive."""
         if self.number_of_chunks is not None:
             breakpoint_distance_threshold = self._threshold_from_clusters(distances)
             breakpoint_array = distances
@@ -235,13 +325,11 @@ class SemanticChunker(BaseDocumentTransformer):
                 breakpoint_array,
             ) = self._calculate_breakpoint_threshold(distances)
 
-        indices_above_thresh = [
-            i
-            for i, x in enumerate(breakpoint_array)
-            if x > breakpoint_distance_threshold
-        ]
+        indices_above_thresh = np.flatnonzero(
+            np.asarray(breakpoint_array) > breakpoint_distance_threshold
+        ).tolist()
 
-        chunks = []
+        ranges = []
         start_index = 0
 
         # Iterate through the breakpoints to slice the sentences
@@ -249,43 +337,121 @@ class SemanticChunker(BaseDocumentTransformer):
             # The end index is the current breakpoint
             end_index = index
 
-            # Slice the sentence_dicts from the current start index to the end index
-            group = sentences[start_index : end_index + 1]
-            combined_text = " ".join([d["sentence"] for d in group])
             # If specified, merge together small chunks.
+            combined_text = " ".join(sentences[start_index : end_index + 1])
             if (
                 self.min_chunk_size is not None
                 and len(combined_text) < self.min_chunk_size
             ):
                 continue
-            chunks.append(combined_text)
+            ranges.append((start_index, end_index + 1))
 
             # Update the start index for the next group
             start_index = index + 1
 
         # The last group, if any sentences remain
         if start_index < len(sentences):
-            combined_text = " ".join([d["sentence"] for d in sentences[start_index:]])
-            chunks.append(combined_text)
-        return chunks
+            ranges.append((start_index, len(sentences)))
+        return ranges
 
-    def create_documents(
-        self, texts: List[str], metadatas: Optional[List[dict]] = None
-    ) -> List[Document]:
-        """Create documents from a list of texts."""
+    def _chunks_from_distances(
+        self, sentences: List[str], distances: np.ndarray
+    ) -> List[str]:
+        return [
+            " ".join(sentences[start:end])
+            for start, end in self._chunk_ranges(sentences, distances)
+        ]
+
+    def split_text(
+        self,
+        text: str,
+    ) -> List[str]:
+        single_sentences_list = self._split_sentences(text)
+        if not self._needs_embedding(single_sentences_list):
+            return single_sentences_list
+        distances, sentences = self._calculate_sentence_distances(single_sentences_list)
+        return self._chunks_from_distances(sentences, distances)
+
+    def _batches(self, texts: List[str]) -> List[Tuple[int, int]]:
+        """Cut ``texts`` into ``(start, end)`` runs within the item/token limits."""
+        return batch_ranges(texts, self.batch_size, self.batch_tokens)
+
+    def _embed_batched(self, texts: List[str]) -> np.ndarray:
+        """Embed ``texts`` in batches, up to ``max_concurrency`` requests at once."""
+        batches = self._batches(texts)
+
+        def embed(batch: Tuple[int, int]) -> np.ndarray:
+            start, end = batch
+            return np.asarray(
+                self.embeddings.embed_documents(texts[start:end]), dtype=np.float32
+            )
+
+        if self.max_concurrency > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                results = list(executor.map(embed, batches))
+        else:
+            results = [embed(batch) for batch in batches]
+        return np.vstack(results)
+
+    def _split_texts(
+        self, texts: List[str]
+    ) -> List[List[Tuple[str, Optional[np.ndarray]]]]:
+        """Split several texts with one batched embedding pass across all of them.
+
+        Sentences of every text are embedded together, then each text's
+        distances are computed over its own slice of the shared matrix. Each
+        chunk comes with the normalised mean of its sentence rows, or ``None``
+        when the text was too short to embed.
+        """
+        sentences_per_text = [self._split_sentences(text) for text in texts]
+        inputs: List[str] = []
+        slices: List[Optional[Tuple[int, int]]] = []
+        for sentences in sentences_per_text:
+            if self._needs_embedding(sentences):
+                embedding_inputs = self._embedding_inputs(sentences)
+                slices.append((len(inputs), len(inputs) + len(embedding_inputs)))
+                inputs.extend(embedding_inputs)
+            else:
+                slices.append(None)
+
+        matrix = self._embed_batched(inputs) if inputs else None
+        results = []
+        for sentences, rows in zip(sentences_per_text, slices):
+            if rows is None:
+                results.append([(sentence, None) for sentence in sentences])
+                continue
+            text_rows = matrix[rows[0] : rows[1]]
+            distances = self._distances_from_embeddings(text_rows)
+            results.append(
+                [
+                    (" ".join(sentences[start:end]), pool_embeddings(text_rows[start:end]))
+                    for start, end in self._chunk_ranges(sentences, distances)
+                ]
+            )
+        return results
+
+    def _documents(
+        self, texts: List[str], metadatas: Optional[List[dict]]
+    ) -> List[Tuple[Document, Optional[np.ndarray]]]:
         _metadatas = metadatas or [{}] * len(texts)
         documents = []
-        for i, text in enumerate(texts):
+        for i, chunks in enumerate(self._split_texts(texts)):
             start_index = 0
-            for chunk in self.split_text(text):
+            for chunk, vector in chunks:
                 metadata = copy.deepcopy(_metadatas[i])
                 if self._add_start_index:
                     metadata["start_index"] = start_index
                 new_doc = Document(page_content=chunk, metadata=metadata)
-                documents.append(new_doc)
+                documents.append((new_doc, vector))
                 start_index += len(chunk)
         return documents
 
+    def create_documents(
+        self, texts: List[str], metadatas: Optional[List[dict]] = None
+    ) -> List[Document]:
+        """Create documents from a list of texts."""
+        return [doc for doc, _ in self._documents(texts, metadatas)]
+
     def split_documents(self, documents: Iterable[Document]) -> List[Document]:
         """Split documents."""
         texts, metadatas = [], []
@@ -294,6 +460,20 @@ class SemanticChunker(BaseDocumentTransformer):
             metadatas.append(doc.metadata)
         return self.create_documents(texts, metadatas=metadatas)
 
+    def split_documents_with_vectors(
+        self, documents: Iterable[Document]
+    ) -> List[Tuple[Document, Optional[np.ndarray]]]:
+        """Split documents and pool each chunk's sentence embeddings into its vector.
+
+        The vector is ``None`` for chunks of texts that were too short to be
+        embedded while splitting.
+        """
+        texts, metadatas = [], []
+        for doc in documents:
+            texts.append(doc.page_content)
+            metadatas.append(doc.metadata)
+        return self._documents(texts, metadatas)
+
     def transform_documents(
         self, documents: Sequence[Document], **kwargs: Any
     ) -> Sequence[Document]:
@@ -0,0 +1,113 @@
+"""Benchmark the link-existence check against an in-memory Qdrant collection.
+
+Usage:
+    python scripts/bench_check_validity.py --points 100000 --links 500
+
+Fills a local ``:memory:`` collection with ``--points`` chunks spread over
+``--points / --chunks-per-source`` sources, then checks ``--links`` links (half
+of them present) with the old one-scroll-per-link loop and with
+``Knowledge.check_validity``. Both must categorize the links identically.
+Pass ``--url`` to run against a real Qdrant server instead, where the
+``metadata.source`` keyword index is also used. The in-memory client scans
+points in Python, so the per-link baseline takes minutes at 100k points.
+"""
+
+import argparse
+import random
+import time
+import types
+import uuid
+from collections import defaultdict
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from orion.tools.knowledge import SOURCE_KEY, Knowledge
+
+COLLECTION = "bench_check_validity"
+
+
+def fill(client, points, chunks_per_source, batch=1000):
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=rest.VectorParams(size=4, distance=rest.Distance.COSINE),
+    )
+    for start in range(0, points, batch):
+        client.upsert(
+            collection_name=COLLECTION,
+            points=[
+                rest.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=[random.random() for _ in range(4)],
+                    payload={
+                        "page_content": "chunk",
+                        "metadata": {"source": f"https://docs.example/{i // chunks_per_source}"},
+                    },
+                )
+                for i in range(start, min(points, start + batch))
+            ],
+        )
+
+
+def per_link(client, links):
+    clean_link = defaultdict(list)
+    for link in links:
+        results = client.scroll(
+            collection_name=COLLECTION,
+            scroll_filter=rest.Filter(
+                must=[rest.FieldCondition(key=SOURCE_KEY, match=rest.MatchValue(value=link))]
+            ),
+            limit=1,
+        )
+        clean_link["exists" if results[0] else "not_exists"].append(link)
+    return clean_link
+
+
+def batched(client, links):
+    # Only the vectorstore handle is needed; skip the LLM and embedding setup.
+    knowledge = Knowledge.__new__(Knowledge)
+    knowledge.vectorstore = types.SimpleNamespace(client=client, collection_name=COLLECTION)
+    knowledge._source_index_ready = False
+    return knowledge.check_validity(links)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--chunks-per-source", type=int, default=5)
+    parser.add_argument("--links", type=int, default=500)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url) if args.url else QdrantClient(":memory:")
+    start = time.perf_counter()
+    fill(client, args.points, args.chunks_per_source)
+    print(f"filled {args.points} points in {time.perf_counter() - start:.1f}s")
+
+    sources = args.points // args.chunks_per_source
+    links = [
+        f"https://docs.example/{random.randrange(sources)}"
+        if i % 2 == 0
+        else f"https://missing.example/{i}"
+        for i in range(args.links)
+    ]
+
+    old, old_ms = timed(per_link, client, links)
+    new, new_ms = timed(batched, client, links)
+    assert dict(old) == dict(new), "batched check disagrees with per-link check"
+
+    print(f"per-link scrolls: {old_ms:.1f} ms ({len(links)} requests)")
+    print(f"batched MatchAny: {new_ms:.1f} ms")
+    print(f"speedup: {old_ms / new_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Simulate a noisy tenant next to interactive users and compare their latency.
+
+Usage:
+    python scripts/bench_fair_scheduler.py --noisy 300 --quiet-users 10 --capacity 8
+
+One user fires ``--noisy`` agent runs at once while ``--quiet-users`` users
+each send ``--quiet-requests`` runs one after another. A run holds one of
+``--capacity`` slots for ``--service-ms``. With a plain FIFO semaphore the
+quiet users queue behind the whole burst; with ``FairScheduler`` their
+latency should stay near the service time while the noisy user absorbs the
+wait (and ``429``s once its own queue is full).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import statistics
+import time
+
+from orion.admission import AdmissionRejected
+from orion.agent.scheduler import FairScheduler
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class FifoGate(object):
+    def __init__(self, capacity):
+        self.semaphore = asyncio.Semaphore(capacity)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, user_id, cost=1):
+        async with self.semaphore:
+            yield
+
+
+async def simulate(gate, args):
+    latencies = {"noisy": [], "quiet": []}
+    rejected = {"noisy": 0, "quiet": 0}
+
+    async def one(kind, user_id):
+        start = time.perf_counter()
+        try:
+            async with gate.slot(user_id):
+                await asyncio.sleep(args.service_ms / 1000)
+        except AdmissionRejected:
+            rejected[kind] += 1
+            return
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    async def quiet_user(i):
+        await asyncio.sleep(args.quiet_delay_ms / 1000)
+        for _ in range(args.quiet_requests):
+            await one("quiet", f"quiet-{i}")
+            await asyncio.sleep(args.think_ms / 1000)
+
+    await asyncio.gather(
+        *(one("noisy", "noisy") for _ in range(args.noisy)),
+        *(quiet_user(i) for i in range(args.quiet_users)),
+    )
+    return latencies, rejected
+
+
+def report(name, latencies, rejected):
+    for kind in ("quiet", "noisy"):
+        values = latencies[kind]
+        if not values:
+            print(f"{name:>5} {kind:>5}: all {rejected[kind]} requests rejected")
+            continue
+        print(
+            f"{name:>5} {kind:>5}: n={len(values)} rejected={rejected[kind]} "
+            f"p50={percentile(values, 50):.0f}ms p95={percentile(values, 95):.0f}ms "
+            f"max={max(values):.0f}ms mean={statistics.mean(values):.0f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--noisy", type=int, default=300, help="Runs the noisy user fires at once")
+    parser.add_argument("--quiet-users", type=int, default=10)
+    parser.add_argument("--quiet-requests", type=int, default=5, help="Sequential runs per quiet user")
+    parser.add_argument("--quiet-delay-ms", type=float, default=10, help="When quiet users start")
+    parser.add_argument("--think-ms", type=float, default=20, help="Pause between a quiet user's runs")
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--service-ms", type=float, default=50)
+    parser.add_argument("--user-concurrency", type=int, default=4)
+    parser.add_argument("--user-queue", type=int, default=1000)
+    args = parser.parse_args()
+
+    fifo = asyncio.run(simulate(FifoGate(args.capacity), args))
+    fair = asyncio.run(
+        simulate(
+            FairScheduler(
+                max_concurrency=args.capacity,
+                user_concurrency=args.user_concurrency,
+                user_queue=args.user_queue,
+                max_wait_s=3600,
+            ),
+            args,
+        )
+    )
+    report("fifo", *fifo)
+    report("fair", *fair)
+
+    quiet_fifo = percentile(fifo[0]["quiet"], 95)
+    quiet_fair = percentile(fair[0]["quiet"], 95)
+    print(f"quiet p95: {quiet_fifo:.0f}ms -> {quiet_fair:.0f}ms ({quiet_fifo / quiet_fair:.1f}x better)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare knowledge tool-call latency over MCP and in-process.
+
+Usage:
+    python scripts/bench_knowledge_tool.py --calls 50 --query "what is orion"
+
+Uses the same ``.env`` as the API. The MCP mode needs the knowledge MCP server
+at ``MCP_KNOWLEDGE_URL``; the local mode only needs Qdrant and the embedding
+endpoint. Both modes embed the query and search Qdrant, so the difference is
+the MCP hop (transport, session and JSON round-trip) per call.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from langfuse import Langfuse
+
+from orion.agent.agent import Agent
+from orion.agent.helper import aload_prompt
+from orion.agent.mcp_pool import build_mcp_pool
+from orion.config import settings
+from orion.tools.knowledge import Knowledge
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(tool, query, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await tool.ainvoke({"query": query})
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(mode, latencies):
+    print(
+        f"{mode:>6}: calls={len(latencies)} "
+        f"mean={statistics.mean(latencies):.1f}ms "
+        f"p50={percentile(latencies, 50):.1f}ms "
+        f"p95={percentile(latencies, 95):.1f}ms "
+        f"p99={percentile(latencies, 99):.1f}ms"
+    )
+
+
+async def run(args):
+    prompt = await aload_prompt(settings, Langfuse())
+    knowledge = Knowledge(prompt=prompt)
+
+    if args.mode in ("mcp", "both"):
+        pool = build_mcp_pool() if args.pooled else None
+        tools = await Agent.load_tools(pool)
+        tool = next(tool for tool in tools if tool.name == "knowledge")
+        await tool.ainvoke({"query": args.query})
+        report("mcp", await measure(tool, args.query, args.calls))
+        if pool is not None:
+            await pool.close()
+
+    if args.mode in ("local", "both"):
+        tool = knowledge.as_tool()
+        await tool.ainvoke({"query": args.query})
+        report("local", await measure(tool, args.query, args.calls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["mcp", "local", "both"], default="both")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--query", default="What is Orion?")
+    parser.add_argument(
+        "--pooled",
+        action="store_true",
+        help="Use the pooled MCP sessions (MCP_POOL_SIZE) instead of a session per call",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Compare SemanticChunker breakpoints in ``combined`` and ``windowed`` modes.
+
+Usage:
+    python scripts/compare_semantic_modes.py                 # HF endpoint from .env
+    python scripts/compare_semantic_modes.py --offline       # hashed bag-of-words
+
+Each fixture document is a list of topical sections; the true breakpoints are
+the section boundaries. For both modes the script reports the embedding
+requests and characters sent, the breakpoint F1 against the true boundaries
+(a boundary within ``--tolerance`` sentences counts as a hit), and how often
+the two modes agree with each other.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from orion.tools.semantic import SemanticChunker
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "semantic_corpus.json")
+
+
+class CountingEmbeddings(object):
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.requests = 0
+        self.texts = 0
+        self.chars = 0
+
+    def embed_documents(self, texts):
+        self.requests += 1
+        self.texts += len(texts)
+        self.chars += sum(len(text) for text in texts)
+        return self.embeddings.embed_documents(texts)
+
+
+class HashingEmbeddings(object):
+    """Offline stand-in: hashed word counts, enough to separate topics lexically."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def embed_documents(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z]{4,}", text.lower()):
+                matrix[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        return matrix.tolist()
+
+
+def breakpoints(chunker, sentences):
+    """Sentence indices after which the chunker starts a new chunk."""
+    distances, _ = chunker._calculate_sentence_distances(sentences)
+    threshold, array = chunker._calculate_breakpoint_threshold(distances)
+    return set(np.flatnonzero(np.asarray(array) > threshold).tolist())
+
+
+def f1(predicted, truth, tolerance):
+    hits = sum(1 for p in predicted if any(abs(p - t) <= tolerance for t in truth))
+    found = sum(1 for t in truth if any(abs(p - t) <= tolerance for p in predicted))
+    precision = hits / len(predicted) if predicted else 0.0
+    recall = found / len(truth) if truth else 1.0
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--buffer-size", type=int, default=1)
+    parser.add_argument("--threshold", type=float, default=80)
+    parser.add_argument("--tolerance", type=int, default=0)
+    parser.add_argument("--fixture", default=FIXTURE)
+    args = parser.parse_args()
+
+    if args.offline:
+        base = HashingEmbeddings()
+    else:
+        from orion.tools.knowledge import build_embeddings
+
+        base = build_embeddings()
+
+    with open(args.fixture) as f:
+        corpus = json.load(f)
+
+    counters = {mode: CountingEmbeddings(base) for mode in ("combined", "windowed")}
+    chunkers = {
+        mode: SemanticChunker(
+            counter,
+            buffer_size=args.buffer_size,
+            breakpoint_threshold_amount=args.threshold,
+            embedding_mode=mode,
+        )
+        for mode, counter in counters.items()
+    }
+
+    scores = {mode: [] for mode in counters}
+    agreement = []
+    for doc in corpus:
+        sentences = [sentence for section in doc["sections"] for sentence in section]
+        truth, position = set(), -1
+        for section in doc["sections"][:-1]:
+            position += len(section)
+            truth.add(position)
+
+        found = {mode: breakpoints(chunker, sentences) for mode, chunker in chunkers.items()}
+        for mode in counters:
+            scores[mode].append(f1(found[mode], truth, args.tolerance))
+        union = found["combined"] | found["windowed"]
+        agreement.append(len(found["combined"] & found["windowed"]) / len(union) if union else 1.0)
+        print(
+            f"{doc['id']:<24} truth={sorted(truth)} "
+            f"combined={sorted(found['combined'])} windowed={sorted(found['windowed'])}"
+        )
+
+    print()
+    for mode, counter in counters.items():
+        print(
+            f"{mode:>9}: requests={counter.requests} texts={counter.texts} "
+            f"chars={counter.chars} boundary F1={np.mean(scores[mode]):.2f}"
+        )
+    saved = counters["combined"].chars / max(counters["windowed"].chars, 1)
+    print(f"characters embedded: {saved:.1f}x fewer in windowed mode")
+    print(f"breakpoint agreement (Jaccard): {np.mean(agreement):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Fire concurrent /v1/agent/generate calls and report latency percentiles.
+
+Usage:
+    python scripts/load_test.py --url http://localhost:8000 --token $TOKEN \
+        --requests 200 --concurrency 20
+
+Run it twice, once against a fast MongoDB and once with added latency (for
+example ``tc qdisc add dev eth0 root netem delay 100ms`` on the Mongo host), and
+compare p99: with the async history store it should only grow by the added
+round-trips of the request itself, not by the queue of other requests.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    errors = 0
+    headers = {"Authorization": f"Bearer {args.token}"}
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+
+        async def one(i):
+            nonlocal errors
+            payload = {
+                "input": args.question,
+                "session_id": f"load-{i % args.sessions}",
+                "user_id": f"load-user-{uuid.uuid4().hex[:8]}",
+            }
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(args.path, json=payload, headers=headers)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    return
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*[one(i) for i in range(args.requests)])
+
+    if latencies:
+        print(f"requests={len(latencies)} errors={errors}")
+        print(f"p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms "
+              f"p99={percentile(latencies, 99):.1f}ms mean={statistics.mean(latencies):.1f}ms")
+    else:
+        print(f"all {errors} requests failed")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/v1/agent/generate")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--question", default="What are the key offerings covered in the knowledge base?")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import os
 import sys
 import types
 
+import pytest
+
 # Provide a lightweight stub for optional dependencies that are not installed in the
 # test environment. The application imports ``MultiServerMCPClient`` from
 # ``langchain_mcp_adapters.client`` during module import time, so we pre-populate
@@ -41,3 +43,8 @@ if not hasattr(_lc_agents, "create_agent"):
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
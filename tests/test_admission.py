@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from orion.admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+async def _hold(controller, priority, order, name, hold_s=0.02, **kwargs):
+    async with controller.admit(priority, **kwargs):
+        order.append(name)
+        await asyncio.sleep(hold_s)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_concurrency_is_bounded():
+    controller = AdmissionController(max_concurrency=2)
+    peak = 0
+
+    async def run():
+        nonlocal peak
+        async with controller.admit():
+            peak = max(peak, controller.stats()["in_flight"])
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(run() for _ in range(6)))
+
+    stats = controller.stats()
+    assert peak == 2
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 6
+    assert stats["max_queue"] == 4
+
+
+@pytest.mark.anyio("asyncio")
+async def test_interactive_calls_overtake_queued_background_calls():
+    controller = AdmissionController(max_concurrency=1)
+    order = []
+
+    blocker = asyncio.create_task(_hold(controller, "interactive", order, "first", hold_s=0.05))
+    await asyncio.sleep(0)
+    background = [
+        asyncio.create_task(_hold(controller, "background", order, f"bg{i}")) for i in range(2)
+    ]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(_hold(controller, "interactive", order, "user"))
+    await asyncio.sleep(0)
+
+    assert controller.stats()["queued_by_priority"] == {"interactive": 1, "background": 2}
+    await asyncio.gather(blocker, interactive, *background)
+
+    assert order == ["first", "user", "bg0", "bg1"]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_sheds_when_the_wait_would_exceed_the_deadline():
+    controller = AdmissionController(max_concurrency=1, max_wait_s=0.05)
+    order = []
+
+    holder = asyncio.create_task(_hold(controller, "interactive", order, "slow", hold_s=0.2))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected) as queued_out:
+        await controller.acquire("interactive")
+    await holder
+
+    # The first run taught the controller how long a slot is held, so a new
+    # call behind a busy slot is rejected up front instead of queueing.
+    holder = asyncio.create_task(_hold(controller, "interactive", order, "slow", hold_s=0.2))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    with pytest.raises(AdmissionRejected) as estimated:
+        await controller.acquire("interactive")
+    assert time.perf_counter() - start < 0.02
+    await holder
+
+    assert queued_out.value.retry_after_s >= 1
+    assert estimated.value.retry_after_s >= 1
+    stats = controller.stats()
+    assert stats["rejected"] == 2 and stats["timed_out"] == 1
+    assert stats["rejection_rate"] == 0.5
+    assert stats["queued"] == 0 and stats["in_flight"] == 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_token_budget_per_minute_delays_admission():
+    controller = AdmissionController(max_concurrency=4, tokens_per_minute=600)
+    controller.tokens = TokenBucket(rate=1000, capacity=100)
+
+    start = time.perf_counter()
+    async with controller.admit(tokens=100):
+        pass
+    async with controller.admit(tokens=50):
+        pass
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 0.04
+
+
+@pytest.mark.anyio("asyncio")
+async def test_cancelled_waiter_gives_up_its_place():
+    controller = AdmissionController(max_concurrency=1)
+    order = []
+
+    holder = asyncio.create_task(_hold(controller, "interactive", order, "first", hold_s=0.03))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(controller.acquire("interactive"))
+    waiting = asyncio.create_task(_hold(controller, "interactive", order, "next"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.gather(holder, waiting)
+
+    assert order == ["first", "next"]
+    assert controller.stats()["in_flight"] == 0
@@ -1,3 +1,4 @@
+import asyncio
 import types
 from datetime import datetime, timedelta
 
@@ -10,7 +11,9 @@ def stub_settings():
         app_name="Test App",
         version="0.1.0",
         token="test-token",
-        groq=types.SimpleNamespace(api_key="fake-key"),
+        request_timeout_s=30,
+        groq=types.SimpleNamespace(api_key="fake-key", timeout_s=30),
+        admission=types.SimpleNamespace(output_tokens=256, agent_requests=2),
         mongodb=types.SimpleNamespace(
             uri="mongodb://localhost",
             database="test_db",
@@ -37,6 +40,8 @@ def agent_module(monkeypatch, stub_settings):
         def __init__(self, prompt=None):
             self.prompt = prompt
             self.upload_calls = []
+            self.embeddings = None
+            self.collection_version = 0
 
         def upload_link(self, links):
             self.upload_calls.append(list(links))
@@ -50,7 +55,7 @@ def agent_module(monkeypatch, stub_settings):
             self.list_calls = []
             self.get_history_calls = []
 
-        def save(
+        async def save(
             self,
             *,
             user_id,
@@ -73,7 +78,7 @@ def agent_module(monkeypatch, stub_settings):
             self.saved_records.append(record)
             return record
 
-        def list(
+        async def list(
             self,
             *,
             user_id,
@@ -112,7 +117,10 @@ def agent_module(monkeypatch, stub_settings):
                 records = records[:limit]
             return list(records)
 
-        def get_history_for_messages(self, user_id, session_id, size):
+        def stats(self):
+            return {"queue_depth": 0}
+
+        async def get_history_for_messages(self, user_id, session_id, size):
             self.get_history_calls.append(
                 {"user_id": user_id, "session_id": session_id, "size": size}
             )
@@ -152,13 +160,32 @@ def agent_module(monkeypatch, stub_settings):
             self.calls.append((state, config))
             return {"messages": [types.SimpleNamespace(content="graph-answer")]}  # noqa: B950
 
+        async def astream_events(self, state, config, version="v2"):
+            self.calls.append((state, config))
+            chunk = lambda text: {"chunk": types.SimpleNamespace(content=text)}  # noqa: E731
+            end = lambda run_id, tool_calls: {  # noqa: E731
+                "event": "on_chat_model_end",
+                "run_id": run_id,
+                "data": {"output": types.SimpleNamespace(tool_calls=tool_calls)},
+            }
+            yield {"event": "on_chat_model_stream", "run_id": "r1", "data": chunk("<think>plan")}
+            yield {"event": "on_chat_model_stream", "run_id": "r1", "data": chunk("</think>Let me look ")}
+            yield {"event": "on_chat_model_stream", "run_id": "r1", "data": chunk("that up.")}
+            yield end("r1", [{"name": "knowledge", "args": {"query": "orion"}}])
+            yield {"event": "on_tool_start", "name": "knowledge", "data": {"input": {"query": "orion"}}}
+            yield {"event": "on_tool_end", "name": "knowledge", "data": {"output": "docs"}}
+            for text in ["<thi", "nk>hidden</th", "ink>Orion ", "is an agent"]:
+                yield {"event": "on_chat_model_stream", "run_id": "r2", "data": chunk(text)}
+            yield end("r2", [])
+
     async def fake_graph_builder(self):
         return FakeGraph(self.model)
 
     monkeypatch.setattr(agent_module, "Langfuse", FakeLangfuse)
     monkeypatch.setattr(agent_module, "Knowledge", FakeKnowledge)
     monkeypatch.setattr(agent_module, "ChatGroq", FakeChatGroq)
-    monkeypatch.setattr(agent_module, "HistoryStore", FakeHistoryStore)
+    monkeypatch.setattr(agent_module, "AsyncHistoryStore", FakeHistoryStore)
+    monkeypatch.setattr(agent_module, "build_mcp_pool", lambda: None)
     monkeypatch.setattr(agent_module, "load_prompt", fake_load_prompt)
     monkeypatch.setattr(agent_module, "settings", stub_settings)
     monkeypatch.setattr(agent_module.Agent, "graph_builder", fake_graph_builder)
@@ -167,18 +194,13 @@ def agent_module(monkeypatch, stub_settings):
     return agent_module
 
 
-@pytest.fixture
-def anyio_backend():
-    return "asyncio"
-
-
 def test_agent_initializes_components(agent_module):
     agent = agent_module.Agent()
 
     assert agent.model.kwargs["model"] == "stub-model"
     assert agent.model.kwargs["api_key"] == "fake-key"
     assert agent.knowledge.prompt["knowledge"]["description"] == "Access knowledge base"
-    assert isinstance(agent.history_store, agent_module.HistoryStore)
+    assert isinstance(agent.history_store, agent_module.AsyncHistoryStore)
 
 
 @pytest.mark.anyio("asyncio")
@@ -219,18 +241,241 @@ async def test_agent_get_history_filters_by_user_and_session(agent_module):
     await agent.generate("Question 2", session_id="session-1", user_id="user-1")
     await agent.generate("Question 3", session_id="session-1", user_id="user-2")
 
-    recent = agent.get_history(user_id="user-1", session_id="session-1")
+    recent = await agent.get_history(user_id="user-1", session_id="session-1")
     assert [entry["input"] for entry in recent] == ["Question 2", "Question 1"]
     for entry in recent:
         assert entry["user_id"] == "user-1"
         assert entry["session_id"] == "session-1"
         assert entry["answer"] == "graph-answer"
 
-    oldest_first = agent.get_history(user_id="user-1", session_id="session-1", order="ASC")
+    oldest_first = await agent.get_history(user_id="user-1", session_id="session-1", order="ASC")
     assert [entry["input"] for entry in oldest_first] == ["Question 1", "Question 2"]
 
 
-def test_agent_get_history_rejects_invalid_order(agent_module):
+@pytest.mark.anyio("asyncio")
+async def test_agent_get_history_rejects_invalid_order(agent_module):
     agent = agent_module.Agent()
     with pytest.raises(ValueError):
-        agent.get_history(user_id="user-1", session_id="session-1", order="invalid")
+        await agent.get_history(user_id="user-1", session_id="session-1", order="invalid")
+
+
+def test_think_filter_handles_tags_split_across_chunks(agent_module):
+    from orion.agent.helper import ThinkFilter
+
+    think_filter = ThinkFilter()
+    chunks = ["Hi <", "think>secret <b>", "</thi", "nk> there", " <th"]
+    visible = "".join(think_filter.feed(chunk) for chunk in chunks) + think_filter.flush()
+
+    assert visible == "Hi  there <th"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_generate_stream_emits_tokens_and_saves_turn(agent_module):
+    agent = agent_module.Agent()
+    history = agent.history_store
+    history.saved_records.clear()
+
+    events = [
+        event
+        async for event in agent.generate_stream("What is Orion?", session_id="s", user_id="u")
+    ]
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "done"
+    assert "tool_start" in kinds and "tool_end" in kinds
+    # The preamble of the run that ended in a tool call is streamed, then discarded.
+    assert events[kinds.index("discard")] == ("discard", {"run": 0})
+    assert kinds.index("token") < kinds.index("discard") < kinds.index("tool_start")
+    discarded = {data["run"] for kind, data in events if kind == "discard"}
+    streamed = "".join(
+        data["text"] for kind, data in events if kind == "token" and data["run"] not in discarded
+    )
+    assert streamed == "Orion is an agent"
+
+    done = events[-1][1]
+    assert done["answer"] == "Orion is an agent"
+    assert done["ttft_ms"] is not None
+    assert history.saved_records[-1]["answer"] == "Orion is an agent"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_get_graph_builds_once_under_concurrency(agent_module, monkeypatch):
+    builds = []
+
+    async def slow_builder(self):
+        builds.append(1)
+        await asyncio.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(agent_module.Agent, "graph_builder", slow_builder)
+    agent = agent_module.Agent()
+
+    graphs = await asyncio.gather(*[agent.get_graph() for _ in range(10)])
+
+    assert len(builds) == 1
+    assert all(graph is graphs[0] for graph in graphs)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_refresh_graph_swaps_without_blocking_runs(agent_module, monkeypatch):
+    agent = agent_module.Agent()
+    old_graph = await agent.get_graph()
+
+    async def failing_builder(self):
+        raise RuntimeError("mcp down")
+
+    monkeypatch.setattr(agent_module.Agent, "graph_builder", failing_builder)
+    assert await agent.refresh_graph() is False
+    assert agent.graph is old_graph
+    assert agent.get_metrics()["graph"]["refresh_errors"] == 1
+
+    new_graph = object()
+
+    async def new_builder(self):
+        return new_graph
+
+    monkeypatch.setattr(agent_module.Agent, "graph_builder", new_builder)
+    assert await agent.refresh_graph() is True
+    assert agent.graph is new_graph
+    assert agent.get_metrics()["graph"]["builds"] == 2
+
+
+class KeywordEmbeddings:
+    """Maps a question to a one-hot vector of the first known keyword in it."""
+
+    KEYWORDS = ["hours", "price", "orion"]
+
+    def __init__(self):
+        self.queries = []
+
+    async def aembed_query(self, text):
+        self.queries.append(text)
+        vector = [0.0] * (len(self.KEYWORDS) + 1)
+        index = next((i for i, word in enumerate(self.KEYWORDS) if word in text), len(self.KEYWORDS))
+        vector[index] = 1.0
+        return vector
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_answer_cache_serves_similar_standalone_questions(agent_module):
+    from orion.agent.answer_cache import SemanticAnswerCache
+
+    agent = agent_module.Agent()
+    agent.answer_cache = SemanticAnswerCache(KeywordEmbeddings(), threshold=0.9)
+
+    first = await agent.generate("What are your opening hours?", session_id="s1", user_id="u1")
+    second = await agent.generate("opening hours please", session_id="s2", user_id="u2")
+
+    assert first == second == "graph-answer"
+    assert len(agent.graph.calls) == 1
+    assert agent.history_store.saved_records[-1]["answer"] == "graph-answer"
+    stats = agent.get_metrics()["answer_cache"]
+    assert stats["hits"] == 1 and stats["lookups"] == 2
+    assert stats["hit_rate"] == 0.5
+    assert stats["saved_latency_ms"] >= 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_answer_cache_skips_follow_ups_and_new_versions(agent_module):
+    from orion.agent.answer_cache import SemanticAnswerCache
+
+    agent = agent_module.Agent()
+    agent.answer_cache = SemanticAnswerCache(KeywordEmbeddings(), threshold=0.9)
+
+    await agent.generate("What is orion?", session_id="s1", user_id="u1")
+    # Same session: the previous question is about the same thing, so this is a follow-up.
+    await agent.generate("And orion pricing?", session_id="s1", user_id="u1")
+    agent.knowledge.collection_version += 1
+    await agent.generate("Tell me about orion", session_id="s2", user_id="u2")
+
+    assert len(agent.graph.calls) == 3
+    stats = agent.get_metrics()["answer_cache"]
+    assert stats["not_standalone"] == 1
+    assert stats["stale"] == 1
+    assert stats["hits"] == 0
+
+
+class SlowGraph:
+    """Graph whose run blocks inside a tool call until cancelled."""
+
+    def __init__(self):
+        self.cancelled = asyncio.Event()
+
+    async def _tool(self):
+        from orion.deadline import tool_stage
+
+        with tool_stage("knowledge"):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                self.cancelled.set()
+                raise
+
+    async def ainvoke(self, state, config):
+        await self._tool()
+
+    async def astream_events(self, state, config, version="v2"):
+        yield {"event": "on_tool_start", "name": "knowledge", "data": {"input": {"query": "orion"}}}
+        await self._tool()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_generate_deadline_names_the_stage_and_cancels_the_run(agent_module, stub_settings):
+    from orion.deadline import DeadlineExceeded
+
+    stub_settings.request_timeout_s = 0.05
+    agent = agent_module.Agent()
+    agent.graph = SlowGraph()
+
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        await agent.generate("What is Orion?", session_id="s", user_id="u")
+
+    assert excinfo.value.stage == "tool:knowledge"
+    assert agent.graph.cancelled.is_set()
+    assert agent.history_store.saved_records == []
+    assert agent.get_metrics()["scheduler"]["in_flight"] == 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_generate_stream_is_cancelled_when_the_client_goes_away(agent_module):
+    agent = agent_module.Agent()
+    agent.graph = SlowGraph()
+
+    stream = agent.generate_stream("What is Orion?", session_id="s", user_id="u")
+    assert (await stream.__anext__())[0] == "tool_start"
+    await asyncio.sleep(0.01)
+    await stream.aclose()
+
+    await asyncio.wait_for(agent.graph.cancelled.wait(), timeout=1)
+    assert agent.history_store.saved_records == []
+
+
+class GatedStreamGraph:
+    """Streams one answer chunk, then waits before ending the model run."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.ended = False
+
+    async def astream_events(self, state, config, version="v2"):
+        chunk = {"chunk": types.SimpleNamespace(content="Orion ")}
+        yield {"event": "on_chat_model_stream", "run_id": "r1", "data": chunk}
+        await self.release.wait()
+        self.ended = True
+        output = types.SimpleNamespace(tool_calls=[])
+        yield {"event": "on_chat_model_end", "run_id": "r1", "data": {"output": output}}
+
+
+@pytest.mark.anyio("asyncio")
+async def test_agent_generate_stream_sends_tokens_before_the_run_ends(agent_module):
+    agent = agent_module.Agent()
+    agent.graph = GatedStreamGraph()
+
+    stream = agent.generate_stream("What is Orion?", session_id="s", user_id="u")
+    first = await asyncio.wait_for(stream.__anext__(), timeout=1)
+
+    assert first == ("token", {"text": "Orion ", "run": 0})
+    assert not agent.graph.ended
+    agent.graph.release.set()
+    events = [event async for event in stream]
+    assert events[-1][1]["answer"] == "Orion"
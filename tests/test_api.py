@@ -8,6 +8,10 @@ from fastapi.testclient import TestClient
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi import status, HTTPException
 
+from orion.admission import AdmissionRejected
+from orion.agent.scheduler import UserQueueFull
+from orion.deadline import DeadlineExceeded
+
 
 @pytest.fixture
 def stub_settings(monkeypatch):
@@ -40,13 +44,32 @@ def api_client(monkeypatch, stub_settings):
         def __init__(self):
             self.calls = []
             self.history_calls = []
+            self.history_cursors = []
             self.knowledge = FakeKnowledge()
 
         async def generate(self, input, session_id, user_id, extra_callbacks=None):
             self.calls.append((input, session_id, user_id))
+            if input == "overload":
+                raise AdmissionRejected("LLM capacity exhausted", retry_after_s=7)
+            if input == "flood":
+                raise UserQueueFull("user user-1 already has 20 requests waiting", retry_after_s=3)
+            if input == "slow":
+                raise DeadlineExceeded("tool:knowledge", 30)
             return f"answer for {input}"
 
-        def get_history(self, user_id, session_id, order="DESC", offset=0, limit=20):
+        async def generate_stream(self, input, session_id, user_id, extra_callbacks=None):
+            self.calls.append((input, session_id, user_id))
+            if input == "overload":
+                raise AdmissionRejected("LLM capacity exhausted", retry_after_s=7)
+            if input == "flood":
+                raise UserQueueFull("user user-1 already has 20 requests waiting", retry_after_s=3)
+            if input == "slow":
+                raise DeadlineExceeded("tool:knowledge", 30)
+            yield "token", {"text": "answer "}
+            yield "token", {"text": f"for {input}"}
+            yield "done", {"answer": f"answer for {input}", "session_id": session_id, "latency_ms": 1, "ttft_ms": 1}
+
+        async def get_history(self, user_id, session_id, order="DESC", offset=0, limit=20):
             self.history_calls.append((user_id, session_id, order, offset, limit))
             return [
                 {
@@ -58,15 +81,40 @@ def api_client(monkeypatch, stub_settings):
                 }
             ]
 
+        async def get_history_page(
+            self, user_id, session_id, order="DESC", offset=0, limit=20, cursor=None
+        ):
+            if cursor == "bad":
+                raise ValueError("cursor is invalid")
+            self.history_cursors.append(cursor)
+            histories = await self.get_history(user_id, session_id, order, offset, limit)
+            return {"histories": histories, "next_cursor": "next-page"}
+
     class FakeKnowledge:
         def __init__(self):
             self.upload_calls = []
+            self.query_calls = []
+            self.failing = set()
+
+        def embedding_stats(self):
+            return {"hit_ratio": 0.5, "memory_bytes": 1024, "disk_bytes": 4096}
 
-        def upload_link(self, links):
+        def embedding_client_stats(self):
+            return {"requests": 3, "retries": 1}
+
+        def query_stats(self):
+            return {"collection_version": 2}
+
+        async def aquery(self, query, k=None, score_threshold=None):
+            self.query_calls.append((query, k, score_threshold))
+            return {"context": f"Source: https://a\n{query}", "cached": False}
+
+        async def aupload_link(self, links, on_progress=None, raise_on_failure=True):
             self.upload_calls.append(list(links))
             return {
                 "exists": links[:1],
                 "not_exists": links[1:],
+                "failed": {link: "fetch: boom" for link in links[1:] if link in self.failing},
             }
 
     modules_to_clear = [
@@ -82,15 +130,50 @@ def api_client(monkeypatch, stub_settings):
     monkeypatch.setattr("orion.tools.knowledge.Knowledge", FakeKnowledge)
     monkeypatch.setattr("orion.main.settings", stub_settings, raising=False)
 
-    agent_routes = importlib.import_module("orion.api.v1.agent.routes")
-    knowledge_routes = importlib.import_module("orion.api.v1.knowledge.routes")
+    class FakeJobs:
+        def __init__(self):
+            self.jobs = {}
+            self.full = False
+
+        async def submit(self, links):
+            from orion.tools.jobs import JobQueueFull
+
+            if self.full:
+                raise JobQueueFull("Ingestion queue is full (1 jobs)")
+            job_id = f"job-{len(self.jobs) + 1}"
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "links": list(links),
+                "progress": {link: {"status": "queued", "stage": None} for link in links},
+                "stages": {},
+                "timings_ms": {},
+                "created_at": "2024-01-01T00:00:00+00:00",
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+            }
+            return self.jobs[job_id]
+
+        async def get(self, job_id):
+            return self.jobs.get(job_id)
+
+        def stats(self):
+            return {"queued": 0, "capacity": 1}
+
+    from orion.api.v1 import deps
 
-    monkeypatch.setattr(agent_routes, "_agent", FakeAgent())
-    monkeypatch.setattr(knowledge_routes, "_knowledge", FakeKnowledge())
+    agent = FakeAgent()
+    knowledge = FakeKnowledge()
+    knowledge.jobs = FakeJobs()
 
     main = importlib.import_module("orion.main")
+    main.app.dependency_overrides[deps.get_agent] = lambda: agent
+    main.app.dependency_overrides[deps.get_knowledge] = lambda: knowledge
+    main.app.dependency_overrides[deps.get_jobs] = lambda: knowledge.jobs
     client = TestClient(main.app)
-    return client, agent_routes._agent, knowledge_routes._knowledge
+    yield client, agent, knowledge
+    main.app.dependency_overrides.clear()
 
 
 def test_root_endpoint(api_client):
@@ -112,6 +195,65 @@ def test_agent_generate_endpoint(api_client, stub_settings):
     assert agent.calls[-1] == ("hello", "abc", "user-1")
 
 
+def test_agent_generate_stream_endpoint(api_client, stub_settings):
+    client, agent, _ = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+    payload = {"input": "hello", "session_id": "abc", "user_id": "user-1"}
+
+    response = client.post("/v1/agent/generate/stream", json=payload, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert events[0].startswith("event: token")
+    assert events[-1].startswith("event: done")
+    assert '"answer": "answer for hello"' in events[-1]
+    assert agent.calls[-1] == ("hello", "abc", "user-1")
+
+
+def test_agent_generate_sheds_load_with_retry_after(api_client, stub_settings):
+    client, _, _ = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+    payload = {"input": "overload", "session_id": "abc", "user_id": "user-1"}
+
+    response = client.post("/v1/agent/generate", json=payload, headers=headers)
+    streamed = client.post("/v1/agent/generate/stream", json=payload, headers=headers)
+
+    for shed in (response, streamed):
+        assert shed.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert shed.headers["Retry-After"] == "7"
+        assert shed.json()["detail"]["message"] == "Agent is overloaded"
+
+
+def test_agent_generate_throttles_a_flooding_user(api_client, stub_settings):
+    client, _, _ = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+    payload = {"input": "flood", "session_id": "abc", "user_id": "user-1"}
+
+    response = client.post("/v1/agent/generate", json=payload, headers=headers)
+    streamed = client.post("/v1/agent/generate/stream", json=payload, headers=headers)
+
+    for throttled in (response, streamed):
+        assert throttled.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert throttled.headers["Retry-After"] == "3"
+        assert throttled.json()["detail"]["message"] == "Too many requests for this user"
+
+
+def test_agent_generate_timeout_names_the_stage(api_client, stub_settings):
+    client, _, _ = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+    payload = {"input": "slow", "session_id": "abc", "user_id": "user-1"}
+
+    response = client.post("/v1/agent/generate", json=payload, headers=headers)
+    streamed = client.post("/v1/agent/generate/stream", json=payload, headers=headers)
+
+    for timed_out in (response, streamed):
+        assert timed_out.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        detail = timed_out.json()["detail"]
+        assert detail["stage"] == "tool:knowledge"
+        assert detail["message"] == "Agent timed out during tool:knowledge"
+
+
 def test_agent_generate_requires_token(api_client):
     client, _, _ = api_client
     response = client.post("/v1/agent/generate", json={"input": "hi", "session_id": "s", "user_id": "user"})
@@ -169,6 +311,28 @@ def test_agent_history_endpoint_with_pagination(api_client, stub_settings):
     assert agent.history_calls[-1] == ("user-1", "session-1", "DESC", 5, 10)
 
 
+def test_agent_history_endpoint_with_cursor(api_client, stub_settings):
+    client, agent, _ = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+
+    response = client.get(
+        "/v1/agent/history",
+        params={"user_id": "user-1", "session_id": "session-1", "cursor": "abc"},
+        headers=headers,
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["next_cursor"] == "next-page"
+    assert agent.history_cursors[-1] == "abc"
+
+    response = client.get(
+        "/v1/agent/history",
+        params={"user_id": "user-1", "session_id": "session-1", "cursor": "bad"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 def test_knowledge_upload_link(api_client, stub_settings):
     client, _, knowledge = api_client
     headers = {"Authorization": f"Bearer {stub_settings.token}"}
@@ -187,11 +351,119 @@ def test_knowledge_upload_link(api_client, stub_settings):
     assert body["counts"] == {
         "skipped": 1,
         "processed": 1,
+        "failed": 0,
         "total_input": 3,
         "total_unique": 2,
     }
 
 
+def test_knowledge_upload_link_reports_failed_links(api_client, stub_settings):
+    client, _, knowledge = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+    links = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+    knowledge.failing = {"https://example.com/c"}
+
+    response = client.post("/v1/knowledge/upload-link", json={"links": links}, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["processed"] == ["https://example.com/b"]
+    assert body["failed"] == {"https://example.com/c": "fetch: boom"}
+    assert body["counts"]["failed"] == 1
+
+    # Nothing was processed: every new link failed.
+    knowledge.failing = {"https://example.com/b", "https://example.com/c"}
+    response = client.post("/v1/knowledge/upload-link", json={"links": links}, headers=headers)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.json()["detail"]["failed"]) == {"https://example.com/b", "https://example.com/c"}
+
+
+def test_knowledge_upload_link_async_job(api_client, stub_settings):
+    client, _, knowledge = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+    payload = {"links": ["https://example.com/a", "https://example.com/a"]}
+
+    response = client.post(
+        "/v1/knowledge/upload-link", params={"mode": "async"}, json=payload, headers=headers
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    body = response.json()
+    assert body == {"job_id": "job-1", "status": "queued", "links": 1}
+    assert knowledge.upload_calls == []
+
+    knowledge.jobs.jobs["job-1"]["progress"]["https://example.com/a"] = {
+        "status": "running",
+        "stage": "embed",
+        "chunks": 3,
+    }
+    response = client.get("/v1/knowledge/jobs/job-1", headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    job = response.json()
+    assert job["status"] == "queued"
+    assert job["progress"] == [
+        {
+            "link": "https://example.com/a",
+            "status": "running",
+            "stage": "embed",
+            "chunks": 3,
+            "error": None,
+        }
+    ]
+
+    assert client.get("/v1/knowledge/jobs/missing", headers=headers).status_code == 404
+
+
+def test_knowledge_upload_link_async_queue_full(api_client, stub_settings):
+    client, _, knowledge = api_client
+    knowledge.jobs.full = True
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+
+    response = client.post(
+        "/v1/knowledge/upload-link",
+        params={"mode": "async"},
+        json={"links": ["https://example.com/a"]},
+        headers=headers,
+    )
+
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_knowledge_metrics(api_client, stub_settings):
+    client, _, _ = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+
+    response = client.get("/v1/knowledge/metrics", headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "embedding_cache": {"hit_ratio": 0.5, "memory_bytes": 1024, "disk_bytes": 4096},
+        "embedding_client": {"requests": 3, "retries": 1},
+        "query_cache": {"collection_version": 2},
+        "jobs": {"queued": 0, "capacity": 1},
+    }
+
+
+def test_knowledge_query(api_client, stub_settings):
+    client, _, knowledge = api_client
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+
+    response = client.post(
+        "/v1/knowledge/query",
+        json={"query": "what is orion", "top_k": 3, "score_threshold": 0.4},
+        headers=headers,
+    )
+    invalid = client.post("/v1/knowledge/query", json={"query": "x", "top_k": 0}, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"context": "Source: https://a\nwhat is orion", "cached": False}
+    assert knowledge.query_calls == [("what is orion", 3, 0.4)]
+    assert invalid.status_code == 422
+
+
 def test_health_endpoints(api_client, stub_settings):
     client, _, _ = api_client
     headers = {"Authorization": f"Bearer {stub_settings.token}"}
@@ -203,6 +475,41 @@ def test_health_endpoints(api_client, stub_settings):
     assert knowledge_health.status_code == status.HTTP_200_OK
 
 
+def test_ready_reports_warmup_state(api_client):
+    client, _, _ = api_client
+    from orion import main
+
+    response = client.get("/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == "starting"
+
+    main.app.state.services.ready = True
+    main.app.state.services.timings = {"total": 5}
+    response = client.get("/ready")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["startup_ms"] == {"total": 5}
+
+
+def test_routes_wait_for_warmup_and_fail_when_it_fails(monkeypatch, stub_settings):
+    sys.modules.pop("orion.main", None)
+    main = importlib.import_module("orion.main")
+    services = main.app.state.services
+
+    async def failing_build():
+        raise RuntimeError("qdrant unreachable")
+
+    monkeypatch.setattr(services, "build", failing_build)
+    headers = {"Authorization": f"Bearer {stub_settings.token}"}
+
+    with TestClient(main.app) as client:
+        response = client.get("/v1/agent/metrics", headers=headers)
+        ready = client.get("/ready")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert "qdrant unreachable" in response.json()["detail"]["error"]
+    assert ready.json()["status"] == "failed"
+
+
 def test_verify_token_success(stub_settings):
     from orion.api.v1 import auth
 
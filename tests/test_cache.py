@@ -0,0 +1,33 @@
+from orion import cache as cache_module
+from orion.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_ttl_cache_bounds_bytes_and_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl_s=5, max_bytes=10, sizeof=len)
+
+    cache.set("a", "xxxxxx")
+    cache.set("b", "yyyyyy")
+    assert cache.peek("a") is None
+    assert cache.stats()["bytes"] == 6
+
+    now[0] += 6
+    assert cache.get("b") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
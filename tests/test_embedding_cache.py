@@ -0,0 +1,126 @@
+import sqlite3
+
+import pytest
+
+from orion.tools.embedding_cache import CachedEmbeddings, embedding_namespace
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.document_calls = []
+        self.query_calls = []
+
+    def _vector(self, text):
+        return [float(len(text)), float(text.count("a")), 1.0]
+
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def _cache(base, path=None, namespace="bge|{}", **kwargs):
+    return CachedEmbeddings(base, namespace=namespace, path=path, **kwargs)
+
+
+def test_repeated_texts_are_embedded_once():
+    base = CountingEmbeddings()
+    cache = _cache(base)
+
+    first = cache.embed_documents(["alpha", "beta", "alpha"])
+    second = cache.embed_documents(["beta", "gamma"])
+
+    assert base.document_calls == [["alpha", "beta"], ["gamma"]]
+    assert first == [[5.0, 2.0, 1.0], [4.0, 1.0, 1.0], [5.0, 2.0, 1.0]]
+    assert second[0] == first[1]
+    stats = cache.stats()
+    assert stats["lookups"] == 4
+    assert stats["memory_hits"] == 1
+    assert stats["hit_ratio"] == pytest.approx(0.25)
+    assert stats["memory_bytes"] == 3 * 3 * 4
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = _cache(CountingEmbeddings(), path=path)
+    cache.embed_documents(["alpha", "beta"])
+    cache.close()
+
+    base = CountingEmbeddings()
+    reopened = _cache(base, path=path)
+    vectors = reopened.embed_documents(["alpha", "beta", "delta"])
+
+    assert base.document_calls == [["delta"]]
+    assert vectors[0] == [5.0, 2.0, 1.0]
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 2
+    assert stats["disk_entries"] == 3
+    assert stats["disk_bytes"] > 0
+    reopened.close()
+
+
+def test_keys_depend_on_model_flags_and_kind(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    base = CountingEmbeddings()
+    normalized = _cache(base, path=path, namespace=embedding_namespace("bge", {"normalize": True}))
+    raw = _cache(base, path=path, namespace=embedding_namespace("bge", {"normalize": False}))
+
+    normalized.embed_documents(["alpha"])
+    raw.embed_documents(["alpha"])
+    normalized.embed_query("alpha")
+    normalized.embed_query("alpha")
+
+    assert base.document_calls == [["alpha"], ["alpha"]]
+    assert base.query_calls == ["alpha"]
+
+
+def test_memory_tier_is_bounded():
+    cache = _cache(CountingEmbeddings(), max_entries=2)
+
+    cache.embed_documents(["a", "b", "c"])
+
+    assert cache.stats()["memory_entries"] == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_async_paths_share_the_cache(tmp_path):
+    base = CountingEmbeddings()
+    cache = _cache(base, path=str(tmp_path / "embeddings.sqlite3"))
+
+    await cache.aembed_documents(["alpha", "beta"])
+    vectors = await cache.aembed_documents(["beta", "alpha"])
+    query = await cache.aembed_query("beta")
+    again = await cache.aembed_query("beta")
+
+    assert base.document_calls == [["alpha", "beta"]]
+    assert base.query_calls == ["beta"]
+    assert vectors == [[4.0, 1.0, 1.0], [5.0, 2.0, 1.0]]
+    assert query == again
+    cache.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_aclose_closes_the_wrapped_client(tmp_path):
+    base = CountingEmbeddings()
+    base.closed = False
+
+    async def aclose():
+        base.closed = True
+
+    base.aclose = aclose
+    cache = _cache(base, path=str(tmp_path / "embeddings.sqlite3"))
+
+    await cache.aclose()
+
+    assert base.closed
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.embed_query("alpha")
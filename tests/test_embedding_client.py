@@ -0,0 +1,172 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from orion.tools.embedding_client import HTTPEmbeddings, TokenBucket, batch_ranges
+
+
+class FakeEndpoint:
+    """Feature-extraction stand-in: fixed latency, scripted failure statuses."""
+
+    def __init__(self, latency=0.0, failures=(), retry_after=None):
+        self.latency = latency
+        self.failures = list(failures)
+        self.retry_after = retry_after
+        self.payloads = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, request):
+        payload = json.loads(request.content)
+        with self._lock:
+            self.payloads.append(payload)
+            status = self.failures.pop(0) if self.failures else 200
+        if status != 200:
+            headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+            return httpx.Response(status, headers=headers, json={"error": "busy"})
+        return httpx.Response(200, json=[[float(len(text))] for text in payload["inputs"]])
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def sync(self, request):
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            return self._respond(request)
+        finally:
+            self._exit()
+
+    async def asynchronous(self, request):
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+            return self._respond(request)
+        finally:
+            self._exit()
+
+
+def _client(endpoint, **kwargs):
+    kwargs.setdefault("backoff_base_s", 0.001)
+    return HTTPEmbeddings(
+        "http://embeddings.test/embed",
+        model_kwargs={"normalize": True},
+        transport=httpx.MockTransport(endpoint.sync),
+        async_transport=httpx.MockTransport(endpoint.asynchronous),
+        **kwargs,
+    )
+
+
+def test_batch_ranges_respect_item_and_token_limits():
+    texts = ["a" * 40] * 5
+
+    assert batch_ranges(texts, 2) == [(0, 2), (2, 4), (4, 5)]
+    assert batch_ranges(texts, 10, batch_tokens=25) == [(0, 2), (2, 4), (4, 5)]
+
+
+def test_embed_documents_batches_concurrently_in_order():
+    endpoint = FakeEndpoint(latency=0.05)
+    client = _client(endpoint, batch_size=2, max_concurrency=4)
+    texts = [f"text {'x' * i}\nline" for i in range(8)]
+
+    start = time.perf_counter()
+    vectors = client.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+
+    assert vectors == [[float(len(text))] for text in texts]
+    assert len(endpoint.payloads) == 4
+    assert all("\n" not in text for payload in endpoint.payloads for text in payload["inputs"])
+    assert all(payload["normalize"] is True for payload in endpoint.payloads)
+    assert endpoint.max_in_flight == 4
+    assert elapsed < 0.15
+
+
+def test_retries_throttled_requests_then_succeeds():
+    endpoint = FakeEndpoint(failures=[429, 503])
+    client = _client(endpoint)
+
+    assert client.embed_query("hello") == [5.0]
+    stats = client.stats()
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["throttled"] == 2
+    assert stats["errors"] == 0
+
+
+def test_gives_up_after_max_retries():
+    endpoint = FakeEndpoint(failures=[503] * 5)
+    client = _client(endpoint, max_retries=2)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        client.embed_documents(["hello"])
+    assert client.stats()["requests"] == 3
+    assert client.stats()["errors"] == 1
+
+
+def test_does_not_retry_client_errors():
+    endpoint = FakeEndpoint(failures=[400])
+    client = _client(endpoint)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        client.embed_documents(["hello"])
+    assert client.stats()["requests"] == 1
+
+
+def test_retry_after_header_sets_the_backoff():
+    client = _client(FakeEndpoint(), backoff_max_s=5)
+    response = httpx.Response(429, headers={"Retry-After": "2"})
+
+    assert client._backoff(0, response) == 2.0
+    assert 0 <= client._backoff(3, None) <= 0.008
+
+
+def test_token_bucket_spaces_out_requests():
+    bucket = TokenBucket(rate=10, capacity=1)
+
+    waits = [bucket.reserve() for _ in range(3)]
+
+    assert waits[0] == 0.0
+    assert waits[1] == pytest.approx(0.1, abs=0.01)
+    assert waits[2] == pytest.approx(0.2, abs=0.01)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_aembed_documents_is_concurrent_and_bounded():
+    endpoint = FakeEndpoint(latency=0.05, failures=[429])
+    client = _client(endpoint, batch_size=1, max_concurrency=3)
+    texts = [f"t{'x' * i}" for i in range(6)]
+
+    start = time.perf_counter()
+    vectors = await client.aembed_documents(texts)
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+
+    assert vectors == [[float(len(text))] for text in texts]
+    assert endpoint.max_in_flight == 3
+    assert client.stats()["retries"] == 1
+    assert elapsed < 0.25
+
+
+@pytest.mark.anyio("asyncio")
+async def test_rate_limit_applies_to_async_requests():
+    endpoint = FakeEndpoint()
+    client = _client(endpoint, batch_size=1)
+    client.bucket = TokenBucket(rate=20, capacity=1)
+
+    start = time.perf_counter()
+    await client.aembed_documents(["a", "b", "c", "d"])
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 0.14
+    assert client.stats()["rate_wait_ms"] > 0
@@ -0,0 +1,508 @@
+import asyncio
+import time
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+from orion.agent import history as history_module
+
+
+class FakeAsyncCursor:
+    def __init__(self, records):
+        self._records = list(records)
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, field_direction in reversed(keys):
+            self._records.sort(key=lambda record: record[field], reverse=field_direction < 0)
+        return self
+
+    def skip(self, offset):
+        self._records = self._records[offset:]
+        return self
+
+    def limit(self, limit):
+        self._records = self._records[:limit]
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self._records)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeAsyncCollection:
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+        self.documents = []
+        self.insert_many_calls = []
+        self.fail_inserts = False
+        self.indexes = {}
+        self.find_calls = []
+        self.find_one_calls = 0
+        self.aggregate_calls = 0
+
+    async def _wait(self):
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+    @classmethod
+    def _matches(cls, document, query):
+        for key, value in query.items():
+            if key == "$or":
+                if not any(cls._matches(document, clause) for clause in value):
+                    return False
+            elif isinstance(value, dict):
+                for op, operand in value.items():
+                    if op == "$lt" and not document.get(key) < operand:
+                        return False
+                    if op == "$gt" and not document.get(key) > operand:
+                        return False
+            elif document.get(key) != value:
+                return False
+        return True
+
+    def _matching(self, query):
+        return [dict(document) for document in self.documents if self._matches(document, query)]
+
+    async def insert_one(self, document):
+        await self._wait()
+        document.setdefault("_id", history_module.ObjectId())
+        self.documents.append(dict(document))
+
+    async def create_index(self, keys, name=None):
+        self.indexes[name] = keys
+        return name
+
+    async def insert_many(self, documents, ordered=True):
+        await self._wait()
+        self.insert_many_calls.append(len(documents))
+        if self.fail_inserts:
+            raise history_module.PyMongoError("mongo unavailable")
+        self.documents.extend(dict(document) for document in documents)
+
+    async def aggregate(self, pipeline):
+        self.aggregate_calls += 1
+        await self._wait()
+        records = self._matching(pipeline[0]["$match"])
+        records.sort(key=lambda record: record["created_at"], reverse=True)
+        records = records[: pipeline[2]["$limit"]]
+        records.sort(key=lambda record: record["created_at"])
+        return FakeAsyncCursor(records)
+
+    async def find_one(self, query, projection=None, sort=None):
+        self.find_one_calls += 1
+        records = FakeAsyncCursor(self._matching(query)).sort(sort)._records
+        return records[0] if records else None
+
+    def find(self, query, projection=None):
+        self.find_calls.append((query, projection))
+        return FakeAsyncCursor(self._matching(query))
+
+
+@pytest.fixture
+def stub_settings(monkeypatch):
+    settings = types.SimpleNamespace(
+        mongodb=types.SimpleNamespace(
+            uri="mongodb://localhost",
+            database="test_db",
+            history_collection="histories",
+            history_layout="turns",
+            bucket_collection="history_buckets",
+            bucket_size=3,
+            history_cache_enabled=False,
+            history_cache_entries=10,
+            history_cache_max_bytes=1_000_000,
+            history_cache_ttl_s=60,
+            history_cache_verify=True,
+            write_behind=False,
+            flush_size=3,
+            flush_interval_s=60,
+            max_pending=4,
+        ),
+    )
+    monkeypatch.setattr(history_module, "settings", settings)
+    return settings
+
+
+class FakeBucketCollection:
+    def __init__(self):
+        self.buckets = {}
+        self.find_one_calls = 0
+
+    @staticmethod
+    def _key(bucket_id):
+        return (bucket_id["user_id"], bucket_id["session_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        push = update["$push"]["turns"]
+        turns = self.buckets.get(self._key(query["_id"]), []) + list(push["$each"])
+        turns.sort(key=lambda turn: turn["created_at"])
+        self.buckets[self._key(query["_id"])] = turns[push["$slice"]:]
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            await self.update_one(operation._filter, operation._doc, upsert=True)
+
+    async def find_one(self, query, projection=None):
+        self.find_one_calls += 1
+        turns = self.buckets.get(self._key(query["_id"]))
+        if turns is None:
+            return None
+        return {"_id": query["_id"], "turns": turns[projection["turns"]["$slice"]:]}
+
+
+def _make_store(collection, buckets=None, **kwargs):
+    store = history_module.AsyncHistoryStore(**kwargs)
+    store._get_collection = lambda: collection
+    store._get_bucket_collection = lambda: buckets
+    return store
+
+
+@pytest.mark.anyio("asyncio")
+async def test_async_store_returns_latest_turns_as_messages(stub_settings):
+    collection = FakeAsyncCollection()
+    store = _make_store(collection)
+    base = datetime(2024, 1, 1)
+
+    for i in range(4):
+        await store.save(
+            user_id="user-1",
+            session_id="session-1",
+            input_text=f"q{i}",
+            answer=f"a{i}",
+            created_at=base + timedelta(minutes=i),
+        )
+
+    messages = await store.get_history_for_messages("user-1", "session-1", size=2)
+
+    assert messages == [
+        {"role": "user", "content": "q2"},
+        {"role": "assistant", "content": "a2"},
+        {"role": "user", "content": "q3"},
+        {"role": "assistant", "content": "a3"},
+    ]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_async_store_list_paginates(stub_settings):
+    collection = FakeAsyncCollection()
+    store = _make_store(collection)
+    base = datetime(2024, 1, 1)
+    for i in range(3):
+        await store.save(
+            user_id="user-1",
+            session_id="session-1",
+            input_text=f"q{i}",
+            answer=f"a{i}",
+            created_at=base + timedelta(minutes=i),
+        )
+
+    page = await store.list(user_id="user-1", session_id="session-1", offset=1, limit=1)
+
+    assert [entry["input"] for entry in page] == ["q1"]
+    with pytest.raises(ValueError):
+        await store.list(user_id="user-1", session_id="session-1", order="bad")
+
+
+@pytest.mark.anyio("asyncio")
+async def test_async_store_does_not_serialize_concurrent_requests(stub_settings):
+    collection = FakeAsyncCollection(latency_s=0.05)
+    store = _make_store(collection)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            store.get_history_for_messages("user-1", f"session-{i}", size=6)
+            for i in range(20)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+
+    # Twenty sequential round-trips would take a full second.
+    assert elapsed < 0.5
+
+
+@pytest.mark.anyio("asyncio")
+async def test_write_behind_reads_see_unflushed_turns(stub_settings):
+    collection = FakeAsyncCollection()
+    store = _make_store(collection, write_behind=True)
+    base = datetime(2024, 1, 1)
+
+    await store.save(user_id="u", session_id="s", input_text="q0", answer="a0", created_at=base)
+    await store.save(
+        user_id="u", session_id="s", input_text="q1", answer="a1", created_at=base + timedelta(minutes=1)
+    )
+
+    assert collection.documents == []
+    assert store.stats()["queue_depth"] == 2
+    messages = await store.get_history_for_messages("u", "s", size=6)
+    assert [message["content"] for message in messages] == ["q0", "a0", "q1", "a1"]
+
+    assert await store.flush() == 2
+    assert collection.insert_many_calls == [2]
+    assert store.stats()["queue_depth"] == 0
+    # Once flushed, turns come back from Mongo exactly once.
+    messages = await store.get_history_for_messages("u", "s", size=6)
+    assert len(messages) == 4
+    await store.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_write_behind_flushes_on_size_and_close(stub_settings):
+    collection = FakeAsyncCollection()
+    store = _make_store(collection, write_behind=True)
+
+    for i in range(3):
+        await store.save(user_id="u", session_id="s", input_text=f"q{i}", answer="a")
+    await asyncio.sleep(0)
+    assert collection.insert_many_calls == [3]
+
+    await store.save(user_id="u", session_id="s", input_text="q3", answer="a")
+    await store.close()
+    assert len(collection.documents) == 4
+    assert store.stats()["flushed"] == 4
+
+
+@pytest.mark.anyio("asyncio")
+async def test_write_behind_close_waits_for_a_running_interval_flush(stub_settings):
+    stub_settings.mongodb.flush_interval_s = 0.01
+    collection = FakeAsyncCollection(latency_s=0.2)
+    store = _make_store(collection, write_behind=True)
+    store._schedule_flush = lambda: None
+
+    for i in range(3):
+        await store.save(user_id="u", session_id="s", input_text=f"q{i}", answer="a")
+    await asyncio.sleep(0.05)
+    assert store.stats()["inflight"] == 3
+
+    await store.close()
+    assert len(collection.documents) == 3
+    assert store.stats()["dropped"] == 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_cancelled_flush_puts_its_batch_back(stub_settings):
+    collection = FakeAsyncCollection(latency_s=0.2)
+    store = _make_store(collection, write_behind=True)
+    store._schedule_flush = lambda: None
+
+    for i in range(2):
+        await store.save(user_id="u", session_id="s", input_text=f"q{i}", answer="a")
+    flush = asyncio.create_task(store.flush())
+    await asyncio.sleep(0.01)
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+
+    stats = store.stats()
+    assert stats["queue_depth"] == 2 and stats["inflight"] == 0
+    collection.latency_s = 0
+    await store.close()
+    assert len(collection.documents) == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_write_behind_requeues_failed_flush_and_counts_drops(stub_settings):
+    collection = FakeAsyncCollection()
+    collection.fail_inserts = True
+    store = _make_store(collection, write_behind=True)
+    store._schedule_flush = lambda: None
+
+    for i in range(4):
+        await store.save(user_id="u", session_id="s", input_text=f"q{i}", answer="a")
+    assert await store.flush() == 0
+    assert store.stats()["queue_depth"] == 4
+    assert store.stats()["flush_errors"] == 1
+
+    # The buffer is full, so this save forces a flush that fails again.
+    await store.save(user_id="u", session_id="s", input_text="q4", answer="a")
+    stats = store.stats()
+    assert stats["queue_depth"] == 5
+    assert stats["dropped"] == 0
+
+    await store.close()
+    assert store.stats()["dropped"] == 5
+
+
+@pytest.mark.anyio("asyncio")
+async def test_list_page_seeks_with_cursor(stub_settings):
+    collection = FakeAsyncCollection()
+    store = _make_store(collection)
+    base = datetime(2024, 1, 1)
+    # Two turns share a timestamp so the _id tie-break matters.
+    for i, minute in enumerate([0, 1, 1, 2, 3]):
+        await store.save(
+            user_id="u",
+            session_id="s",
+            input_text=f"q{i}",
+            answer="a",
+            created_at=base + timedelta(minutes=minute),
+        )
+
+    seen = []
+    cursor = None
+    while True:
+        page = await store.list_page(user_id="u", session_id="s", order="DESC", limit=2, cursor=cursor)
+        seen.extend(entry["input"] for entry in page["histories"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ["q4", "q3", "q2", "q1", "q0"]
+    query, projection = collection.find_calls[-1]
+    assert "$or" in query
+    assert "input" in projection and "_id" not in projection
+
+    with pytest.raises(ValueError):
+        await store.list_page(user_id="u", session_id="s", cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        await store.list_page(user_id="u", session_id="s", offset=1, cursor=cursor or "x")
+
+
+@pytest.mark.anyio("asyncio")
+async def test_ensure_indexes_creates_compound_index(stub_settings):
+    collection = FakeAsyncCollection()
+    store = _make_store(collection)
+
+    name = await store.ensure_indexes()
+
+    assert collection.indexes[name] == history_module.HISTORY_INDEX_KEYS
+
+
+@pytest.mark.anyio("asyncio")
+async def test_bucketed_layout_reads_context_from_single_document(stub_settings):
+    stub_settings.mongodb.history_layout = "bucketed"
+    collection = FakeAsyncCollection()
+    buckets = FakeBucketCollection()
+    store = _make_store(collection, buckets)
+    base = datetime(2024, 1, 1)
+
+    for i in range(5):
+        await store.save(
+            user_id="u", session_id="s", input_text=f"q{i}", answer=f"a{i}",
+            created_at=base + timedelta(minutes=i),
+        )
+
+    # Full turn documents stay available for /history; the bucket keeps the newest three.
+    assert len(collection.documents) == 5
+    assert [turn["input"] for turn in buckets.buckets[("u", "s")]] == ["q2", "q3", "q4"]
+
+    collection.aggregate = None  # the context fetch must not touch the aggregate path
+    messages = await store.get_history_for_messages("u", "s", size=2)
+    assert [message["content"] for message in messages] == ["q3", "a3", "q4", "a4"]
+    assert buckets.find_one_calls == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_bucketed_layout_falls_back_without_bucket_and_updates_on_flush(stub_settings):
+    stub_settings.mongodb.history_layout = "bucketed"
+    collection = FakeAsyncCollection()
+    collection.documents.append(
+        {"_id": history_module.ObjectId(), "user_id": "u", "session_id": "old",
+         "input": "legacy", "answer": "turn", "created_at": datetime(2023, 1, 1)}
+    )
+    buckets = FakeBucketCollection()
+    store = _make_store(collection, buckets, write_behind=True)
+
+    messages = await store.get_history_for_messages("u", "old", size=2)
+    assert [message["content"] for message in messages] == ["legacy", "turn"]
+
+    await store.save(user_id="u", session_id="new", input_text="q", answer="a")
+    assert ("u", "new") not in buckets.buckets
+    await store.flush()
+    assert [turn["input"] for turn in buckets.buckets[("u", "new")]] == ["q"]
+    await store.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_context_cache_serves_hot_sessions_and_tracks_saves(stub_settings):
+    stub_settings.mongodb.history_cache_enabled = True
+    stub_settings.mongodb.history_cache_verify = False
+    collection = FakeAsyncCollection()
+    store = _make_store(collection)
+    base = datetime(2024, 1, 1)
+
+    await store.save(user_id="u", session_id="s", input_text="q0", answer="a0", created_at=base)
+    assert await store.get_history_for_messages("u", "s", size=2) == [
+        {"role": "user", "content": "q0"},
+        {"role": "assistant", "content": "a0"},
+    ]
+    await store.save(
+        user_id="u", session_id="s", input_text="q1", answer="a1", created_at=base + timedelta(minutes=1)
+    )
+    await store.save(
+        user_id="u", session_id="s", input_text="q2", answer="a2", created_at=base + timedelta(minutes=2)
+    )
+
+    messages = await store.get_history_for_messages("u", "s", size=2)
+
+    assert [message["content"] for message in messages] == ["q1", "a1", "q2", "a2"]
+    assert collection.aggregate_calls == 1
+    assert collection.find_one_calls == 0
+    cache_stats = store.stats()["cache"]
+    assert cache_stats["hits"] == 1 and cache_stats["misses"] == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_context_cache_detects_writes_from_other_workers(stub_settings):
+    stub_settings.mongodb.history_cache_enabled = True
+    collection = FakeAsyncCollection()
+    store = _make_store(collection)
+    other_worker = _make_store(collection)
+    base = datetime(2024, 1, 1)
+
+    await store.save(user_id="u", session_id="s", input_text="q0", answer="a0", created_at=base)
+    await store.get_history_for_messages("u", "s", size=6)
+    await store.get_history_for_messages("u", "s", size=6)
+    assert collection.aggregate_calls == 1
+
+    await other_worker.save(
+        user_id="u", session_id="s", input_text="q1", answer="a1", created_at=base + timedelta(minutes=1)
+    )
+    messages = await store.get_history_for_messages("u", "s", size=6)
+
+    assert [message["content"] for message in messages][-2:] == ["q1", "a1"]
+    assert collection.aggregate_calls == 2
+
+
+class FakeSummaryCollection:
+    def __init__(self):
+        self.documents = {}
+
+    @staticmethod
+    def _key(_id):
+        return (_id["user_id"], _id["session_id"])
+
+    async def find_one(self, query):
+        return self.documents.get(self._key(query["_id"]))
+
+    async def update_one(self, query, update, upsert=False):
+        key = self._key(query["_id"])
+        document = self.documents.get(key, {"_id": query["_id"]})
+        document.update(update["$set"])
+        self.documents[key] = document
+
+
+@pytest.mark.anyio("asyncio")
+async def test_async_store_keeps_summary_next_to_session(stub_settings):
+    store = _make_store(FakeAsyncCollection())
+    summaries = FakeSummaryCollection()
+    store._get_summary_collection = lambda: summaries
+    covered = datetime(2024, 1, 1)
+
+    assert await store.get_summary("user-1", "session-1") is None
+    await store.save_summary("user-1", "session-1", "first", covered)
+    await store.save_summary("user-1", "session-1", "second", covered + timedelta(minutes=1))
+
+    stored = await store.get_summary("user-1", "session-1")
+    assert stored["_id"] == {"user_id": "user-1", "session_id": "session-1"}
+    assert stored["summary"] == "second"
+    assert stored["covered_until"] == covered + timedelta(minutes=1)
+    assert await store.get_summary("user-1", "session-2") is None
@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from orion.tools.ingest import STAGES, IngestionPipeline
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    async def aembed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class FakeKnowledge:
+    def __init__(self, fetch_delay=0.0, broken=(), pooled=False, fail_upsert_call=None):
+        self.fetch_delay = fetch_delay
+        self.pooled = pooled
+        self.fail_upsert_call = fail_upsert_call
+        self.upsert_calls = 0
+        self.deleted = []
+        self.broken = set(broken)
+        self.embeddings = FakeEmbeddings()
+        self.fetched_at = {}
+        self.upserted = []
+        self.vectors = []
+        self.upserted_at = []
+
+    def load_content(self, links):
+        time.sleep(self.fetch_delay)
+        for link in links:
+            if link in self.broken:
+                raise RuntimeError(f"cannot fetch {link}")
+            self.fetched_at[link] = time.perf_counter()
+        return [Document(page_content=f"raw {link}", metadata={"source": link}) for link in links]
+
+    async def areformat_document(self, doc):
+        return Document(page_content=doc.page_content.replace("raw", "clean"), metadata=doc.metadata)
+
+    def chucking_with_vectors(self, docs):
+        return [
+            (
+                Document(page_content=f"{doc.page_content} #{i}", metadata=dict(doc.metadata)),
+                np.array([9.0], dtype=np.float32) if self.pooled and i == 0 else None,
+            )
+            for doc in docs
+            for i in range(2)
+        ]
+
+    def add_embeddings(self, docs, vectors):
+        assert len(docs) == len(vectors)
+        self.upsert_calls += 1
+        if self.upsert_calls == self.fail_upsert_call:
+            raise RuntimeError("qdrant unavailable")
+        self.upserted.extend(doc.page_content for doc in docs)
+        self.vectors.extend(vectors)
+        self.upserted_at.append(time.perf_counter())
+
+    def delete_sources(self, links):
+        self.deleted.append(list(links))
+        self.upserted = [text for text in self.upserted if not any(link in text for link in links)]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pipeline_ingests_every_link_and_reports_stats():
+    knowledge = FakeKnowledge()
+    links = [f"https://example.com/{i}" for i in range(6)]
+    progress = []
+
+    pipeline = IngestionPipeline(
+        knowledge,
+        queue_size=2,
+        embed_batch_size=4,
+        on_progress=lambda link, stage, info: progress.append((link, stage, info["status"])),
+    )
+    outcome = await pipeline.run(links)
+
+    assert outcome["failed"] == {}
+    assert sorted(knowledge.upserted) == sorted(
+        f"clean {link} #{i}" for link in links for i in range(2)
+    )
+    assert all(len(batch) <= 4 for batch in knowledge.embeddings.batches)
+    assert set(outcome["stats"]) == set(STAGES)
+    assert outcome["stats"]["fetch"]["items_in"] == 6
+    assert outcome["stats"]["embed"]["items_in"] == 12
+    assert outcome["stats"]["embed"]["max_queue_depth"] <= 2
+    assert ("https://example.com/0", "upsert", "done") in progress
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pipeline_upserts_before_last_fetch():
+    knowledge = FakeKnowledge(fetch_delay=0.05)
+    links = [f"https://example.com/{i}" for i in range(5)]
+
+    pipeline = IngestionPipeline(
+        knowledge,
+        concurrency={"fetch": 1},
+        embed_batch_size=1,
+    )
+    await pipeline.run(links)
+
+    assert knowledge.upserted_at[0] < knowledge.fetched_at[links[-1]]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pipeline_isolates_failing_links():
+    knowledge = FakeKnowledge(broken={"https://example.com/bad"})
+    links = ["https://example.com/good", "https://example.com/bad"]
+
+    outcome = await IngestionPipeline(knowledge).run(links)
+
+    assert list(outcome["failed"]) == ["https://example.com/bad"]
+    assert outcome["failed"]["https://example.com/bad"].startswith("fetch:")
+    assert outcome["stats"]["fetch"]["errors"] == 1
+    assert sorted(knowledge.upserted) == [
+        "clean https://example.com/good #0",
+        "clean https://example.com/good #1",
+    ]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pipeline_only_embeds_chunks_without_pooled_vectors():
+    knowledge = FakeKnowledge(pooled=True)
+
+    outcome = await IngestionPipeline(knowledge, embed_batch_size=8).run(["https://example.com/a"])
+
+    assert outcome["failed"] == {}
+    assert knowledge.embeddings.batches == [["clean https://example.com/a #1"]]
+    assert sorted(knowledge.vectors) == sorted([[9.0], [float(len("clean https://example.com/a #1"))]])
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pipeline_deletes_chunks_of_a_link_whose_later_upsert_fails():
+    knowledge = FakeKnowledge(fail_upsert_call=2)
+
+    outcome = await IngestionPipeline(
+        knowledge, concurrency={"embed": 1, "upsert": 1}, embed_batch_size=1
+    ).run(["https://e/a"])
+
+    assert list(outcome["failed"]) == ["https://e/a"]
+    assert outcome["failed"]["https://e/a"].startswith("upsert:")
+    assert knowledge.deleted == [["https://e/a"]]
+    assert knowledge.upserted == []
@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+
+from orion.tools.jobs import IngestionJobs, JobQueueFull, LocalJobStore
+
+
+class FakeKnowledge:
+    def __init__(self, existing=(), broken=(), gate=None):
+        self.existing = set(existing)
+        self.broken = set(broken)
+        self.gate = gate
+        self.calls = []
+
+    async def aupload_link(self, links, on_progress=None, executor=None, raise_on_failure=True):
+        self.calls.append(list(links))
+        if self.gate is not None:
+            await self.gate.wait()
+        new = [link for link in links if link not in self.existing]
+        failed = {}
+        for link in new:
+            on_progress(link, "fetch", {"status": "done"})
+            if link in self.broken:
+                failed[link] = "fetch: boom"
+                on_progress(link, "clean", {"status": "failed", "error": "boom"})
+            else:
+                on_progress(link, "chunk", {"status": "done", "chunks": 2})
+        return {
+            "exists": [link for link in links if link in self.existing],
+            "not_exists": new,
+            "check_ms": 3,
+            "stages": {"fetch": {"elapsed_ms": 10}},
+            "failed": failed,
+        }
+
+
+async def _wait_for(jobs, job_id, statuses=("done", "failed")):
+    for _ in range(200):
+        job = await jobs.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.mark.anyio("asyncio")
+async def test_jobs_run_in_background_and_report_progress(tmp_path):
+    knowledge = FakeKnowledge(existing={"https://a"}, broken={"https://c"})
+    jobs = IngestionJobs(knowledge, store=LocalJobStore(str(tmp_path)), workers=1, queue_size=5)
+    await jobs.start()
+
+    job = await jobs.submit(["https://a", "https://b", "https://c"])
+    assert job["status"] == "queued"
+
+    finished = await _wait_for(jobs, job["job_id"])
+    await jobs.close()
+
+    assert finished["status"] == "failed"
+    assert finished["progress"]["https://a"] == {"status": "skipped", "stage": "check"}
+    assert finished["progress"]["https://b"] == {"status": "done", "stage": "chunk", "chunks": 2}
+    assert finished["progress"]["https://c"]["status"] == "failed"
+    assert finished["stages"] == {"fetch": {"elapsed_ms": 10}}
+    assert set(finished["timings_ms"]) == {"queued", "check", "total"}
+
+    stored = await LocalJobStore(str(tmp_path)).get(job["job_id"])
+    assert stored["status"] == "failed"
+    assert stored["progress"] == finished["progress"]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_full_queue_rejects_new_jobs(tmp_path):
+    gate = asyncio.Event()
+    jobs = IngestionJobs(
+        FakeKnowledge(gate=gate), store=LocalJobStore(str(tmp_path)), workers=1, queue_size=1
+    )
+    await jobs.start()
+
+    first = await jobs.submit(["https://a"])
+    await _wait_for(jobs, first["job_id"], statuses=("running",))
+    await jobs.submit(["https://b"])
+    with pytest.raises(JobQueueFull):
+        await jobs.submit(["https://c"])
+
+    assert jobs.stats()["rejected"] == 1
+    gate.set()
+    await jobs.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_unfinished_jobs_resume_after_restart(tmp_path):
+    gate = asyncio.Event()
+    store = LocalJobStore(str(tmp_path))
+    jobs = IngestionJobs(FakeKnowledge(gate=gate), store=store, workers=1, queue_size=5)
+    await jobs.start()
+    running = await jobs.submit(["https://a"])
+    queued = await jobs.submit(["https://b"])
+    await _wait_for(jobs, running["job_id"], statuses=("running",))
+    await jobs.close()
+
+    knowledge = FakeKnowledge()
+    restarted = IngestionJobs(knowledge, store=LocalJobStore(str(tmp_path)), workers=1, queue_size=5)
+    await restarted.start()
+
+    assert (await _wait_for(restarted, running["job_id"]))["status"] == "done"
+    assert (await _wait_for(restarted, queued["job_id"]))["status"] == "done"
+    assert knowledge.calls == [["https://a"], ["https://b"]]
+    assert restarted.stats()["recovered"] == 2
+    await restarted.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_jobs_leased_by_a_live_instance_are_left_alone(tmp_path):
+    gate = asyncio.Event()
+    owner = IngestionJobs(FakeKnowledge(gate=gate), store=LocalJobStore(str(tmp_path)), workers=1, queue_size=5)
+    owner.lease_s = 0.03
+    await owner.start()
+    running = await owner.submit(["https://a"])
+    queued = await owner.submit(["https://b"])
+    await _wait_for(owner, running["job_id"], statuses=("running",))
+
+    knowledge = FakeKnowledge()
+    other = IngestionJobs(knowledge, store=LocalJobStore(str(tmp_path)), workers=1, queue_size=5)
+    other.lease_s = 0.03
+    await other.start()
+    # Several lease periods pass while the owner keeps renewing.
+    await asyncio.sleep(0.1)
+    assert knowledge.calls == []
+    assert other.stats()["recovered"] == 0
+
+    # Once the owner stops, the other instance takes over its unfinished jobs.
+    await owner.close()
+    assert (await _wait_for(other, running["job_id"]))["status"] == "done"
+    assert (await _wait_for(other, queued["job_id"]))["status"] == "done"
+    assert other.stats()["recovered"] == 2
+    await other.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_only_jobs_with_expired_leases_are_recovered(tmp_path):
+    store = LocalJobStore(str(tmp_path))
+    for job_id, lease in (("expired", time.time() - 1), ("live", time.time() + 60)):
+        await store.save(
+            {
+                "job_id": job_id,
+                "status": "running",
+                "links": [f"https://{job_id}"],
+                "progress": {f"https://{job_id}": {"status": "running", "stage": "fetch"}},
+                "stages": {},
+                "timings_ms": {},
+                "created_at": "2026-01-01T00:00:00+00:00",
+                "owner": "crashed-replica",
+                "lease_expires_at": lease,
+            }
+        )
+
+    knowledge = FakeKnowledge()
+    jobs = IngestionJobs(knowledge, store=store, workers=1, queue_size=5)
+    await jobs.start()
+
+    assert (await _wait_for(jobs, "expired"))["owner"] == jobs.owner
+    assert knowledge.calls == [["https://expired"]]
+    assert (await store.get("live"))["owner"] == "crashed-replica"
+    assert jobs.stats()["recovered"] == 1
+    await jobs.close()
@@ -1,6 +1,7 @@
 import sys
 import types
 
+import numpy as np
 import pytest
 from unittest.mock import ANY
 
@@ -40,11 +41,32 @@ class DummySplitter:
         self.calls.append(docs)
         return self.return_value
 
+    def split_documents_with_vectors(self, docs):
+        self.calls.append(docs)
+        return self.return_value
+
+
+def _point(source):
+    return types.SimpleNamespace(payload={"metadata": {"source": source}})
+
 
 class DummyClient:
     def __init__(self):
         self.scroll_calls = []
         self.scroll_results = []
+        self.index_calls = []
+
+        self.upsert_calls = []
+        self.delete_calls = []
+
+    def create_payload_index(self, **kwargs):
+        self.index_calls.append(kwargs)
+
+    def upsert(self, **kwargs):
+        self.upsert_calls.append(kwargs)
+
+    def delete(self, **kwargs):
+        self.delete_calls.append(kwargs)
 
     def scroll(self, **kwargs):
         self.scroll_calls.append(kwargs)
@@ -54,6 +76,10 @@ class DummyClient:
 
 
 class DummyVectorStore:
+    content_payload_key = "page_content"
+    metadata_payload_key = "metadata"
+    vector_name = ""
+
     def __init__(self):
         self.collection_name = "collection"
         self.client = DummyClient()
@@ -65,9 +91,23 @@ class DummyVectorStore:
         self.similarity_search_args.append((query, k))
         return self.similarity_search_result
 
+    async def asimilarity_search(self, query, k):
+        return self.similarity_search(query, k)
+
+    def similarity_search_with_score_by_vector(self, embedding, k, score_threshold=None):
+        self.similarity_search_args.append((embedding, k, score_threshold))
+        return [(doc, 0.9) for doc in self.similarity_search_result]
+
     def add_documents(self, docs):
         self.add_documents_calls.append(docs)
 
+    @staticmethod
+    def _build_payloads(texts, metadatas, content_key, metadata_key):
+        return [
+            {content_key: text, metadata_key: metadata}
+            for text, metadata in zip(texts, metadatas)
+        ]
+
     def as_retriever(self, search_kwargs=None):
         search_kwargs = search_kwargs or {}
         vectorstore = self
@@ -94,7 +134,8 @@ def knowledge(monkeypatch):
         "orion.tools.knowledge.HuggingFaceEndpointEmbeddings",
         lambda **_: object(),
     )
-    monkeypatch.setattr("orion.tools.knowledge.ChatGroq", lambda **_: object())
+    monkeypatch.setattr(settings.embedding, "cache_path", "")
+    monkeypatch.setattr("orion.tools.knowledge.ChatGroq", lambda **kwargs: types.SimpleNamespace(**kwargs))
 
     class DummyQdrantVectorStore:
         @classmethod
@@ -152,6 +193,12 @@ def knowledge(monkeypatch):
     return knowledge_instance, vectorstore, splitter, loader_calls
 
 
+def test_cleaning_model_uses_groq_timeout(knowledge):
+    knowledge_instance, _, _, _ = knowledge
+
+    assert knowledge_instance.model.timeout == settings.groq.timeout_s
+
+
 def test_reformat_sanitizes_model_output(knowledge):
     knowledge_instance, _, _, _ = knowledge
 
@@ -176,7 +223,7 @@ def test_reformat_sanitizes_model_output(knowledge):
 
 def test_check_validity_categorizes_links(knowledge):
     knowledge_instance, vectorstore, _, _ = knowledge
-    vectorstore.client.scroll_results = [([{"id": "exists"}], None), ([], None)]
+    vectorstore.client.scroll_results = [([_point("https://first.example")], None)]
 
     result = knowledge_instance.check_validity([
         "https://first.example",
@@ -185,14 +232,38 @@ def test_check_validity_categorizes_links(knowledge):
 
     assert result["exists"] == ["https://first.example"]
     assert result["not_exists"] == ["https://second.example"]
-    assert len(vectorstore.client.scroll_calls) == 2
-    for call in vectorstore.client.scroll_calls:
-        assert call["collection_name"] == vectorstore.collection_name
+    assert len(vectorstore.client.scroll_calls) == 1
+    call = vectorstore.client.scroll_calls[0]
+    assert call["collection_name"] == vectorstore.collection_name
+    assert call["scroll_filter"].must[0].match.any == [
+        "https://first.example",
+        "https://second.example",
+    ]
+    assert vectorstore.client.index_calls[0]["field_name"] == "metadata.source"
+
+
+def test_check_validity_drops_found_sources_between_pages(monkeypatch, knowledge):
+    knowledge_instance, vectorstore, _, _ = knowledge
+    monkeypatch.setattr(settings.qdrant, "validity_page_size", 2)
+    links = ["https://a.example", "https://b.example", "https://a.example"]
+    vectorstore.client.scroll_results = [
+        ([_point("https://a.example"), _point("https://a.example")], "next"),
+        ([_point("https://b.example")], None),
+    ]
+
+    result = knowledge_instance.check_validity(links)
+    knowledge_instance.check_validity([])
+
+    assert result["exists"] == links
+    assert "not_exists" not in result
+    second_filter = vectorstore.client.scroll_calls[1]["scroll_filter"]
+    assert second_filter.must[0].match.any == ["https://b.example"]
+    assert len(vectorstore.client.index_calls) == 1
 
 
 def test_upload_link_adds_new_documents(knowledge):
     knowledge_instance, vectorstore, splitter, loader_calls = knowledge
-    vectorstore.client.scroll_results = [([{"id": "exists"}], None), ([], None)]
+    vectorstore.client.scroll_results = [([_point("https://first.example")], None)]
     splitter.return_value = [
         Document(page_content="chunk one", metadata={"chunk": 1}),
         Document(page_content="chunk two", metadata={"chunk": 2}),
@@ -229,3 +300,116 @@ def test_upload_link_wraps_check_validity_errors(monkeypatch, knowledge):
 
     with pytest.raises(ValueError, match="Failed scroll from vectorstore: boom"):
         knowledge_instance.upload_link(["https://error.example"])
+
+
+@pytest.mark.anyio("asyncio")
+async def test_as_tool_searches_local_vectorstore(knowledge):
+    knowledge_instance, vectorstore, _, _ = knowledge
+    knowledge_instance.prompt["knowledge"] = {
+        "description": "Search internal knowledge",
+        "config": {"desc_schema": {"query": "The search query"}},
+    }
+    vectorstore.similarity_search_result = [
+        Document(page_content="Orion answers questions.", metadata={"source": "https://a"}),
+        Document(page_content="It uses Qdrant.", metadata={"source": "https://b"}),
+    ]
+
+    tool = knowledge_instance.as_tool()
+    result = await tool.ainvoke({"query": "what is orion"})
+
+    assert tool.name == "knowledge"
+    assert tool.description == "Search internal knowledge"
+    assert vectorstore.similarity_search_args == [("what is orion", settings.qdrant.top_k)]
+    assert result == (
+        "Source: https://a\nOrion answers questions.\n\nSource: https://b\nIt uses Qdrant."
+    )
+
+
+def test_add_embeddings_upserts_precomputed_vectors(knowledge):
+    knowledge_instance, vectorstore, _, _ = knowledge
+    docs = [
+        Document(page_content="chunk one", metadata={"source": "https://a"}),
+        Document(page_content="chunk two", metadata={"source": "https://a"}),
+    ]
+
+    ids = knowledge_instance.add_embeddings(docs, [[0.1, 0.2], [0.3, 0.4]])
+
+    call = vectorstore.client.upsert_calls[0]
+    assert call["collection_name"] == vectorstore.collection_name
+    assert [point.id for point in call["points"]] == ids
+    assert call["points"][1].vector == {"": [0.3, 0.4]}
+    assert call["points"][1].payload == {
+        "page_content": "chunk two",
+        "metadata": {"source": "https://a"},
+    }
+
+
+def test_delete_sources_filters_on_metadata_source(knowledge):
+    knowledge_instance, vectorstore, _, _ = knowledge
+
+    knowledge_instance.delete_sources(["https://a", "https://b"])
+
+    call = vectorstore.client.delete_calls[0]
+    assert call["collection_name"] == vectorstore.collection_name
+    condition = call["points_selector"].filter.must[0]
+    assert condition.key == "metadata.source"
+    assert condition.match.any == ["https://a", "https://b"]
+
+
+def test_upload_link_upserts_pooled_chunk_vectors(monkeypatch, knowledge):
+    knowledge_instance, vectorstore, splitter, _ = knowledge
+    monkeypatch.setattr(settings.qdrant, "chunk_vectors", "pooled")
+    vectorstore.client.scroll_results = [([], None)]
+    pooled = Document(page_content="chunk one", metadata={"source": "https://new.example"})
+    short = Document(page_content="tiny", metadata={"source": "https://new.example"})
+    splitter.return_value = [(pooled, np.array([0.6, 0.8], dtype=np.float32)), (short, None)]
+
+    knowledge_instance.upload_link(["https://new.example"])
+
+    points = vectorstore.client.upsert_calls[0]["points"]
+    assert [point.payload["page_content"] for point in points] == ["chunk one"]
+    np.testing.assert_allclose(points[0].vector[""], [0.6, 0.8], rtol=1e-6)
+    assert vectorstore.add_documents_calls == [[short]]
+
+
+class CountingQueryEmbeddings:
+    def __init__(self):
+        self.queries = []
+
+    async def aembed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text))]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_aquery_caches_results_and_query_embeddings(knowledge):
+    knowledge_instance, vectorstore, _, _ = knowledge
+    knowledge_instance.embeddings = CountingQueryEmbeddings()
+    vectorstore.similarity_search_result = [
+        Document(page_content="Orion answers questions.", metadata={"source": "https://a"}),
+    ]
+
+    first = await knowledge_instance.aquery("What is  Orion?", k=3, score_threshold=0.5)
+    second = await knowledge_instance.aquery("  what is orion? ", k=3, score_threshold=0.5)
+
+    assert first == {"context": "Source: https://a\nOrion answers questions.", "cached": False}
+    assert second == {"context": first["context"], "cached": True}
+    assert knowledge_instance.embeddings.queries == ["what is orion?"]
+    assert vectorstore.similarity_search_args == [([14.0], 3, 0.5)]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_upsert_invalidates_cached_query_results(knowledge):
+    knowledge_instance, vectorstore, _, _ = knowledge
+    knowledge_instance.embeddings = CountingQueryEmbeddings()
+
+    await knowledge_instance.aquery("orion")
+    knowledge_instance.add_embeddings(
+        [Document(page_content="new", metadata={"source": "https://new"})], [[0.1]]
+    )
+    result = await knowledge_instance.aquery("orion")
+
+    assert result["cached"] is False
+    assert knowledge_instance.collection_version == 1
+    assert knowledge_instance.embeddings.queries == ["orion"]
+    assert [args[1] for args in vectorstore.similarity_search_args] == [settings.qdrant.top_k] * 2
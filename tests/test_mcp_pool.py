@@ -0,0 +1,183 @@
+import asyncio
+import types
+from contextlib import asynccontextmanager
+
+import pytest
+from langchain_core.tools import ToolException
+
+from orion.agent.mcp_pool import MCPSessionPool
+
+
+class FakeServer:
+    """Stand-in for an MCP server that counts sessions and calls."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.calls = 0
+        self.fail_next_call = False
+        self.call_error = ConnectionError("stream closed")
+        self.fail_pings = False
+        self.call_delay_s = 0.0
+        self.active = 0
+        self.max_active = 0
+        self.calls_by_session = {}
+
+    def factory(self, connection):
+        server = self
+
+        class FakeSession:
+            async def initialize(self):
+                server.sessions += 1
+
+            async def list_tools(self, cursor=None):
+                tool = types.SimpleNamespace(
+                    name="knowledge",
+                    description="Search the knowledge base",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {"query": {"type": "string"}},
+                        "required": ["query"],
+                    },
+                )
+                return types.SimpleNamespace(tools=[tool], nextCursor=None)
+
+            async def call_tool(self, name, arguments):
+                server.calls += 1
+                server.calls_by_session[id(self)] = server.calls_by_session.get(id(self), 0) + 1
+                server.active += 1
+                server.max_active = max(server.max_active, server.active)
+                try:
+                    await asyncio.sleep(server.call_delay_s)
+                finally:
+                    server.active -= 1
+                if server.fail_next_call:
+                    server.fail_next_call = False
+                    raise server.call_error
+                text = types.SimpleNamespace(type="text", text=f"{name}:{arguments['query']}")
+                return types.SimpleNamespace(content=[text], isError=False)
+
+            async def send_ping(self):
+                if server.fail_pings:
+                    raise ConnectionError("ping failed")
+
+        @asynccontextmanager
+        async def open_session():
+            yield FakeSession()
+
+        return open_session()
+
+
+def _make_pool(server, size=2, **kwargs):
+    kwargs.setdefault("health_interval_s", 60)
+    kwargs.setdefault("backoff_base_s", 0.001)
+    kwargs.setdefault("acquire_timeout_s", 1)
+    return MCPSessionPool({"transport": "fake"}, size, session_factory=server.factory, **kwargs)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pool_reuses_sessions_across_calls():
+    server = FakeServer()
+    pool = _make_pool(server, size=2)
+    tools = await pool.load_tools()
+
+    results = await asyncio.gather(
+        *[tools[0].ainvoke({"query": f"q{i}"}) for i in range(20)]
+    )
+
+    assert results[3] == "knowledge:q3"
+    assert server.sessions == 2
+    assert server.calls == 20
+    stats = pool.stats()
+    assert stats["connects"] == 2
+    assert stats["calls"] == 20
+    assert stats["healthy"] == 2
+    await pool.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pool_shares_sessions_between_concurrent_calls():
+    server = FakeServer()
+    server.call_delay_s = 0.02
+    pool = _make_pool(server, size=2)
+    pool.start()
+    await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[pool.call_tool("knowledge", {"query": f"q{i}"}) for i in range(10)])
+
+    # Ten calls run at once over two sessions, spread round-robin.
+    assert server.max_active == 10
+    assert sorted(server.calls_by_session.values()) == [5, 5]
+    assert pool.stats()["in_flight"] == 0
+    await pool.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pool_reconnects_after_failed_call():
+    server = FakeServer()
+    pool = _make_pool(server, size=1)
+
+    server.fail_next_call = True
+    with pytest.raises(ConnectionError):
+        await pool.call_tool("knowledge", {"query": "a"})
+
+    result = await pool.call_tool("knowledge", {"query": "b"})
+
+    assert result.content[0].text == "knowledge:b"
+    assert server.sessions == 2
+    assert pool.stats()["call_errors"] == 1
+    await pool.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_tool_error_leaves_the_shared_session_alone():
+    server = FakeServer()
+    server.call_delay_s = 0.02
+    server.call_error = ToolException("no such document")
+    pool = _make_pool(server, size=1)
+    pool.start()
+    await asyncio.sleep(0.01)
+
+    server.fail_next_call = True
+    failed, ok = await asyncio.gather(
+        pool.call_tool("knowledge", {"query": "a"}),
+        pool.call_tool("knowledge", {"query": "b"}),
+        return_exceptions=True,
+    )
+
+    assert isinstance(failed, ToolException)
+    assert ok.content[0].text == "knowledge:b"
+    assert len(server.calls_by_session) == 1
+    # The error belonged to one call; the session stays up for the next ones.
+    result = await pool.call_tool("knowledge", {"query": "c"})
+    assert result.content[0].text == "knowledge:c"
+    assert server.sessions == 1
+    assert pool.stats()["reconnects"] == 0
+    await pool.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_pool_reconnects_after_failed_health_check():
+    server = FakeServer()
+    pool = _make_pool(server, size=1, health_interval_s=0.01)
+    pool.start()
+
+    await asyncio.sleep(0.05)
+    server.fail_pings = True
+    await asyncio.sleep(0.05)
+    server.fail_pings = False
+    await asyncio.sleep(0.05)
+
+    assert pool.stats()["health_failures"] >= 1
+    assert server.sessions >= 2
+    result = await pool.call_tool("knowledge", {"query": "c"})
+    assert result.content[0].text == "knowledge:c"
+    await pool.close()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_error_results_raise_tool_exception():
+    from orion.agent.mcp_pool import _result_text
+
+    text = types.SimpleNamespace(type="text", text="boom")
+    with pytest.raises(ToolException):
+        _result_text(types.SimpleNamespace(content=[text], isError=True))
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from orion.admission import AdmissionRejected
+from orion.agent.scheduler import FairScheduler, UserQueueFull
+
+
+async def _run(scheduler, user_id, order, hold_s=0.01, cost=1):
+    async with scheduler.slot(user_id, cost):
+        order.append(user_id)
+        await asyncio.sleep(hold_s)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_users_take_turns_however_many_runs_they_queue():
+    scheduler = FairScheduler(max_concurrency=1, user_concurrency=1, user_queue=100, quantum=1)
+    order = []
+
+    noisy = [asyncio.create_task(_run(scheduler, "noisy", order)) for _ in range(10)]
+    await asyncio.sleep(0)
+    quiet = [asyncio.create_task(_run(scheduler, f"quiet{i}", order)) for i in range(2)]
+    await asyncio.gather(*noisy, *quiet)
+
+    # After the run already started, the quiet users are served within one round.
+    assert order.index("quiet0") <= 2
+    assert order.index("quiet1") <= 4
+    assert scheduler.stats()["users"] == 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_costlier_runs_get_proportionally_fewer_turns():
+    scheduler = FairScheduler(max_concurrency=1, user_concurrency=1, user_queue=100, quantum=100)
+    order = []
+
+    blocker = asyncio.create_task(_run(scheduler, "blocker", order, hold_s=0.02))
+    await asyncio.sleep(0)
+    heavy = [asyncio.create_task(_run(scheduler, "heavy", order, hold_s=0, cost=200)) for _ in range(3)]
+    light = [asyncio.create_task(_run(scheduler, "light", order, hold_s=0, cost=100)) for _ in range(6)]
+    await asyncio.gather(blocker, *heavy, *light)
+
+    served = order[1:7]
+    assert served.count("light") == 4
+    assert served.count("heavy") == 2
+
+
+@pytest.mark.anyio("asyncio")
+async def test_user_concurrency_is_capped():
+    scheduler = FairScheduler(max_concurrency=4, user_concurrency=2, user_queue=100)
+    peak = 0
+
+    async def run():
+        nonlocal peak
+        async with scheduler.slot("noisy"):
+            peak = max(peak, scheduler.stats()["in_flight"])
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(run() for _ in range(6)))
+
+    assert peak == 2
+    assert scheduler.stats()["admitted"] == 6
+
+
+@pytest.mark.anyio("asyncio")
+async def test_full_user_queue_rejects_only_that_user():
+    scheduler = FairScheduler(max_concurrency=1, user_concurrency=1, user_queue=2)
+    order = []
+
+    held = [asyncio.create_task(_run(scheduler, "noisy", order, hold_s=0.02)) for _ in range(3)]
+    await asyncio.sleep(0)
+    with pytest.raises(UserQueueFull) as excinfo:
+        await scheduler.acquire("noisy")
+    assert excinfo.value.retry_after_s >= 1
+
+    await _run(scheduler, "quiet", order)
+    await asyncio.gather(*held)
+    assert scheduler.stats()["rejected"] == 1
+
+
+@pytest.mark.anyio("asyncio")
+async def test_timed_out_and_cancelled_waiters_leave_the_queue():
+    scheduler = FairScheduler(max_concurrency=1, user_concurrency=1, max_wait_s=0.01)
+    started_at = await scheduler.acquire("a")
+
+    with pytest.raises(AdmissionRejected):
+        await scheduler.acquire("b")
+
+    scheduler.max_wait_s = 5
+    waiter = asyncio.create_task(scheduler.acquire("c"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    stats = scheduler.stats()
+    assert stats["queued"] == 0 and stats["users"] == 1 and stats["timed_out"] == 1
+    scheduler.release("a", started_at)
+    assert scheduler.stats()["users"] == 0
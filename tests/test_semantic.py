@@ -0,0 +1,229 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_community.utils.math import cosine_similarity
+
+from orion.tools.semantic import (
+    SemanticChunker,
+    adjacent_cosine_distances,
+    calculate_cosine_distances,
+    pool_embeddings,
+    window_embeddings,
+)
+
+
+class KeywordEmbeddings:
+    """Embeds a text by counting a few topic words, so topic shifts are far apart."""
+
+    TOPICS = ("cat", "rocket", "bread")
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(text.count(topic)) for topic in self.TOPICS] for text in texts]
+
+
+def _reference_distances(embeddings):
+    return [
+        1 - cosine_similarity([embeddings[i]], [embeddings[i + 1]])[0][0]
+        for i in range(len(embeddings) - 1)
+    ]
+
+
+def test_adjacent_distances_match_pairwise_cosine_similarity():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 16)).tolist()
+
+    distances = adjacent_cosine_distances(embeddings)
+
+    np.testing.assert_allclose(distances, _reference_distances(embeddings), atol=1e-6)
+
+
+def test_zero_vectors_have_zero_similarity():
+    embeddings = [[1.0, 0.0], [0.0, 0.0], [0.0, 0.0], [0.0, 2.0]]
+
+    distances = adjacent_cosine_distances(embeddings)
+
+    np.testing.assert_allclose(distances, _reference_distances(embeddings))
+    np.testing.assert_allclose(distances, [1.0, 1.0, 1.0])
+    assert adjacent_cosine_distances([[1.0, 2.0]]).shape == (0,)
+
+
+def test_calculate_cosine_distances_keeps_sentence_dicts():
+    sentences = [
+        {"sentence": "a", "combined_sentence_embedding": [1.0, 0.0]},
+        {"sentence": "b", "combined_sentence_embedding": [1.0, 1.0]},
+        {"sentence": "c", "combined_sentence_embedding": [0.0, 1.0]},
+    ]
+
+    distances, sentences = calculate_cosine_distances(sentences)
+
+    assert distances == pytest.approx([1 - np.sqrt(0.5), 1 - np.sqrt(0.5)])
+    assert sentences[0]["distance_to_next"] == pytest.approx(distances[0])
+    assert "distance_to_next" not in sentences[2]
+
+
+def test_split_text_breaks_on_topic_changes():
+    text = (
+        "The cat sleeps. A cat purrs. My cat eats. "
+        "The rocket launches. A rocket lands. Our rocket flies. "
+        "Fresh bread bakes. Warm bread rises. Good bread sells."
+    )
+    chunker = SemanticChunker(
+        KeywordEmbeddings(), buffer_size=0, breakpoint_threshold_amount=70
+    )
+
+    chunks = chunker.split_text(text)
+
+    assert chunks == [
+        "The cat sleeps. A cat purrs. My cat eats.",
+        "The rocket launches. A rocket lands. Our rocket flies.",
+        "Fresh bread bakes. Warm bread rises. Good bread sells.",
+    ]
+
+
+def test_create_documents_copies_metadata_per_chunk():
+    chunker = SemanticChunker(
+        KeywordEmbeddings(), buffer_size=0, breakpoint_threshold_amount=50, add_start_index=True
+    )
+
+    docs = chunker.create_documents(
+        ["A cat naps. The cat eats. A rocket flies. The rocket lands."],
+        metadatas=[{"source": "https://a"}],
+    )
+
+    assert [doc.page_content for doc in docs] == [
+        "A cat naps. The cat eats.",
+        "A rocket flies. The rocket lands.",
+    ]
+    assert [doc.metadata for doc in docs] == [
+        {"source": "https://a", "start_index": 0},
+        {"source": "https://a", "start_index": 25},
+    ]
+
+
+def test_window_embeddings_average_normalised_neighbours():
+    embeddings = [[2.0, 0.0], [0.0, 3.0], [0.0, 0.0], [1.0, 1.0]]
+
+    windows = window_embeddings(embeddings, buffer_size=1)
+
+    unit = np.array([[1, 0], [0, 1], [0, 0], [np.sqrt(0.5), np.sqrt(0.5)]])
+    expected = [
+        (unit[0] + unit[1]) / 2,
+        (unit[0] + unit[1] + unit[2]) / 3,
+        (unit[1] + unit[2] + unit[3]) / 3,
+        (unit[2] + unit[3]) / 2,
+    ]
+    np.testing.assert_allclose(windows, expected, rtol=1e-6)
+    assert windows.dtype == np.float32
+
+
+def test_window_embeddings_weights_neighbours_by_distance():
+    embeddings = [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]
+
+    windows = window_embeddings(embeddings, buffer_size=1, weights=[2.0, 1.0])
+
+    np.testing.assert_allclose(windows[1], [2 / 4, 2 / 4])
+    np.testing.assert_allclose(windows[0], [2 / 3, 1 / 3])
+    with pytest.raises(ValueError):
+        window_embeddings(embeddings, buffer_size=2, weights=[1.0])
+
+
+def test_windowed_mode_embeds_each_sentence_once():
+    text = (
+        "The cat sleeps. A cat purrs. My cat eats. "
+        "The rocket launches. A rocket lands. Our rocket flies. "
+        "Fresh bread bakes. Warm bread rises. Good bread sells."
+    )
+    combined = KeywordEmbeddings()
+    windowed = KeywordEmbeddings()
+
+    combined_chunks = SemanticChunker(combined, breakpoint_threshold_amount=70).split_text(text)
+    windowed_chunks = SemanticChunker(
+        windowed, breakpoint_threshold_amount=70, embedding_mode="windowed"
+    ).split_text(text)
+
+    assert windowed_chunks == combined_chunks
+    assert windowed.calls == [
+        [
+            "The cat sleeps.", "A cat purrs.", "My cat eats.",
+            "The rocket launches.", "A rocket lands.", "Our rocket flies.",
+            "Fresh bread bakes.", "Warm bread rises.", "Good bread sells.",
+        ]
+    ]
+    windowed_chars = sum(len(text) for text in windowed.calls[0])
+    combined_chars = sum(len(text) for text in combined.calls[0])
+    assert windowed_chars * 2 < combined_chars
+
+
+def test_create_documents_batches_sentences_across_documents():
+    texts = [
+        "A cat naps. The cat eats. A rocket flies. The rocket lands.",
+        "Only one sentence here",
+        "Fresh bread bakes. A cat watches. The bread cools.",
+    ]
+    per_document = SemanticChunker(KeywordEmbeddings(), buffer_size=0, breakpoint_threshold_amount=50)
+    expected = [per_document.split_text(text) for text in texts]
+
+    embeddings = KeywordEmbeddings()
+    chunker = SemanticChunker(
+        embeddings,
+        buffer_size=0,
+        breakpoint_threshold_amount=50,
+        batch_size=3,
+        max_concurrency=2,
+    )
+    docs = chunker.create_documents(texts, metadatas=[{"i": 0}, {"i": 1}, {"i": 2}])
+
+    # Batches may run in any order; together they cover every sentence once.
+    assert sorted(len(batch) for batch in embeddings.calls) == [1, 3, 3]
+    assert sorted(text for batch in embeddings.calls for text in batch) == sorted([
+        "A cat naps.", "The cat eats.", "A rocket flies.", "The rocket lands.",
+        "Fresh bread bakes.", "A cat watches.", "The bread cools.",
+    ])
+    assert [(doc.metadata["i"], doc.page_content) for doc in docs] == [
+        (i, chunk) for i, chunks in enumerate(expected) for chunk in chunks
+    ]
+
+
+def test_batches_respect_token_budget():
+    chunker = SemanticChunker(KeywordEmbeddings(), batch_size=10, batch_tokens=10)
+
+    # Each 16-character text is estimated at 5 tokens.
+    assert chunker._batches(["x" * 16] * 5) == [(0, 2), (2, 4), (4, 5)]
+    # A single text over the budget still gets its own batch.
+    assert chunker._batches(["x" * 100, "x"]) == [(0, 1), (1, 2)]
+
+
+def test_split_documents_with_vectors_pools_sentence_rows():
+    embeddings = KeywordEmbeddings()
+    chunker = SemanticChunker(
+        embeddings, buffer_size=0, breakpoint_threshold_amount=50, embedding_mode="windowed"
+    )
+
+    pairs = chunker.split_documents_with_vectors(
+        [
+            Document(page_content="A cat naps. The cat eats. A rocket flies. The rocket lands.",
+                     metadata={"source": "https://a"}),
+            Document(page_content="Just bread", metadata={"source": "https://b"}),
+        ]
+    )
+
+    assert len(embeddings.calls) == 1
+    assert [(doc.page_content, doc.metadata["source"]) for doc, _ in pairs] == [
+        ("A cat naps. The cat eats.", "https://a"),
+        ("A rocket flies. The rocket lands.", "https://a"),
+        ("Just bread", "https://b"),
+    ]
+    np.testing.assert_allclose(pairs[0][1], [1.0, 0.0, 0.0])
+    np.testing.assert_allclose(pairs[1][1], [0.0, 1.0, 0.0])
+    assert pairs[2][1] is None
+
+
+def test_pool_embeddings_is_normalised_mean():
+    pooled = pool_embeddings([[3.0, 0.0], [0.0, 0.5]])
+
+    np.testing.assert_allclose(pooled, [np.sqrt(0.5), np.sqrt(0.5)], rtol=1e-6)
+    np.testing.assert_allclose(pool_embeddings([[0.0, 0.0]]), [0.0, 0.0])
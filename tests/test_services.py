@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from orion import services as services_module
+
+
+@pytest.fixture
+def patched_services(monkeypatch):
+    class FakeKnowledge:
+        def __init__(self, prompt, embeddings=None, vectorstore=None):
+            self.prompt = prompt
+            self.embeddings = embeddings
+            self.vectorstore = vectorstore
+
+        def as_tool(self):
+            return "local-knowledge-tool"
+
+    class FakeAgent:
+        tools_error = None
+
+        def __init__(self, prompt=None, knowledge=None, langfuse=None, mcp_pool=None):
+            self.prompt = prompt
+            self.knowledge = knowledge
+            self.graph = None
+
+        @staticmethod
+        async def load_tools(mcp_pool=None):
+            await asyncio.sleep(0.1)
+            if FakeAgent.tools_error:
+                raise FakeAgent.tools_error
+            return ["knowledge-tool"]
+
+        def build_graph(self, tools):
+            return {"tools": tools}
+
+        def set_graph(self, graph):
+            self.graph = graph
+
+        async def startup(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+    class FakeEmbeddings:
+        closed = False
+
+        async def aclose(self):
+            self.closed = True
+
+    class FakeJobs:
+        def __init__(self, knowledge):
+            self.knowledge = knowledge
+            self.closed = False
+
+        async def start(self):
+            pass
+
+        async def close(self):
+            self.closed = True
+
+    async def fake_aload_prompt(settings, langfuse):
+        await asyncio.sleep(0.1)
+        return {"prompt": True}
+
+    def fake_connect_vectorstore(embeddings):
+        time.sleep(0.1)
+        return "vectorstore"
+
+    monkeypatch.setattr(services_module, "Langfuse", lambda: object())
+    monkeypatch.setattr(services_module, "build_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(services_module, "aload_prompt", fake_aload_prompt)
+    monkeypatch.setattr(services_module, "connect_vectorstore", fake_connect_vectorstore)
+    monkeypatch.setattr(services_module, "build_mcp_pool", lambda: None)
+    monkeypatch.setattr(services_module, "Knowledge", FakeKnowledge)
+    monkeypatch.setattr(services_module, "Agent", FakeAgent)
+    monkeypatch.setattr(services_module, "IngestionJobs", FakeJobs)
+    return FakeAgent
+
+
+@pytest.mark.anyio("asyncio")
+async def test_services_warm_up_components_concurrently(patched_services):
+    services = services_module.Services()
+
+    start = time.perf_counter()
+    services.start()
+    await services.wait_ready()
+    elapsed = time.perf_counter() - start
+
+    assert services.ready
+    assert elapsed < 0.25
+    assert services.agent.knowledge is services.knowledge
+    assert services.agent.graph == {"tools": ["knowledge-tool"]}
+    assert set(services.timings) >= {"prompts", "qdrant", "mcp_tools", "jobs", "total"}
+    assert services.jobs.knowledge is services.knowledge
+    await services.stop()
+    assert services.jobs.closed
+    assert services.knowledge.embeddings.closed
+
+
+@pytest.mark.anyio("asyncio")
+async def test_services_tolerate_mcp_discovery_failure(patched_services):
+    patched_services.tools_error = RuntimeError("mcp down")
+    services = services_module.Services()
+
+    services.start()
+    await services.wait_ready()
+
+    assert services.ready
+    assert services.agent.graph is None
+
+
+@pytest.mark.anyio("asyncio")
+async def test_services_use_in_process_tool_in_local_mode(patched_services, monkeypatch):
+    monkeypatch.setattr(services_module.settings.mcp, "knowledge_tool_mode", "local")
+    patched_services.tools_error = AssertionError("MCP must not be contacted")
+    services = services_module.Services()
+
+    services.start()
+    await services.wait_ready()
+
+    assert services.agent.graph == {"tools": ["local-knowledge-tool"]}
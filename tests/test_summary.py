@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from orion.agent.summary import RollingSummaries, estimate_tokens
+
+
+class FakeHistoryStore:
+    def __init__(self, turns):
+        base = datetime(2024, 1, 1)
+        self.records = [
+            {"input": question, "answer": answer, "created_at": base + timedelta(minutes=i)}
+            for i, (question, answer) in enumerate(turns)
+        ]
+        self.summary = None
+        self.summary_reads = 0
+
+    async def get_recent_turns(self, user_id, session_id, size):
+        return self.records[-size:]
+
+    async def get_summary(self, user_id, session_id):
+        self.summary_reads += 1
+        return self.summary
+
+    async def save_summary(self, user_id, session_id, summary, covered_until):
+        self.summary = {"summary": summary, "covered_until": covered_until}
+        return self.summary
+
+
+class FakeSummarizer:
+    def __init__(self, gate=None):
+        self.inputs = []
+        self.gate = gate
+
+    async def __call__(self, text):
+        self.inputs.append(text)
+        if self.gate is not None:
+            await self.gate.wait()
+        return f"summary #{len(self.inputs)}"
+
+
+@pytest.mark.anyio("asyncio")
+async def test_history_within_budget_is_sent_verbatim():
+    store = FakeHistoryStore([("q1", "a1"), ("q2", "a2")])
+    summarizer = FakeSummarizer()
+    summaries = RollingSummaries(store, summarizer, budget_tokens=1000)
+
+    context = await summaries.prepare("u", "s", size=6)
+
+    assert context["messages"] == [
+        {"role": "user", "content": "q1"},
+        {"role": "assistant", "content": "a1"},
+        {"role": "user", "content": "q2"},
+        {"role": "assistant", "content": "a2"},
+    ]
+    assert context["usage"]["tokens_saved"] == 0
+    assert context["usage"]["folded_turns"] == 0
+    assert summarizer.inputs == []
+
+
+@pytest.mark.anyio("asyncio")
+async def test_turns_over_budget_are_folded_into_the_summary():
+    long_answer = "x" * 600
+    store = FakeHistoryStore([("q1", "a1"), ("q2", long_answer), ("q3", "a3")])
+    summarizer = FakeSummarizer()
+    summaries = RollingSummaries(store, summarizer, budget_tokens=120)
+
+    first = await summaries.prepare("u", "s", size=6)
+    await summaries.close()
+
+    # Until the summary is stored, the folded turns are still sent, cut to fit.
+    shortened = "x" * 128 + " …"
+    assert [message["content"] for message in first["messages"]] == ["q1", "a1", "q2", shortened, "q3", "a3"]
+    assert first["usage"]["folded_turns"] == 2
+    assert first["usage"]["tokens_saved"] == estimate_tokens(long_answer) - estimate_tokens(shortened)
+    assert summarizer.inputs == [f"Conversation:\nUser: q1\nAssistant: a1\nUser: q2\nAssistant: {long_answer}"]
+    assert store.summary["covered_until"] == store.records[1]["created_at"]
+
+    store.records.append({"input": "q4", "answer": long_answer, "created_at": datetime(2024, 1, 2)})
+    second = await summaries.prepare("u", "s", size=6)
+    await summaries.close()
+
+    assert second["messages"][0] == {
+        "role": "system",
+        "content": "Summary of the earlier conversation:\nsummary #1",
+    }
+    # Turns the summary covers are left out; q3 is being folded and still sent.
+    assert [message["content"] for message in second["messages"][1:]] == ["q3", "a3", "q4", long_answer]
+    assert summarizer.inputs[1] == "Previous summary:\nsummary #1\n\nConversation:\nUser: q3\nAssistant: a3"
+    # The summary written by the first fold is served from memory.
+    assert store.summary_reads == 1
+    stats = summaries.stats()
+    assert stats["summaries"] == 2 and stats["folded_turns"] == 3
+    assert stats["tokens_saved"] > 0
+
+
+@pytest.mark.anyio("asyncio")
+async def test_oldest_turn_of_a_full_window_is_always_folded():
+    store = FakeHistoryStore([(f"q{i}", f"a{i}") for i in range(3)])
+    summaries = RollingSummaries(store, FakeSummarizer(), budget_tokens=1000)
+
+    context = await summaries.prepare("u", "s", size=3)
+    await summaries.close()
+
+    assert context["usage"]["recent_turns"] == 2
+    assert store.summary["covered_until"] == store.records[0]["created_at"]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_one_fold_per_session_at_a_time():
+    store = FakeHistoryStore([("q1", "x" * 400), ("q2", "a2"), ("q3", "a3")])
+    gate = asyncio.Event()
+    summarizer = FakeSummarizer(gate=gate)
+    summaries = RollingSummaries(store, summarizer, budget_tokens=20)
+
+    await summaries.prepare("u", "s", size=6)
+    await summaries.prepare("u", "s", size=6)
+    await asyncio.sleep(0)
+    assert summaries.stats()["running"] == 1
+
+    gate.set()
+    await summaries.close()
+    assert len(summarizer.inputs) == 1